@@ -0,0 +1,12 @@
+from .generate import Shape, SHAPES, generate_schema, generate_directory
+from .bench import bench_shape, run, compare
+
+__all__ = [
+    "Shape",
+    "SHAPES",
+    "generate_schema",
+    "generate_directory",
+    "bench_shape",
+    "run",
+    "compare",
+]
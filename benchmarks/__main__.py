@@ -0,0 +1,41 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+import warnings
+from .generate import SHAPES
+from .bench import run, save, load, compare, format_results
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def main() -> int:
+    parser = ArgumentParser(prog="python -m benchmarks", description="Times build, yamlize and load_path and measures defaults tree memory on synthetic schemas.")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES.keys(), help="Shapes to run, all by default")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timing, the median is reported")
+    parser.add_argument("--out", type=Path, help="Results file, results/<commit>.json by default")
+    parser.add_argument("--compare", type=Path, help="Results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown counted as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    shapes = SHAPES if args.shapes is None else {name: SHAPES[name] for name in args.shapes}
+    results = run(shapes, args.repeat)
+
+    out = args.out if args.out is not None else RESULTS_DIR / "{}.json".format(results["commit"] or "latest")
+    save(results, out)
+
+    baseline = None if args.compare is None else load(args.compare)
+    print(format_results(results, baseline))
+    print(f"Saved to {out}")
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for regression in regressions:
+            print("Regression:", regression)
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+from typing import Dict, List, Callable, Any, Optional
+from pathlib import Path
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from asyd import build, compile, yamlize
+from asyd.aio import load_option_trees
+from asyd.frozen import deep_sizeof
+from .generate import Shape, SHAPES, generate_schema, generate_directory
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> float:
+    '''
+    Returns the median time of repeat calls to fn, in seconds.
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def bench_shape(shape: Shape, repeat: int = 5) -> Dict[str, float]:
+    '''
+    Times compiling, building, serializing and loading a config of the given
+    shape, in seconds:
+
+        compile     reading the directory into a plan
+        build       one-shot build (compile and build)
+        plan_build  building from a compiled plan
+        yamlize     serializing the built config
+        load_path   building from a serialized config with load_path
+    '''
+    schema = generate_schema(shape)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp) / "config"
+        generate_directory(shape, directory)
+
+        plan = compile(schema, str(directory))
+        config = plan.build()
+        load_path = Path(tmp) / "config.yaml"
+        load_path.write_text(yamlize(config))
+
+        return {
+            "compile": time_call(lambda: compile(schema, str(directory)), repeat),
+            "build": time_call(lambda: build(schema, str(directory)), repeat),
+            "plan_build": time_call(lambda: plan.build(), repeat),
+            "yamlize": time_call(lambda: yamlize(config), repeat),
+            "load_path": time_call(lambda: plan.build(load_path=str(load_path)), repeat),
+        }
+
+def tree_bytes(shape: Shape) -> Dict[str, int]:
+    '''
+    Measures the memory used by the defaults trees of a compiled plan of the
+    given shape, with the trees of every MultiConfig option loaded, in bytes:
+
+        raw_tree       the defaults tree as merged from the directory
+        compiled_tree  what the compiled tree adds on top of the raw tree
+    '''
+    schema = generate_schema(shape)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp) / "config"
+        generate_directory(shape, directory)
+        plan = compile(schema, str(directory))
+        load_option_trees(plan.raw_defaults_tree)
+        load_option_trees(plan.defaults_tree)
+
+    seen: set = set()
+    return {
+        "raw_tree": deep_sizeof(plan.raw_defaults_tree, seen),
+        "compiled_tree": deep_sizeof(plan.defaults_tree, seen),
+    }
+
+def run(shapes: Optional[Dict[str, Shape]] = None, repeat: int = 5) -> Dict[str, Any]:
+    '''
+    Benchmarks every shape and returns the results together with the commit
+    and Python version they were measured on.
+    '''
+    shapes = SHAPES if shapes is None else shapes
+    return {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": {name: bench_shape(shape, repeat) for name, shape in shapes.items()},
+        "memory": {name: tree_bytes(shape) for name, shape in shapes.items()},
+    }
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(results: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True))
+
+def load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text())
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], threshold: float = 0.2) -> List[str]:
+    '''
+    Compares results with a baseline run and returns a line per shape and
+    timing that got slower, or memory measurement that grew, by more than
+    threshold (0.2 is 20% more).
+    '''
+    regressions = []
+    for name, timings in results["results"].items():
+        for metric, seconds in timings.items():
+            before = baseline["results"].get(name, {}).get(metric)
+            if before is not None and before > 0 and seconds / before > 1 + threshold:
+                regressions.append(f"{name}.{metric}: {before * 1000:.3f}ms -> {seconds * 1000:.3f}ms ({seconds / before:.2f}x)")
+    for name, sizes in results.get("memory", {}).items():
+        for metric, size in sizes.items():
+            before = baseline.get("memory", {}).get(name, {}).get(metric)
+            if before is not None and before > 0 and size / before > 1 + threshold:
+                regressions.append(f"{name}.{metric}: {before / 1024:.1f}KiB -> {size / 1024:.1f}KiB ({size / before:.2f}x)")
+    return regressions
+
+def format_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    lines = format_table(results["results"], None if baseline is None else baseline["results"], "ms", 1000)
+    if "memory" in results:
+        lines += [""] + format_table(results["memory"], None if baseline is None else baseline.get("memory", {}), "KiB", 1 / 1024)
+    return "\n".join(lines)
+
+def format_table(rows: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]], unit: str, scale: float) -> List[str]:
+    metrics = sorted({metric for values in rows.values() for metric in values})
+    width = max(len(name) for name in rows) if len(rows) > 0 else 5
+    lines = [f"{'shape':<{width}}" + "".join(f"  {metric + ' ' + unit:>16}" for metric in metrics)]
+    for name, values in rows.items():
+        line = f"{name:<{width}}"
+        for metric in metrics:
+            cell = f"{values[metric] * scale:.3f}"
+            before = None if baseline is None else baseline.get(name, {}).get(metric)
+            if before:
+                cell += f" ({values[metric] / before:.2f}x)"
+            line += f"  {cell:>16}"
+        lines.append(line)
+    return lines
@@ -0,0 +1,123 @@
+from typing import Type, Dict, List, Any, Optional
+from dataclasses import dataclass, make_dataclass, field
+from pathlib import Path
+import types
+import yaml
+from asyd import Config, MultiConfig, ConfigRef, MV
+
+
+@dataclass
+class Shape:
+    '''
+    Shape of a synthetic schema and its configuration directory.
+
+            Attributes:
+                    depth (int): Levels of nested configs below the base config
+                    fanout (int): Nested configs in every config above the
+                        deepest level
+                    leaves (int): Leaf (int) fields in every config
+                    options (int): Options of a MultiConfig added to every
+                        config above the deepest level, none if 0
+                    query_branches (int): Branches of the query every nested
+                        config except the first of its siblings has on the
+                        first leaf of its first sibling, none if 0
+                    folder_fraction (float): Fraction of configs whose
+                        defaults are split into files in a defaults folder
+                        instead of a single defaults.yaml
+    '''
+    depth: int = 2
+    fanout: int = 3
+    leaves: int = 10
+    options: int = 0
+    query_branches: int = 0
+    folder_fraction: float = 0.0
+
+
+SHAPES: Dict[str, Shape] = {
+    "small": Shape(depth=1, fanout=2, leaves=5),
+    "flat": Shape(depth=1, fanout=1, leaves=200),
+    "deep": Shape(depth=8, fanout=1, leaves=10),
+    "wide": Shape(depth=2, fanout=10, leaves=10),
+    "multi": Shape(depth=2, fanout=3, leaves=10, options=8),
+    "options": Shape(depth=2, fanout=3, leaves=40, options=16),
+    "queries": Shape(depth=2, fanout=4, leaves=10, query_branches=32),
+    "folders": Shape(depth=2, fanout=4, leaves=10, folder_fraction=1.0),
+    "mixed": Shape(depth=3, fanout=3, leaves=10, options=4, query_branches=8, folder_fraction=0.5),
+}
+
+
+def generate_schema(shape: Shape, name: str = "Bench") -> Type[Config]:
+    '''
+    Creates a schema class of the given shape. Nested configs are named c0,
+    c1, ..., leaves f0, f1, ... and MultiConfigs mc, with options o0, o1, ...
+    '''
+    return schema_helper(shape, name, [], 0)
+
+def schema_helper(shape: Shape, name: str, path: List[str], level: int) -> Type[Config]:
+    fields: List[Any] = [(f"f{i}", int, field(default=MV)) for i in range(shape.leaves)]
+    if level < shape.depth:
+        for i in range(shape.fanout):
+            child = schema_helper(shape, f"{name}_c{i}", path + [f"c{i}"], level + 1)
+            if i > 0 and shape.query_branches > 0:
+                child._default_dependencies = {ConfigRef(".".join(path + ["c0"]))}
+            fields.append((f"c{i}", child, field(default=MV)))
+        if shape.options > 0:
+            fields.append(("mc", multi_config(shape, f"{name}_mc"), field(default=MV)))
+    return make_dataclass(name, fields, bases=(Config,))
+
+def multi_config(shape: Shape, name: str) -> Type[MultiConfig]:
+    superschema = make_dataclass(f"{name}_base", [(f"f{i}", int, field(default=MV)) for i in range(shape.leaves)], bases=(Config,))
+    options = {f"o{k}": make_dataclass(f"{name}_o{k}", [(f"o{k}_field", int, field(default=MV))], bases=(superschema,)) for k in range(shape.options)}
+    cls = types.new_class(name, (MultiConfig[superschema],), {}, lambda ns: ns.update({"_options": options}))
+    return dataclass(cls)
+
+
+def generate_directory(shape: Shape, directory: Path) -> None:
+    '''
+    Writes a configuration directory with defaults for every field of the
+    schema created by generate_schema(shape).
+    '''
+    directory.mkdir(parents=True, exist_ok=True)
+    counter = [0]
+    directory_helper(shape, directory, [], 0, counter)
+
+def directory_helper(shape: Shape, dir: Path, path: List[str], level: int, counter: List[int]) -> None:
+    # Deterministically spread configs between defaults files and folders
+    counter[0] += 1
+    in_folder = int(counter[0] * shape.folder_fraction) != int((counter[0] - 1) * shape.folder_fraction)
+
+    defaults: Dict[str, Any] = {f"f{i}": level * 1000 + i for i in range(shape.leaves)}
+    query = {}
+    if len(path) > 0 and path[-1] != "c0" and shape.query_branches > 0:
+        sibling = ".".join(path[:-1] + ["c0"])
+        for b in range(shape.query_branches):
+            op = ">" if b % 2 == 0 else "="
+            query[f"{op}{level * 1000 + b - shape.query_branches // 2}"] = {"f1!": b}
+        query_key = f"?{sibling}.f0"
+
+    dir.mkdir(parents=True, exist_ok=True)
+    if in_folder:
+        folder = dir / "defaults"
+        folder.mkdir(exist_ok=True)
+        for k, v in defaults.items():
+            write_yaml(folder / f"{k}.yaml", v)
+        if len(query) > 0:
+            for branch, subtree in query.items():
+                write_yaml(folder / query_key / f"{branch}.yaml", subtree)
+    else:
+        if len(query) > 0:
+            defaults[query_key] = query
+        write_yaml(dir / "defaults.yaml", defaults)
+
+    if level < shape.depth:
+        for i in range(shape.fanout):
+            directory_helper(shape, dir / f"c{i}", path + [f"c{i}"], level + 1, counter)
+        if shape.options > 0:
+            write_yaml(dir / "mc" / "defaults.yaml", {f"f{i}": i for i in range(shape.leaves)})
+            for k in range(shape.options):
+                write_yaml(dir / "mc" / f"o{k}" / "defaults.yaml", {f"o{k}_field": k})
+
+def write_yaml(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        yaml.dump(data, f, Dumper=yaml.CDumper)
@@ -1,7 +1,15 @@
 from .config_utils import MV
-from .config import Config, MultiConfig, ConfigRef
-from .builder import build
-from .serialization import yamlize, dictize
+from .config import Config, MultiConfig, ConfigRef, content_hash, same_content, diff
+from .builder import build, compile, BuildPlan, pack_bundle
+from .aio import abuild, acompile
+from .serialization import yamlize, jsonize, write_jsonl, dictize
+from .cache import DefaultsCache
+from .loading import Manifest
+from .sweep import build_sweep, run_sweep
+from .snapshot import save_snapshot, load_snapshot
+from .frozen import freeze, bytes_per_config
+from .tracing import trace, Tracer
+from .watch import DefaultsWatcher
 from . import exceptions
 
 __all__ = [
@@ -9,8 +17,29 @@ __all__ = [
     "Config",
     "MultiConfig",
     "ConfigRef",
+    "content_hash",
+    "same_content",
+    "diff",
     "build",
+    "compile",
+    "BuildPlan",
+    "pack_bundle",
+    "abuild",
+    "acompile",
+    "build_sweep",
+    "run_sweep",
+    "save_snapshot",
+    "load_snapshot",
     "yamlize",
+    "jsonize",
+    "write_jsonl",
     "dictize",
+    "freeze",
+    "bytes_per_config",
+    "DefaultsCache",
+    "Manifest",
+    "DefaultsWatcher",
+    "trace",
+    "Tracer",
     "exceptions"
 ]
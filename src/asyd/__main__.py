@@ -0,0 +1,28 @@
+from argparse import ArgumentParser
+import importlib
+import sys
+from .builder import pack_bundle
+from .cache import DefaultsCache
+
+
+def main() -> int:
+    parser = ArgumentParser(prog="python -m asyd")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="Pack a configuration directory into a bundle file")
+    pack.add_argument("schema", help="Base schema as module:Class, e.g. configs.schema:BaseConfig")
+    pack.add_argument("directory", help="Configuration directory")
+    pack.add_argument("out", help="Bundle file, e.g. bundle.asyd")
+    pack.add_argument("--cache", help="Persistent cache of parsed defaults files")
+    args = parser.parse_args()
+
+    module_name, _, class_name = args.schema.partition(":")
+    schema = importlib.import_module(module_name)
+    for name in class_name.split("."):
+        schema = getattr(schema, name)
+
+    pack_bundle(schema, args.directory, args.out, None if args.cache is None else DefaultsCache(args.cache))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+from typing import Type, TypeVar, Dict, List, Tuple, Any, Optional, Mapping
+from argparse import ArgumentParser
+from concurrent.futures import Executor
+from pathlib import Path
+import asyncio
+import functools
+from .config import Config
+from .builder import BuildPlan
+from .cache import DefaultsCache, load_yaml
+from .loading import LazyOptionTrees, Manifest, PreloadedFiles, _LoadError, discover_defaults_files
+
+
+T = TypeVar("T", bound=Config)
+
+# Plans being loaded, so that concurrent calls for the same directory share one load
+_in_flight: Dict[Tuple[Any, ...], "asyncio.Future[BuildPlan]"] = {}
+
+
+async def abuild(base_schema: Type[T], directory: str, parser: Optional[ArgumentParser] = None, args: List[str] = [], load_path: str = None, cache: Optional[DefaultsCache] = None, overrides: Optional[Dict[str, Any]] = None, concurrency: int = 8, executor: Optional[Executor] = None) -> T:
+    '''
+    Same as build, but without blocking the event loop. Finding, reading and
+    parsing the defaults files happens in an executor, with at most
+    concurrency files parsed at once, and only resolving the config runs on
+    the loop. Concurrent calls for the same schema and directory share a single
+    load of the directory. The defaults of every MultiConfig option are read,
+    not only those of the selected options.
+
+            Parameters:
+                    base_schema (Type[T]): Schema to be built
+                    directory (str): Directory holding defaults for base_schema
+                    parser (Optional[ArgumentParser]): See build
+                    args (List[str]): Command line arguments
+                    load_path (str): Config file to load values from,
+                        overrides --load_path. Loaded in the executor.
+                    cache (Optional[DefaultsCache]): Persistent cache of parsed
+                        defaults files
+                    overrides (Optional[Dict[str, Any]]): See build
+                    concurrency (int): Maximum number of files parsed at once
+                    executor (Optional[Executor]): Executor to do blocking work
+                        in, the loop's default executor if None
+
+            Returns:
+                    config (T): Initialized base_schema with values filled in
+    '''
+    plan = await acompile(base_schema, directory, parser, cache, concurrency, executor)
+
+    if load_path is not None or any(arg.startswith("--load_path") for arg in args):
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(plan.build, args, load_path, overrides))
+    return plan.build(args, load_path, overrides)
+
+async def acompile(base_schema: Type[T], directory: str, parser: Optional[ArgumentParser] = None, cache: Optional[DefaultsCache] = None, concurrency: int = 8, executor: Optional[Executor] = None) -> BuildPlan[T]:
+    '''
+    Same as compile, but without blocking the event loop, see abuild. The plan
+    can be used to build from the loop without touching the file system
+    (unless a config is loaded with load_path).
+    '''
+    loop = asyncio.get_running_loop()
+    key = (loop, base_schema, str(Path(directory).resolve()), id(parser), id(cache))
+    if not key in _in_flight:
+        future = asyncio.ensure_future(compile_helper(base_schema, directory, parser, cache, concurrency, executor))
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(_in_flight[key])
+
+async def compile_helper(base_schema: Type[T], directory: str, parser: Optional[ArgumentParser], cache: Optional[DefaultsCache], concurrency: int, executor: Optional[Executor]) -> BuildPlan[T]:
+    loop = asyncio.get_running_loop()
+    manifest = await loop.run_in_executor(executor, Manifest.scan, Path(directory))
+    files = discover_defaults_files(base_schema, Path(directory), True, manifest)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    parse = load_yaml if cache is None else cache.load
+    async def load(f: Path) -> Any:
+        async with semaphore:
+            try:
+                return await loop.run_in_executor(executor, parse, f)
+            except Exception as e:
+                return _LoadError(e)  # Raised when the file is merged, like when loading serially
+    loaded = dict(zip(files, await asyncio.gather(*[load(f) for f in files])))
+
+    def create_plan() -> BuildPlan[T]:
+        plan = BuildPlan(base_schema, directory, parser, cache, loader=PreloadedFiles(loaded, cache), manifest=manifest)
+        load_option_trees(plan.defaults_tree)
+        return plan
+    return await loop.run_in_executor(executor, create_plan)
+
+def load_option_trees(tree: Mapping) -> None:
+    '''
+    Builds the lazily built defaults trees of every MultiConfig option, so
+    that building never reads the directory.
+    '''
+    for v in tree.values() if not isinstance(tree, LazyOptionTrees) else (tree[option] for option in tree):
+        if isinstance(v, Mapping):
+            load_option_trees(v)
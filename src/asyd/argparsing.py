@@ -1,28 +1,101 @@
-from typing import Type, Dict, Any, Set, Optional, List
+from typing import Type, Dict, Any, Set, Optional, List, Tuple
 from argparse import ArgumentParser
-from .serialization import dictize
-from .config import Config, MultiConfig
+from .config import Config, MultiConfig, schema_info, CONFIG, MULTI
+from .exceptions import InvalidPathException, InvalidOverrideException
 
 def parse(schema: Type[Config], parser: Optional[ArgumentParser] = None, args: List[str] = [], add_load_arg: bool = True):
+    return vars(make_parser(schema, parser, add_load_arg).parse_args(args))
+
+def make_parser(schema: Type[Config], parser: Optional[ArgumentParser] = None, add_load_arg: bool = True, selections: Optional[Dict[str, str]] = None) -> ArgumentParser:
     parser = ArgumentParser() if parser is None else parser
-    parse_helper(schema, parser, "", set())
+    parse_helper(schema, parser, "", set(), selections)
+
+    if add_load_arg:
+        parser.add_argument("--load_path", type=str)
+
+    return parser
+
+def parse_helper(schema: Type[Config], parser: ArgumentParser, prefix: str, already_added: Set, selections: Optional[Dict[str, str]] = None):
+    info = schema_info(schema)
+    for name, kind in info.kinds.items():
+        if kind == CONFIG:
+            parse_helper(info.types[name], parser, prefix + name + ".", already_added, selections)
+        elif kind == MULTI:
+            options = schema_info(info.types[name]).options
+            add_to_parser("--" + prefix + name, str, parser, already_added, choices=options.keys())
+
+            # Only the fields of the selected option are added if selections are known
+            if selections is None:
+                option_schemas = options.values()
+            else:
+                selected = options.get(selections.get(prefix + name))
+                option_schemas = [] if selected is None else [selected]
+            for cls in option_schemas:
+                parse_helper(cls, parser, prefix + name + ".", already_added, selections)
+        else:
+            add_to_parser("--" + prefix + name, info.types[name], parser, already_added)
+
+def make_selector_parser(schema: Type[Config], add_load_arg: bool = True) -> ArgumentParser:
+    '''
+    Creates a parser for the first of two parsing phases, which only knows the
+    flags that select MultiConfig options (and --load_path). It is used with
+    parse_known_args to find the selected options before adding the fields
+    of only those options to the parser of the second phase.
+    '''
+    parser = ArgumentParser(add_help=False, allow_abbrev=False)
+    selector_helper(schema, parser, "", set())
 
     if add_load_arg:
         parser.add_argument("--load_path", type=str)
 
-    return vars(parser.parse_args(args))
+    return parser
 
-def parse_helper(schema: Type[Config], parser: ArgumentParser, prefix: str, already_added: Set):
-    for name, field in schema.__dataclass_fields__.items():
-        if issubclass(field.type, Config):
-            parse_helper(field.type, parser, prefix + name + ".", already_added)
-        elif issubclass(field.type, MultiConfig):
-            add_to_parser("--" + prefix + name, str, parser, already_added, choices=field.type._options.keys())
+def selector_helper(schema: Type[Config], parser: ArgumentParser, prefix: str, already_added: Set):
+    info = schema_info(schema)
+    for name, child in info.children.items():
+        if info.kinds[name] == CONFIG:
+            selector_helper(child, parser, prefix + name + ".", already_added)
+        else:
+            options = schema_info(child).options
+            add_to_parser("--" + prefix + name, str, parser, already_added, choices=options.keys())
+            for cls in options.values():
+                selector_helper(cls, parser, prefix + name + ".", already_added)
+
+def parse_selected(parser: ArgumentParser, schema: Type[Config], selections: Dict[str, str], args: List[str]) -> Dict[str, Any]:
+    '''
+    Parses args with a parser made for the given selections (the second
+    parsing phase). Flags of options that are not selected are reported
+    together with the options that declare them.
+    '''
+    parsed, unknown = parser.parse_known_args(args)
+    if len(unknown) > 0:
+        owners = []
+        for arg in unknown:
+            path = arg[2:].split("=", 1)[0] if arg.startswith("--") else None
+            for multi_path, option in option_owners(schema, path) if path else []:
+                owners.append(f"{arg} belongs to option {option} of {multi_path}, but {selections.get(multi_path)} is selected")
+        if len(owners) > 0:
+            parser.error("; ".join(owners))
+        parser.error("unrecognized arguments: " + " ".join(unknown))
+    return vars(parsed)
 
-            for cls in field.type._options.values():
-                parse_helper(cls, parser, prefix + name + ".", already_added)
+def option_owners(schema: Type[Config], path: str, prefix: str = "") -> List[Tuple[str, str]]:
+    '''
+    Finds the MultiConfig options that declare the field at path, as
+    (MultiConfig path, option name) pairs.
+    '''
+    owners = []
+    info = schema_info(schema)
+    for name, child in info.children.items():
+        if not path.startswith(prefix + name + "."):
+            continue
+        if info.kinds[name] == CONFIG:
+            owners += option_owners(child, path, prefix + name + ".")
         else:
-            add_to_parser("--" + prefix + name, field.type, parser, already_added)
+            for option, cls in schema_info(child).options.items():
+                if path in schema_fields(cls, prefix + name + "."):
+                    owners.append((prefix + name, option))
+    return owners
 
 def add_to_parser(field_name: str, field_type: Type[Any], parser: ArgumentParser, already_added: Set, choices=None):
     # Necessary to check if an argument is already added because of different MultiConfig branches converging to the same field_name
@@ -31,3 +104,61 @@ def add_to_parser(field_name: str, field_type: Type[Any], parser: ArgumentParser
 
     parser.add_argument(field_name, type=field_type, choices=choices, default=None)
     already_added.add(field_name)
+
+def schema_fields(schema: Type[Config], prefix: str = "", fields: Optional[Dict[str, Set[Type[Any]]]] = None) -> Dict[str, Set[Type[Any]]]:
+    '''
+    Collects the declared types of every field that can be set from the
+    command line, by path, the same way parse_helper adds them to the parser.
+    A path can have several types if MultiConfig options declare it
+    differently. MultiConfig paths have type str (the selected option).
+    '''
+    fields = {} if fields is None else fields
+    info = schema_info(schema)
+    for name, kind in info.kinds.items():
+        if kind == CONFIG:
+            schema_fields(info.types[name], prefix + name + ".", fields)
+        elif kind == MULTI:
+            fields.setdefault(prefix + name, set()).add(info.types[name])
+            for cls in schema_info(info.types[name]).options.values():
+                schema_fields(cls, prefix + name + ".", fields)
+        else:
+            fields.setdefault(prefix + name, set()).add(info.types[name])
+    return fields
+
+def check_overrides(fields: Dict[str, Set[Type[Any]]], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Type checks values set from Python against the declared types of their
+    fields, in place of parsing command line arguments. Ints are accepted
+    (and converted) for float fields, and fields with types that cannot be
+    checked with isinstance (e.g. List[int]) accept anything. Overrides that
+    are None are left out, like arguments that were not passed.
+
+            Parameters:
+                    fields (Dict[str, Set[Type[Any]]]): Field types by path, as
+                        returned by schema_fields
+                    overrides (Dict[str, Any]): Values by field path
+
+            Returns:
+                    args (Dict[str, Any]): Overrides in the form of parsed
+                        command line arguments
+    '''
+    args = {}
+    for path, value in overrides.items():
+        if not path in fields:
+            raise InvalidPathException(f"Override {path} is not a field that can be set.")
+        if value is None:
+            continue
+
+        for field_type in fields[path]:
+            if isinstance(field_type, type) and issubclass(field_type, MultiConfig):
+                if isinstance(value, str) and value in field_type._options:
+                    break
+            elif not isinstance(field_type, type) or isinstance(value, field_type):
+                break
+            elif field_type is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+                break
+        else:
+            raise InvalidOverrideException(f"Override {path}={value!r} does not match the type of the field ({', '.join(str(t) for t in fields[path])}).")
+        args[path] = value
+    return args
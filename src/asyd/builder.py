@@ -1,29 +1,29 @@
-from typing import Type, TypeVar, Dict, List, Callable, Union, Optional
+from typing import Type, TypeVar, Dict, List, Tuple, Set, Iterable, Union, Optional, Generic, Any, Hashable
 from argparse import ArgumentParser
-from .config import Config, MultiConfig, ConfigRef, validate_refs
+from .config import Config, MultiConfig, ConfigRef, validate_refs, schema_info, path_parts, CONFIG, MULTI
 from .config_utils import MV
-from .dependencies import generate_acyclic_traveral
-from .argparsing import parse
-from .exceptions import EverythingHasBrokenException, RedundantDefaultException, InvalidDefaultFileException, InvalidLoadedConfigException
+from .dependencies import DependencyGraph, DefaultDependencies
+from .argparsing import make_parser, make_selector_parser, parse_selected, schema_fields, check_overrides
+from .cache import DefaultsCache, LRUCache, load_yaml
+from .queries import CompiledQuery, is_query, split_query_key, query_target, query_dependencies, compile_defaults_tree, schema_field_types
+from .tracing import span, count
+from .loading import YAML_EXTS, DefaultsLoader, LazyOptionTrees, OverlayTree, Manifest, discover_defaults_files, preload_defaults_files
+from .bundle import is_bundle, read_bundle, write_bundle
+from .frozen import FrozenDict, FrozenList
+from .exceptions import EverythingHasBrokenException, RedundantDefaultException, InvalidDefaultFileException, InvalidLoadedConfigException, InvalidPathException
 from pathlib import Path
-import yaml
+import copy
+import heapq
+import json
+import sys
 import warnings
 
 
-YAML_EXTS: List[int] = [".yml", ".yaml"]
-QUERY_OPS: Dict[str, Callable[[str, str], bool]] = {
-    "=": lambda target_val, x: target_val == x,
-    "!=": lambda target_val, x: target_val != x,
-    ">": lambda target_val, x: target_val > x,
-    "<": lambda target_val, x: target_val < x,
-    ">=": lambda target_val, x: target_val >= x,
-    "<=": lambda target_val, x: target_val <= x,
-    # TO-DO: Add more
-}
+DEFAULTS_MEMO_SIZE = 1024
 
 
 T = TypeVar("T", bound=Config)
-def build(base_schema: Type[T], directory: str,  parser: Optional[ArgumentParser] = None, args: List[str] = [], load_path: str = None) -> T:
+def build(base_schema: Type[T], directory: str,  parser: Optional[ArgumentParser] = None, args: List[str] = [], load_path: str = None, cache: Optional[DefaultsCache] = None, workers: Optional[int] = None, use_processes: bool = False, overrides: Optional[Dict[str, Any]] = None) -> T:
     '''
     This is the main function that calls everything else. Validates the
     references in a schema (a class that inherits from Config), generates a
@@ -34,81 +34,614 @@ def build(base_schema: Type[T], directory: str,  parser: Optional[ArgumentParser
 
             Parameters:
                     base_schema (Type[T]): Schema to be built
-                    directory (str): Directory holding defaults for base_schema
+                    directory (str): Directory holding defaults for base_schema,
+                        or a bundle packed from one with pack_bundle
+                    cache (Optional[DefaultsCache]): Persistent cache of parsed
+                        defaults files
+                    workers (Optional[int]): Parse defaults files with this
+                        many threads (or processes if use_processes is set)
+                    overrides (Optional[Dict[str, Any]]): Values by field path
+                        to use instead of (or on top of) command line
+                        arguments, skipping argparse if no args are given
 
             Returns:
                     config (T): Initialized base_schema with values filled in
     '''
 
-    # Validate schemas and their dependencies
-    validate_refs(base_schema)
+    return compile(base_schema, directory, parser, cache, workers, use_processes).build(args, load_path, overrides)
 
-    print(base_schema)
 
-    # Get command line args
-    args = parse(base_schema, parser, args)
+def compile(base_schema: Type[T], directory: str, parser: Optional[ArgumentParser] = None, cache: Optional[DefaultsCache] = None, workers: Optional[int] = None, use_processes: bool = False, memo_size: int = DEFAULTS_MEMO_SIZE, manifest: Optional[Manifest] = None) -> "BuildPlan[T]":
+    '''
+    Does all of the work in build that only depends on the schema and the
+    configuration directory and returns it as a BuildPlan. Calling build on the
+    returned plan is equivalent to calling build with the same arguments, but
+    can be done repeatedly without validating, parsing or ordering anything
+    again.
 
-    # Load config if provided
-    load_path = args["load_path"] if load_path is None else load_path
-    loaded_config = None
-    if not load_path is None:
-        path = Path(load_path)
-        if not path.exists():
-            raise FileNotFoundError(f"Load path {load_path} does not exist.")
-        if path.is_dir():
-            raise IsADirectoryError(f"Load path {load_path} should be a yaml file but it is a directory.")
+            Parameters:
+                    base_schema (Type[T]): Schema to be built
+                    directory (str): Directory holding defaults for base_schema
+                    parser (Optional[ArgumentParser]): Parser to add the schema
+                        arguments to
+                    cache (Optional[DefaultsCache]): Persistent cache of parsed
+                        defaults files, saved after the directory is read
+                    workers (Optional[int]): Find all defaults files first,
+                        then parse them with this many threads (or processes if
+                        use_processes is set). Parsed serially if None.
+                    use_processes (bool): Parse in a process pool
+                    memo_size (int): Number of resolved defaults of individual
+                        configs to remember across builds, 0 to disable
+                    manifest (Optional[Manifest]): Listing of directory, e.g.
+                        the manifest of an earlier plan, scanned if None
 
-        with path.open() as f:
-            loaded_config = yaml.load(f, Loader=yaml.CLoader)
+            Returns:
+                    plan (BuildPlan[T]): Reusable plan for building base_schema
+    '''
 
-    # Check provided directory
-    path = Path(directory)
-    if not path.is_dir():
-        raise NotADirectoryError("Provided configuration base directory {} is not a folder.".format(directory))
+    with span("compile"):
+        return BuildPlan(base_schema, directory, parser, cache, workers, use_processes, memo_size, manifest=manifest)
 
-    # Build defaults tree
-    defaults_tree = build_defaults_tree(base_schema, path)
 
-    # Ensure dependencies are not cyclic and create build order
-    build_order = generate_acyclic_traveral(base_schema)
+def pack_bundle(base_schema: Type[T], directory: str, path: Union[str, Path], cache: Optional[DefaultsCache] = None) -> None:
+    '''
+    Packs a configuration directory into a single bundle file holding the
+    merged defaults tree (including the trees of every MultiConfig option) and
+    the manifest of the directory. Passing the bundle to build or compile in
+    place of the directory reads it with one sequential read and builds
+    exactly the same configs. The bundle records the fingerprint of
+    base_schema and cannot be used with a different version of the schema.
 
-    # Build config
-    config = base_schema()
+            Parameters:
+                    base_schema (Type[T]): Schema to be built from the bundle
+                    directory (str): Directory holding defaults for base_schema
+                    path (Union[str, Path]): Bundle file, conventionally
+                        ending in .asyd (required to build from it)
+                    cache (Optional[DefaultsCache]): Persistent cache of parsed
+                        defaults files
+    '''
+    compile(base_schema, directory, cache=cache).save_bundle(path)
 
-    for schema_path in build_order:
-        build_config(config, defaults_tree, schema_path, path, args, loaded_config=None if loaded_config is None else get_loaded_config(loaded_config, schema_path))
 
-    return config
+class BuildPlan(Generic[T]):
+    '''
+    Validated references, build order, argument parser and defaults tree for a
+    schema and configuration directory. Only command line arguments and loaded
+    configs are handled per call to build. The directory is read once, when the
+    plan is created, so a plan should be recompiled if its defaults change.
+
+    The resolved defaults of each config are remembered in defaults_memo,
+    keyed by their schema path, MultiConfig selections and the values of their
+    dependencies, so configs whose dependencies did not change between builds
+    do not evaluate their queries again.
+    '''
 
+    def __init__(self, base_schema: Type[T], directory: str, parser: Optional[ArgumentParser] = None, cache: Optional[DefaultsCache] = None, workers: Optional[int] = None, use_processes: bool = False, memo_size: int = DEFAULTS_MEMO_SIZE, loader: Optional[DefaultsLoader] = None, manifest: Optional[Manifest] = None):
+        self.base_schema = base_schema
+
+        # Validate schemas and their dependencies
+        with span("validate_refs"):
+            self.default_dependencies = validate_refs(base_schema)
+
+        # Check provided directory, which can also be a bundle packed from one
+        self.directory = Path(directory)
+        self.bundle: Optional[Path] = self.directory if is_bundle(self.directory) else None
+        if self.bundle is None and not self.directory.is_dir():
+            raise NotADirectoryError("Provided configuration base directory {} is not a folder.".format(directory))
+
+        # The parser for command line args is only created once it is needed, since overrides do not need it
+        self._parser: Optional[ArgumentParser] = None
+        self._custom_parser = parser
+        self._selector_parser: Optional[ArgumentParser] = None
+        self._selected_parsers: Dict[Tuple[Tuple[str, str], ...], ArgumentParser] = {}
+        self.fields = schema_fields(base_schema)
+
+        # Build defaults tree
+        ref_schemas = {ref.path: ref.schema for refs in self.default_dependencies.values() for ref in refs}
+        self.field_types = schema_field_types(ref_schemas)
+        if self.bundle is not None:
+            with span("read_bundle"):
+                self.manifest, self.raw_defaults_tree = read_bundle(base_schema, self.bundle)
+        else:
+            # The directory is listed once and the listing is kept in manifest
+            if manifest is None:
+                with span("scan_directory"):
+                    manifest = Manifest.scan(self.directory)
+            self.manifest = manifest
+
+            # Files are parsed by a given loader, or through the cache, or ahead of time by workers
+            loader = cache if loader is None else loader
+            if workers is not None and loader is cache:
+                with span("preload_defaults_files", workers=workers):
+                    loader = preload_defaults_files(discover_defaults_files(base_schema, self.directory, manifest=manifest), workers, use_processes, cache)
+            with span("build_defaults_tree"):
+                self.raw_defaults_tree = build_defaults_tree(base_schema, self.directory, loader, manifest)
+        with span("compile_defaults_tree"):
+            self.defaults_tree = compile_defaults_tree(self.raw_defaults_tree, self.field_types)
+        if cache is not None:
+            cache.save()
+
+        # Ensure dependencies are not cyclic and create build order
+        with span("generate_acyclic_traveral"):
+            self.dependency_graph = DependencyGraph(base_schema, self.default_dependencies)
+            self.build_levels = self.dependency_graph.levels()
+        self.build_order = [schema_path for level in self.build_levels for schema_path in level]
+        self.split_paths = {schema_path: path_parts(schema_path) for schema_path in self.build_order}
+        self.build_positions = {schema_path: i for i, schema_path in enumerate(self.build_order)}
+        self._selected_orders: Dict[Tuple[Tuple[str, str], ...], List[str]] = {}
+
+        self.defaults_memo: Optional[LRUCache] = LRUCache(memo_size) if memo_size > 0 else None
+
+    @property
+    def parser(self) -> ArgumentParser:
+        if self._parser is None:
+            self._parser = make_parser(self.base_schema, self._custom_parser)
+        return self._parser
+
+    def build(self, args: List[str] = [], load_path: str = None, overrides: Optional[Dict[str, Any]] = None) -> T:
+        '''
+        Initializes and fills a new config object from the plan's defaults and
+        the provided command line arguments.
+
+                Parameters:
+                        args (List[str]): Command line arguments
+                        load_path (str): Config file to load values from,
+                            overrides --load_path
+                        overrides (Optional[Dict[str, Any]]): Values by field
+                            path, set like command line arguments but type
+                            checked against the schema instead of parsed. If
+                            no args are given, argparse is skipped entirely.
+
+                Returns:
+                        config (T): Initialized base_schema with values filled in
+        '''
+
+        with span("build"):
+            # Get command line args
+            loaded_config = None
+            if overrides is not None and len(args) < 1:
+                parsed_args = {}
+            else:
+                with span("parse"):
+                    parsed_args, loaded_config = self.parse_args(args, load_path)
+            if overrides is not None:
+                parsed_args.update(self.check_overrides(overrides))
+
+            # The config file is only loaded here if parsing did not already need it
+            if loaded_config is None:
+                return self.build_from_args(parsed_args, load_path)
+            return self._build(parsed_args, loaded_config)
+
+    def parse_args(self, args: List[str], load_path: str = None) -> Tuple[Dict[str, Any], Optional[Dict]]:
+        '''
+        Parses command line arguments in two phases. The first phase only reads
+        the flags that select MultiConfig options (and --load_path), and the
+        second only knows the fields of the selected options, so parsing and
+        --help scale with what is selected rather than with every option of
+        every MultiConfig. Fields of options that are not selected are None in
+        the result, as with a single parser for the whole schema. A plan with
+        a custom parser is parsed in one phase.
+
+                Parameters:
+                        args (List[str]): Command line arguments
+                        load_path (str): Config file to load values from,
+                            overrides --load_path
+
+                Returns:
+                        args (Dict[str, Any]): Parsed arguments by field path
+                        loaded_config (Optional[Dict]): The loaded config file,
+                            if one was needed to decide selections
+        '''
+        if self._custom_parser is not None:
+            return vars(self.parser.parse_args(args)), None
+
+        if self._selector_parser is None:
+            self._selector_parser = make_selector_parser(self.base_schema)
+        selector_args = vars(self._selector_parser.parse_known_args(args)[0])
+
+        load_path = selector_args.get("load_path") if load_path is None else load_path
+        if load_path is None:
+            loaded_config = None
+        else:
+            with span("load_path"):
+                loaded_config = load_config_file(load_path)
+        selections = select_options(self.base_schema, selector_args, loaded_config)
+
+        key = tuple(sorted(selections.items()))
+        if not key in self._selected_parsers:
+            self._selected_parsers[key] = make_parser(self.base_schema, selections=selections)
+        parsed_args = parse_selected(self._selected_parsers[key], self.base_schema, selections, args)
+        for path in self.fields.keys():
+            parsed_args.setdefault(path, None)
+        return parsed_args, loaded_config
+
+    def check_overrides(self, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        '''
+        Type checks overrides against the schema, see argparsing.check_overrides.
+        '''
+        return check_overrides(self.fields, overrides)
+
+    def build_from_args(self, args: Dict, load_path: str = None) -> T:
+        '''
+        Same as build, but takes arguments that were already parsed by the
+        plan's parser (a dictionary from field paths to values).
+        '''
+
+        # Load config if provided
+        load_path = args.get("load_path") if load_path is None else load_path
+        if load_path is None:
+            loaded_config = None
+        else:
+            with span("load_path"):
+                loaded_config = load_config_file(load_path)
+
+        return self._build(args, loaded_config)
+
+    def _build(self, args: Dict, loaded_config: Optional[Dict]) -> T:
+        # Decide MultiConfig selections first so that only the selected options are built and read
+        selections = select_options(self.base_schema, args, loaded_config)
+
+        # Group arguments and loaded values by schema path once instead of searching them for every config
+        args_index = index_args(args)
+        loaded_index = None if loaded_config is None else index_loaded_config(loaded_config)
+
+        # Build config
+        config = self.base_schema()
+
+        build_order = self.selected_build_order(selections)
+        built = set()
+        decided: Dict[str, str] = {}
+        i = 0
+        while i < len(build_order):
+            schema_path = build_order[i]
+            i += 1
+            if loaded_index is not None and not schema_path in loaded_index:
+                raise InvalidLoadedConfigException(f"Loaded config does not contain {schema_path}.")
+            with span("build_config", path=schema_path):
+                build_config(config, self.defaults_tree, schema_path, self.directory, args,
+                             loaded_config=None if loaded_index is None else loaded_index[schema_path],
+                             default_dependencies=self.default_dependencies, defaults_memo=self.defaults_memo,
+                             local_args=args_index.get(schema_path, {}))
+            built.add(schema_path)
+
+            # Defaults (e.g. of a query) can select another option than the one assumed, which changes what is left to build
+            selected = built_selections(config, schema_path, self.split_paths[schema_path])
+            decided.update(selected)
+            if any(selections.get(path) != option for path, option in selected.items()):
+                selections = select_options(self.base_schema, args, loaded_config, decided=decided)
+                build_order = [p for p in self.selected_build_order(selections) if not p in built]
+                i = 0
+
+        return config
+
+    def selected_build_order(self, selections: Dict[str, str]) -> List[str]:
+        '''
+        Returns the build order without the configs that belong to options of
+        MultiConfigs that are not selected.
+
+                Parameters:
+                        selections (Dict[str, str]): Selected option for each
+                            MultiConfig path, as returned by select_options
+
+                Returns:
+                        build_order (List[str]): Paths of the configs to build
+        '''
+        key = tuple(sorted(selections.items()))
+        if not key in self._selected_orders:
+            self._selected_orders[key] = [p for p in self.build_order if is_selected_path(self.base_schema, self.split_paths[p], selections)]
+        return self._selected_orders[key]
+
+    def rebuild(self, config: T, changes: Dict[str, Any]) -> List[str]:
+        '''
+        Sets fields of a config built from this plan and recomputes only the
+        configs whose defaults depend on them, directly or transitively,
+        instead of building from scratch. The changed fields count as
+        explicitly set from then on, and explicitly set values (from arguments
+        or a loaded config) always win over defaults. Changing the selection
+        of a MultiConfig builds the newly selected option from its defaults,
+        keeping the explicitly set values of fields that the old and new
+        options declare with the same type. Selecting the option that is
+        already selected changes nothing.
+
+                Parameters:
+                        config (T): Config built by this plan, modified in place
+                        changes (Dict[str, Any]): New values by field path (e.g.
+                            "nested_config_a.field_a"), type checked like
+                            the overrides of build. None values are ignored.
+
+                Returns:
+                        changed (List[str]): Paths of every field whose value
+                            changed, including the fields in changes and the
+                            fields of newly selected options
+        '''
+
+        changed = []
+        changed_configs = set()
+        for field_path, value in self.check_overrides(changes).items():
+            config_path, _, field = field_path.rpartition(".")
+            target = find_config(config, path_parts(config_path))
+            target_info = None if target is None else schema_info(target.__class__)
+            if target_info is None or not field in target_info.kinds:
+                raise InvalidPathException(f"Cannot change {field_path}, it is not a field of the built config.")
+
+            kind = target_info.kinds[field]
+            if kind == CONFIG:
+                raise InvalidPathException(f"Cannot change {field_path} directly, it is a nested config. Change its fields instead.")
+
+            kept = {}
+            if kind == MULTI:
+                current = getattr(target, field)
+                if isinstance(current, MultiConfig) and current._selected == value:
+                    # The option stays as it is, values set explicitly in it included
+                    target._explicit_fields = getattr(target, "_explicit_fields", set()) | {field}
+                    changed.append(field_path)
+                    continue
+
+                # Explicitly set values of the old option are kept for the fields the new option declares the same way
+                for schema_path in self.build_order:
+                    if schema_path == field_path or schema_path.startswith(field_path + "."):
+                        old = find_config(config, self.split_paths[schema_path])
+                        if old is not None:
+                            old_info = schema_info(old.__class__)
+                            kept[schema_path] = {f: (old_info.types[f], getattr(old, f)) for f in getattr(old, "_explicit_fields", set()) if f in old_info.leaves}
+                value = target_info.types[field](value)
+
+            setattr(target, field, value)
+            target._explicit_fields = getattr(target, "_explicit_fields", set()) | {field}
+            changed.append(field_path)
+            changed_configs.add(config_path)
+
+            if kind == MULTI:
+                # The new option (and everything nested in it) is built from scratch
+                for schema_path in self.build_order:
+                    if schema_path == field_path or schema_path.startswith(field_path + "."):
+                        built = find_config(config, self.split_paths[schema_path])
+                        if built is not None:
+                            build_config(config, self.defaults_tree, schema_path, self.directory, {}, None,
+                                         default_dependencies=self.default_dependencies, defaults_memo=self.defaults_memo)
+                            built_info = schema_info(built.__class__)
+                            for f, (f_type, v) in kept.get(schema_path, {}).items():
+                                if f in built_info.leaves and built_info.types[f] == f_type:
+                                    setattr(built, f, v)
+                                    built._explicit_fields.add(f)
+                            changed_configs.add(schema_path)
+                            changed += [schema_path + "." + f for f, k in built_info.kinds.items() if k != CONFIG]
+
+        return changed + self.propagate(config, changed_configs)
+
+    def refresh(self, config: T, schema_paths: Iterable[str]) -> List[str]:
+        '''
+        Recomputes the defaults of the configs at schema_paths, and of every
+        config that depends on them, in a config built from this plan. Use this
+        after the defaults tree changed, e.g. with reload_defaults.
+
+                Parameters:
+                        config (T): Config built by this plan, modified in place
+                        schema_paths (Iterable[str]): Paths of configs whose
+                            defaults changed
+
+                Returns:
+                        changed (List[str]): Paths of every field whose value
+                            changed
+        '''
+        return self.propagate(config, set(), set(schema_paths))
+
+    def propagate(self, config: T, changed_configs: Set[str], stale_paths: Optional[Set[str]] = None) -> List[str]:
+        stale_paths = set() if stale_paths is None else set(stale_paths)
+        changed = []
+
+        # Only the dependents of changed configs are visited, in build order so each is refreshed after its dependencies
+        pending = [(self.build_positions[p], p) for p in stale_paths.union(*(self.dependency_graph.dependents[c] for c in changed_configs))]
+        heapq.heapify(pending)
+        visited = set(p for _, p in pending)
+        while len(pending) > 0:
+            _, schema_path = heapq.heappop(pending)
+            if find_config(config, self.split_paths[schema_path]) is None:
+                continue
+
+            fields = refresh_config(config, self.defaults_tree, schema_path, self.default_dependencies, self.defaults_memo)
+            if len(fields) > 0:
+                changed += [f if schema_path == "" else schema_path + "." + f for f in fields]
+                for dependent in self.dependency_graph.dependents[schema_path]:
+                    if not dependent in visited:
+                        visited.add(dependent)
+                        heapq.heappush(pending, (self.build_positions[dependent], dependent))
+
+        return changed
+
+    def reload_defaults(self, loader: Optional[DefaultsLoader] = None, config: Optional[T] = None) -> List[str]:
+        '''
+        Scans and reads the configuration directory (or bundle) again and
+        replaces the plan's manifest and defaults tree. Pass a DefaultsCache
+        as loader to only parse the files that changed.
+
+                Parameters:
+                        loader (Optional[DefaultsLoader]): Loads parsed
+                            defaults files
+                        config (Optional[T]): Config built by this plan. If
+                            provided, the paths of the configs whose own
+                            defaults changed are returned (following its
+                            MultiConfig selections).
+
+                Returns:
+                        schema_paths (List[str]): Paths of the configs whose
+                            defaults changed, or an empty list if no config
+                            was provided
+        '''
+        if self.bundle is not None:
+            manifest, raw_tree = read_bundle(self.base_schema, self.bundle)
+        else:
+            with span("scan_directory"):
+                manifest = Manifest.scan(self.directory)
+            raw_tree = build_defaults_tree(self.base_schema, self.directory, loader, manifest)
+
+        # Compiled before anything is replaced, so that a tree with invalid queries leaves the plan as it was
+        defaults_tree = compile_defaults_tree(raw_tree, self.field_types)
+
+        stale_paths = []
+        if config is not None:
+            for schema_path in self.build_order:
+                target = find_config(config, self.split_paths[schema_path])
+                if target is not None and local_defaults(target, defaults_at(self.raw_defaults_tree, config, self.split_paths[schema_path])) \
+                        != local_defaults(target, defaults_at(raw_tree, config, self.split_paths[schema_path])):
+                    stale_paths.append(schema_path)
+
+        self.manifest = manifest
+        self.raw_defaults_tree = raw_tree
+        self.defaults_tree = defaults_tree
+        if self.defaults_memo is not None:
+            self.defaults_memo.clear()  # Memoized defaults were resolved from the old tree
+
+        return stale_paths
+
+    def save_bundle(self, path: Union[str, Path]) -> None:
+        '''
+        Packs the plan's defaults tree and manifest into a bundle file, see
+        pack_bundle.
+        '''
+        write_bundle(self.base_schema, self.manifest, self.raw_defaults_tree, path)
+
+def select_options(schema: Type[Config], args: Dict, loaded_config: Optional[Dict], prefix: str = "", decided: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    '''
+    Decides the selected option of every MultiConfig that will be built from
+    command line arguments first, then from the loaded config, and otherwise
+    the first option. Only MultiConfigs in selected options are included.
+    Defaults can also select options, like any other default value, but those
+    selections are only known once the config holding the MultiConfig is
+    built, and are passed back in as decided.
+
+            Parameters:
+                    schema (Type[Config]): Schema to decide selections in
+                    args (Dict): Command line arguments
+                    loaded_config (Optional[Dict]): Loaded config at schema
+                    prefix (str): Path of schema
+                    decided (Optional[Dict[str, str]]): Selections already
+                        made in a built config, which take precedence
 
-def build_defaults_tree(schema: Type[T], dir: Path):
+            Returns:
+                    selections (Dict[str, str]): Selected option for each
+                        MultiConfig path
+    '''
+    selections = {}
+    info = schema_info(schema)
+    for name, child in info.children.items():
+        path = prefix + name
+        loaded = loaded_config.get(name) if isinstance(loaded_config, dict) else None
+        if info.kinds[name] == CONFIG:
+            selections.update(select_options(child, args, loaded, path + ".", decided))
+        else:
+            options = schema_info(child).options
+            selected = None if decided is None else decided.get(path)
+            if selected is None:
+                selected = args.get(path)
+            if selected is None and isinstance(loaded, dict):
+                selected = loaded.get("_selected")
+            if selected is None:
+                selected = next(iter(options.keys()))
+            selections[path] = selected
+
+            if selected in options:
+                selections.update(select_options(options[selected], args, loaded, path + ".", decided))
+    return selections
+
+def built_selections(base_config: Config, schema_path: str, split_path: List[str]) -> Dict[str, str]:
+    '''
+    Returns the selected option of every MultiConfig field of the built config
+    at schema_path, by path.
+    '''
+    config = find_config(base_config, split_path)
+    prefix = "" if schema_path == "" else schema_path + "."
+    selections = {}
+    for name in schema_info(config.__class__).children.keys():
+        value = getattr(config, name, MV)
+        if isinstance(value, MultiConfig):
+            selections[prefix + name] = value._selected
+    return selections
+
+def is_selected_path(schema: Type[Config], schema_path: List[str], selections: Dict[str, str]) -> bool:
+    '''
+    Checks whether schema_path leads to a config given the MultiConfig
+    selections, i.e. it does not go through an option that is not selected.
+    '''
+    path = ""
+    for field in schema_path:
+        info = schema_info(schema)
+        if not field in info.children:
+            return False
+        schema = info.children[field]
+        path += field
+        if info.kinds[field] == MULTI:
+            schema = schema_info(schema).options.get(selections.get(path))
+            if schema is None:
+                return False
+        path += "."
+    return True
+
+def load_config_file(load_path: str) -> Dict:
+    '''
+    Loads a config written by yamlize, jsonize or write_jsonl. A line of a
+    JSON lines file is selected with <file>.jsonl:<line index>.
+    '''
+    line = None
+    file_path, _, index = str(load_path).rpartition(":")
+    if file_path.endswith(".jsonl") and index.isdigit():
+        load_path, line = file_path, int(index)
+
+    path = Path(load_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Load path {load_path} does not exist.")
+    if path.is_dir():
+        raise IsADirectoryError(f"Load path {load_path} should be a yaml file but it is a directory.")
+
+    if path.suffix == ".json":
+        with path.open() as f:
+            return json.load(f)
+    if path.suffix == ".jsonl":
+        with path.open() as f:
+            for i, l in enumerate(f):
+                if i == (line or 0):
+                    return json.loads(l)
+        raise InvalidLoadedConfigException(f"Load path {load_path} does not have a line {line or 0}.")
+    return load_yaml(path)
+
+
+def build_defaults_tree(schema: Type[T], dir: Path, loader: Optional[DefaultsLoader] = None, manifest: Optional[Manifest] = None, interned: Optional[Dict[Tuple, Any]] = None):
     '''
     Builds the defaults tree for a schema with a corresponding directory. First
     parses the defaults.yaml file and the defaults folder and merges them, then
     recursively builds defaults trees for nested configs and merges the original
     tree with them. In the case of a multiconfig, defaults from the parent
-    directory get copied to all the option directories.
+    directory are shared by all the option directories, each option's tree
+    being an OverlayTree over them. The trees of the options are
+    LazyOptionTrees, built only when an option is selected.
 
             Parameters:
                     schema (Type[T]): The schema to build the defaults tree for
                     dir (Path): The directory corresponding to the schema
+                    loader (Optional[DefaultsLoader]): Loads parsed defaults
+                        files, e.g. a DefaultsCache or PreloadedFiles
+                    manifest (Optional[Manifest]): Listing of dir, scanned if
+                        not provided
+                    interned (Optional[Dict[Tuple, Any]]): Values shared by
+                        the whole tree, see intern_values. A new table is
+                        started if None.
 
             Returns:
                     tree (Dict): The constructed defaults tree
 
     '''
-    tree = {}
-    if not dir.exists():
-        return tree
+    if manifest is None:
+        with span("scan_directory"):
+            manifest = Manifest.scan(dir)
+    interned = {} if interned is None else interned
 
-    possible_defaults_files = [dir / ("defaults" + ext) for ext in YAML_EXTS]
-    for df in possible_defaults_files:
-        if df.exists():
-            with open(df) as f:
-                tree = yaml.load(f, Loader=yaml.CLoader)
-            break
+    tree = {}
+    df = manifest.defaults_file()
+    if df is not None:
+        tree = load_defaults_file(df, loader, interned)
 
-    folder_tree = parse_defaults_dir(dir / "defaults") if (dir / "defaults").exists() else {}
+    folder = manifest.dir("defaults")
+    folder_tree = parse_defaults_dir(folder.path, loader, folder, interned) if folder is not None else {}
     if len(tree) < 1:
         tree = folder_tree
     elif len(folder_tree) < 1:
@@ -116,64 +649,124 @@ def build_defaults_tree(schema: Type[T], dir: Path):
     else:
         merge_defaults_trees(tree, folder_tree, override=True) # override to maintain standard of more nested folders have higher priority
 
-    if issubclass(schema, MultiConfig):
+    info = schema_info(schema)
+    if info.is_multi:
         parent_tree = tree
-        tree = {}
 
-        # Parse individual option schemas and copy parent schema into each
-        for option, option_schema in schema._options.items():
-            tree[option] = build_defaults_tree(option_schema, dir / option)
-            merge_defaults_trees(tree[option], parent_tree)
+        # Parse individual option schemas and layer each over the parent tree, but only once an option is selected
+        def build_option_tree(option: str) -> Dict:
+            option_manifest = manifest.dir(option) or Manifest(dir / option, [], {})
+            option_tree = build_defaults_tree(info.options[option], option_manifest.path, loader, option_manifest, interned)
+            return overlay_defaults_trees(option_tree, parent_tree)
+
+        tree = LazyOptionTrees(info.options.keys(), build_option_tree)
     else:
         # Recursively build tree for nested configs/folders and then merge
-        for field, v in schema.__dataclass_fields__.items():
-            if issubclass(v.type, Config) or issubclass(v.type, MultiConfig):
-                subdir = dir / field
-                if subdir.exists():
-                    subtree = build_defaults_tree(v.type, subdir)
-                    if field in tree:
-                        merge_defaults_trees(tree[field], subtree)
-                    else:
-                        tree[field] = subtree
+        for field, child in info.children.items():
+            subdir = manifest.dir(field)
+            if subdir is not None:
+                subtree = build_defaults_tree(child, subdir.path, loader, subdir, interned)
+                if field in tree and isinstance(subtree, LazyOptionTrees):
+                    field_tree = tree[field]
+                    tree[field] = subtree.map_trees(lambda option, option_tree, field=field, field_tree=field_tree: merge_option_trees(field_tree, field, option, option_tree))
+                elif field in tree:
+                    merge_defaults_trees(tree[field], subtree)
+                else:
+                    tree[field] = subtree
 
     return tree
 
-def parse_defaults_dir(dir: Path):
+def parse_defaults_dir(dir: Path, loader: Optional[DefaultsLoader] = None, manifest: Optional[Manifest] = None, interned: Optional[Dict[Tuple, Any]] = None):
     '''
     Parses a defaults directory into a single defaults tree/dictionary.
-    Basically just converts folder structure to dictionary structure.
+    Basically just converts folder structure to dictionary structure. Files and
+    folders become keys named after them (without the extension), except for
+    defaults files, whose contents are merged into the folder they are in.
 
             Parameters:
                     dir (Path): The defaults directory
+                    loader (Optional[DefaultsLoader]): Loads parsed defaults
+                        files, e.g. a DefaultsCache or PreloadedFiles
+                    manifest (Optional[Manifest]): Listing of dir, scanned if
+                        not provided
+                    interned (Optional[Dict[Tuple, Any]]): Values shared by
+                        the whole tree, see intern_values
 
             Returns:
                     tree (Dict): The constructed defaults tree
 
     '''
+    manifest = Manifest.scan(dir) if manifest is None else manifest
+    interned = {} if interned is None else interned
     d = {}
-    for f in dir.iterdir():
-        name = None
-
-        if f.is_dir():
-            name = f
-            d[name] = defaults_tree_from_dir(base_config, f)
+    for name, is_dir in manifest.entries:
+        f = dir / name
+        if is_dir:
+            merge_defaults_trees(d, {name: parse_defaults_dir(f, loader, manifest.dirs[name], interned)})
         else:
-            for ext in YAML_EXTS:
-                if str(f).endswith(ext):
-                    name = str(f).split(".")[0]
-                    with f.open() as file:
-                        if name in d:
-                            if name[-1] != "!":
-                                raise RedundantDefaultException(f"Field {name} appeared in the defaults tree multiple times. Use override (!) at the end of field name to allow.")
-                        else:
-                            d[name] = yaml.load(file, Loader=yaml.CLoader)
-                    break
+            ext = next((ext for ext in YAML_EXTS if name.endswith(ext)), None)
+            if ext is None:
+                warnings.warn(f"Unknown file {str(f)} found in defaults folder {dir}. Ignoring.")
+                continue
 
-            if name is None:
-                raise warnings.warn(f"Unknown file {str(f)} found in defaults folder {dir}. Ignoring.")
+            name = f.name[:-len(ext)]
+            file_tree = load_defaults_file(f, loader, interned)
+            merge_defaults_trees(d, file_tree if name == "defaults" else {name: file_tree})
 
     return d
 
+def merge_option_trees(tree: Dict, field: str, option: str, option_tree: Dict) -> Dict:
+    '''
+    Merges the tree of a MultiConfig option into the defaults given for that
+    option in the parent directory, like merge_defaults_trees does for nested
+    configs. Raises InvalidDefaultFileException if the parent directory does
+    not give the defaults of field as a dictionary by option.
+    '''
+    if not isinstance(tree, Dict):
+        raise InvalidDefaultFileException(f"Defaults of MultiConfig {field} must map option names to defaults, found {tree!r}.")
+    if not option in tree:
+        return option_tree
+    if not isinstance(tree[option], Dict):
+        raise InvalidDefaultFileException(f"Defaults of option {option} of MultiConfig {field} must be a dictionary, found {tree[option]!r}.")
+    merge_defaults_trees(tree[option], option_tree)
+    return tree[option]
+
+def load_defaults_file(path: Path, loader: Optional[DefaultsLoader] = None, interned: Optional[Dict[Tuple, Any]] = None):
+    data = load_yaml(path) if loader is None else loader.load(path)
+    return intern_values(data, {} if interned is None else interned)
+
+def intern_values(data: Any, interned: Dict[Tuple, Any], in_list: bool = False) -> Any:
+    '''
+    Replaces repeated values in parsed defaults with a single shared object,
+    across every file loaded with the same interned table (one per defaults
+    tree). Strings (keys and values) are interned with sys.intern, and other
+    immutable scalars equal to one seen earlier are replaced by that one.
+    Lists are frozen into FrozenLists, and dicts inside them into FrozenDicts,
+    which are shared when their items are the same objects. Other dicts are
+    modified in place and stay mutable, since they may be nodes of the
+    defaults tree that are merged later. copy_default copies frozen values
+    back into lists and dicts.
+    '''
+    if isinstance(data, (FrozenList, FrozenDict)):
+        return data  # Already interned, e.g. by a loader shared with another plan
+    elif isinstance(data, dict) and in_list:
+        items = tuple((sys.intern(k) if type(k) is str else k, intern_values(v, interned, True)) for k, v in data.items())
+        # Keyed by the identity of the (interned) items, so that e.g. 1 and 1.0 are not mistaken for one another
+        return interned.setdefault((FrozenDict, tuple((id(k), id(v)) for k, v in items)), FrozenDict(items))
+    elif isinstance(data, dict):
+        items = list(data.items())
+        data.clear()
+        for k, v in items:
+            data[sys.intern(k) if type(k) is str else k] = intern_values(v, interned)
+    elif isinstance(data, list):
+        frozen = FrozenList(intern_values(v, interned, True) for v in data)
+        return interned.setdefault((FrozenList, tuple(map(id, frozen))), frozen)
+    elif type(data) is str:
+        return sys.intern(data)
+    elif type(data) is int or (type(data) is float and data != 0.0):  # 0.0 and -0.0 are equal but not the same
+        return interned.setdefault((type(data), data), data)
+    return data
+
 def merge_defaults_trees(tree: Dict, new_tree: Dict, override=False):
     '''
     Merges new_tree into tree without overriding. Raises
@@ -200,7 +793,34 @@ def merge_defaults_trees(tree: Dict, new_tree: Dict, override=False):
             tree[k] = v
 
 
-def build_config(base_config: T, base_defaults_tree: Dict, schema_path: str, base_dir: Path, args: Dict, loaded_config: Optional[Dict]) -> None:
+def overlay_defaults_trees(tree: Dict, parent: Dict) -> OverlayTree:
+    '''
+    Layers tree over parent without copying parent, with the same result and
+    errors as merge_defaults_trees(tree, parent): a value that appears in both
+    must be marked as an override (!), in which case tree's value is kept, and
+    nested trees that appear in both are layered in turn.
+
+            Parameters:
+                    tree (Dict): Defaults tree of a MultiConfig option
+                    parent (Dict): Defaults tree of the MultiConfig
+
+            Returns:
+                    tree (OverlayTree): The layered tree
+    '''
+    own = {}
+    for k, v in tree.items():
+        if k in parent:
+            parent_v = parent[k]
+            if isinstance(v, Dict) and isinstance(parent_v, Dict):
+                v = overlay_defaults_trees(v, parent_v)
+            elif isinstance(v, LazyOptionTrees) and isinstance(parent_v, Dict):
+                v = v.map_trees(lambda option, option_tree, parent_v=parent_v: overlay_defaults_trees(option_tree, parent_v))
+            elif k[-1] != "!":
+                raise RedundantDefaultException(f"Field {k} appeared in the defaults tree multiple times. Use override (!) at the end of field name to allow.")
+        own[k] = v
+    return OverlayTree(own, parent)
+
+def build_config(base_config: T, base_defaults_tree: Dict, schema_path: str, base_dir: Path, args: Dict, loaded_config: Optional[Dict], default_dependencies: Optional[DefaultDependencies] = None, defaults_memo: Optional[LRUCache] = None, local_args: Optional[Dict] = None) -> None:
     '''
     Builds a single config object (and not any nested config objects) at a
     specified schema_path from the base schema using command line arguments and
@@ -217,52 +837,48 @@ def build_config(base_config: T, base_defaults_tree: Dict, schema_path: str, bas
                     base_dir (Path): Directory to base schema configuration
                         folder
                     args (Dict): Command line arguments
-
+                    loaded_config (Optional[Dict]): Loaded config at
+                        schema_path
+                    default_dependencies (Optional[DefaultDependencies]):
+                        Validated references for each schema, as returned by
+                        validate_refs. Falls back to _default_dependencies.
+                    defaults_memo (Optional[LRUCache]): Cache of resolved
+                        defaults, keyed by schema_path, the MultiConfig
+                        selections along it and the values of the
+                        dependencies. Must only ever be used with one
+                        base_defaults_tree.
+                    local_args (Optional[Dict]): Command line arguments of
+                        only this config, by field name, as indexed by
+                        index_args. Taken from args if not provided.
 
             Returns:
                     None
     '''
 
-    local_args = {}
-    for k, v in args.items():
-        if k.startswith(schema_path):
-            lk = k[len(schema_path):]
-            if len(lk) > 1:
-                lk = lk[1:] if lk.startswith(".") else lk
-                if not "." in lk:
-                    local_args[lk] = v
-    if "load_path" in local_args:
-        del local_args["load_path"]
-
-    config, defaults_tree = traverse_to_config(base_config, base_defaults_tree, [] if schema_path == "" else schema_path.split("."))
-
-    # Remove nested configs from defaults tree
-    local_defaults_tree = {}
-    for field, v in defaults_tree.items():
-        type = config.__dataclass_fields__[field].type
-        if not issubclass(type, Config) and not issubclass(type, MultiConfig):
-            local_defaults_tree[field] = v
+    if local_args is None:
+        local_args = index_args(args).get(schema_path, {})
 
-    dependencies = {r.path: get_config(base_config, [] if r.path == "" else r.path.split(".")) for r in config._default_dependencies}
-    defaults = {}
-    build_defaults(defaults, local_defaults_tree, dependencies)
+    split_path = path_parts(schema_path)
+    config, defaults_tree = traverse_to_config(base_config, base_defaults_tree, split_path)
 
-    # Execute overrides
-    for k, v in defaults.items():
-        if k[-1] == "!":
-            defaults[k[:-1]] = v
-            del defaults[k]
-
-    # Set default values in config based on defaults and args
-    for k in config.__dataclass_fields__.keys():
-        is_mc = issubclass(config.__dataclass_fields__[k].type, MultiConfig)
-        is_c = not is_mc and issubclass(config.__dataclass_fields__[k].type, Config)
+    defaults = get_defaults(base_config, config, defaults_tree, schema_path, split_path, default_dependencies, defaults_memo)
+
+    # Set default values in config based on defaults and args, remembering which values were set explicitly
+    explicit_fields = set()
+    info = schema_info(config.__class__)
+    for k, kind in info.kinds.items():
+        is_mc = kind == MULTI
+        is_c = kind == CONFIG
         val = MV
         no_val = False
 
+        if is_c:
+            continue  # Nested configs are built (or already were) at their own schema path
+
         # First, check command line args
-        if not is_c and not local_args[k] is None:
+        if not is_c and not local_args.get(k) is None:
             val = local_args[k]
+            explicit_fields.add(k)
         else:
             # Second, check loaded config
             if not loaded_config is None:
@@ -280,6 +896,7 @@ def build_config(base_config: T, base_defaults_tree: Dict, schema_path: str, bas
                             raise InvalidLoadedConfigException(f"Field {k} should be a MultiConfig but loaded config is not formatted properly for this (no nested data)")
                     else:
                         val = loaded_config[k]
+                    explicit_fields.add(k)
 
             # Third, check defaults
             elif k in defaults:
@@ -292,10 +909,184 @@ def build_config(base_config: T, base_defaults_tree: Dict, schema_path: str, bas
             if no_val:
                 pass
             else:
-                val = config.__dataclass_fields__[k].type(val)
+                val = info.types[k](val)
 
         setattr(config, k, val)
 
+    config._explicit_fields = explicit_fields
+
+def refresh_config(base_config: T, base_defaults_tree: Dict, schema_path: str, default_dependencies: Optional[DefaultDependencies] = None, defaults_memo: Optional[LRUCache] = None) -> List[str]:
+    '''
+    Recomputes the defaults of a single config object that was already built
+    with build_config, e.g. after one of its dependencies changed. Only fields
+    that were not set explicitly (by arguments, a loaded config or a rebuild)
+    are updated, and nested configs are left alone.
+
+            Parameters:
+                    base_config (T): Base config object that contains the
+                        config at schema_path
+                    base_defaults_tree (Dict): Base defaults tree
+                    schema_path (str): Path from the base schema to the target
+                        schema
+                    default_dependencies (Optional[DefaultDependencies]):
+                        Validated references for each schema
+                    defaults_memo (Optional[LRUCache]): Cache of resolved
+                        defaults, see build_config
+
+            Returns:
+                    changed (List[str]): Names of the fields whose value changed
+    '''
+
+    split_path = path_parts(schema_path)
+    config, defaults_tree = traverse_to_config(base_config, base_defaults_tree, split_path)
+    defaults = get_defaults(base_config, config, defaults_tree, schema_path, split_path, default_dependencies, defaults_memo)
+
+    changed = []
+    explicit_fields = getattr(config, "_explicit_fields", set())
+    for k in schema_info(config.__class__).leaves:
+        if k in explicit_fields:
+            continue
+
+        val = defaults[k] if k in defaults else MV
+        if getattr(config, k) != val:
+            setattr(config, k, val)
+            changed.append(k)
+
+    return changed
+
+def copy_default(val: Any) -> Any:
+    '''
+    Copies mutable default values, which are shared by every config a plan
+    builds, so that changing one built config does not change the defaults.
+    Lists and dicts frozen by intern_values are copied into lists and dicts.
+    '''
+    if isinstance(val, (list, FrozenList)):
+        return [copy_default(v) for v in val]
+    if isinstance(val, dict):
+        return {k: copy_default(v) for k, v in val.items()}
+    if isinstance(val, (set, tuple)):
+        return copy.deepcopy(val)
+    return val
+
+def get_defaults(base_config: T, config: Config, defaults_tree: Dict, schema_path: str, split_path: List[str], default_dependencies: Optional[DefaultDependencies] = None, defaults_memo: Optional[LRUCache] = None) -> Dict:
+    '''
+    Resolves the defaults of the config at schema_path from its defaults tree
+    and dependencies, or takes them from defaults_memo if they were already
+    resolved for the same selections and dependency values. The returned
+    dict and the mutable values in it are copies that the caller owns, since
+    the resolved defaults are shared with the defaults tree and the memo.
+    '''
+    refs = config._default_dependencies if default_dependencies is None else default_dependencies.get(config.__class__, set())
+    dependencies = {r.path: get_config(base_config, path_parts(r.path)) for r in refs}
+
+    memo_key = None
+    if defaults_memo is not None:
+        # Only the dependencies the queries compare against decide the defaults, not e.g. the parent of a MultiConfig option
+        queried = query_dependencies(defaults_tree)
+        try:
+            memo_key = (schema_path, path_selections(base_config, split_path), tuple(sorted((p, dependency_values(d)) for p, d in dependencies.items() if queried is None or p in queried)))
+            hash(memo_key)
+        except TypeError:
+            memo_key = None  # Dependency values that cannot be hashed are not memoized
+
+    hit, defaults = (False, None) if memo_key is None else defaults_memo.get(memo_key)
+    if not hit:
+        defaults = resolve_defaults(config, defaults_tree, dependencies)
+        if memo_key is not None:
+            defaults_memo.put(memo_key, defaults)
+    return {k: copy_default(v) for k, v in defaults.items()}
+
+def resolve_defaults(config: Config, defaults_tree: Dict, dependencies: Dict[str, Union[Config, MultiConfig]]) -> Dict:
+    '''
+    Determines the default value of each field of a single config object from
+    its defaults tree and already-built dependencies, with overrides applied.
+
+            Parameters:
+                    config (Config): Config object the defaults are for
+                    defaults_tree (Dict): Defaults tree at config
+                    dependencies (Dict[str, Union[Config, MultiConfig]])):
+                        References to the configs in _default_dependencies
+
+            Returns:
+                    defaults (Dict): Default value for each field that has one
+    '''
+
+    defaults = {}
+    build_defaults(defaults, local_defaults(config, defaults_tree), dependencies)
+
+    # Execute overrides
+    overrides = {k[:-1]: v for k, v in defaults.items() if k[-1] == "!"}
+    defaults = {k: v for k, v in defaults.items() if k[-1] != "!"}
+    defaults.update(overrides)
+    return defaults
+
+def local_defaults(config: Config, defaults_tree: Dict) -> Dict:
+    '''
+    Removes nested configs from a defaults tree, leaving the defaults and
+    queries of only config itself.
+    '''
+    local_defaults_tree = {}
+    children = schema_info(config.__class__).children
+    for field, v in defaults_tree.items():
+        if not field in children:
+            local_defaults_tree[field] = v
+    return local_defaults_tree
+
+def defaults_at(tree: Dict, config: Config, schema_path: List[str]) -> Dict:
+    '''
+    Traverses a defaults tree along schema_path, following the MultiConfig
+    selections in an already built config. Returns an empty tree if there are
+    no defaults at schema_path.
+    '''
+    for field in schema_path:
+        if isinstance(config, MultiConfig):
+            config = config._config
+        config = getattr(config, field)
+        tree = tree.get(field, {})
+        if isinstance(config, MultiConfig):
+            tree = tree.get(config._selected, {})
+    return tree
+
+def path_selections(config: Config, schema_path: List[str]) -> Tuple[str, ...]:
+    '''
+    Returns the selected option of every MultiConfig along schema_path.
+    '''
+    selections = []
+    for field in schema_path:
+        config = getattr(config, field)
+        if isinstance(config, MultiConfig):
+            selections.append(config._selected)
+            config = config._config
+    return tuple(selections)
+
+def dependency_values(config: Union[Config, MultiConfig]) -> Tuple:
+    '''
+    Returns a hashable snapshot of the values queries can compare against in a
+    dependency: its fields that are not nested configs and the selections of
+    MultiConfigs. Raises TypeError if a value cannot be made hashable.
+    '''
+    if isinstance(config, MultiConfig):
+        return (config._selected, dependency_values(config._config))
+
+    values = []
+    for k in schema_info(config.__class__).kinds.keys():
+        v = getattr(config, k)
+        if isinstance(v, MultiConfig):
+            values.append((k, v._selected))
+        elif not isinstance(v, Config):
+            values.append((k, hashable_value(v)))
+    return tuple(values)
+
+def hashable_value(v: Any) -> Hashable:
+    if isinstance(v, (list, tuple)):
+        return tuple(hashable_value(x) for x in v)
+    if isinstance(v, dict):
+        return tuple(sorted((k, hashable_value(x)) for k, x in v.items()))
+    if isinstance(v, set):
+        return frozenset(hashable_value(x) for x in v)
+    hash(v)
+    return v
+
 def traverse_to_config(config: Config, tree: Dict, schema_path: List[str]) -> (Config, Path):
     '''
     Traverses to a specified schema_path given a path through the nested schemas
@@ -325,11 +1116,13 @@ def traverse_to_config(config: Config, tree: Dict, schema_path: List[str]) -> (C
     next_path = schema_path[1:] if len(schema_path) > 1 else []
 
     if getattr(config, field) == MV:
-        cls = config.__dataclass_fields__[field].type
-        if issubclass(cls, Config):
+        info = schema_info(config.__class__)
+        cls = info.types[field]
+        kind = info.kinds[field]
+        if kind == CONFIG:
             setattr(config, field, cls())
-        elif issubclass(cls, MultiConfig):
-            setattr(config, field, cls(next(iter(cls._options.keys()))))
+        elif kind == MULTI:
+            setattr(config, field, cls(next(iter(schema_info(cls).options.keys()))))
             warnings.warn("Neither default nor manual option set for {}, automatically picking first option.".format(cls))
         else:
             raise EverythingHasBrokenException("Something has gone terribly wrong!")
@@ -366,9 +1159,66 @@ def get_config(config: Config, schema_path: List[str]) -> Config:
     if len(schema_path) < 1:
         return config
     field = schema_path[0]
+    if isinstance(config, MultiConfig):
+        config = config._config
 
     return get_config(getattr(config, field), schema_path[1:] if len(schema_path) > 1 else [])
 
+def find_config(config: Config, schema_path: List[str]) -> Optional[Config]:
+    '''
+    Like get_config, but returns None instead of failing if there is no built
+    config at schema_path, e.g. because it belongs to an option of a
+    MultiConfig that is not selected. MultiConfigs are unwrapped, so the
+    returned object is always a Config.
+    '''
+    for field in schema_path:
+        if isinstance(config, MultiConfig):
+            config = config._config
+        if not field in schema_info(config.__class__).kinds:
+            return None
+        config = getattr(config, field)
+        if not isinstance(config, (Config, MultiConfig)):
+            return None
+    return config._config if isinstance(config, MultiConfig) else config
+
+def index_args(args: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    '''
+    Groups parsed command line arguments by the schema path of the config
+    they belong to, so each config can look up its own arguments directly.
+
+            Parameters:
+                    args (Dict[str, Any]): Command line arguments by field path
+
+            Returns:
+                    index (Dict[str, Dict[str, Any]]): Arguments by field name
+                        for each schema path
+    '''
+    index = {}
+    for k, v in args.items():
+        if k == "load_path":
+            continue
+        schema_path, _, field = k.rpartition(".")
+        index.setdefault(schema_path, {})[field] = v
+    return index
+
+def index_loaded_config(loaded_config: Dict, prefix: str = "", index: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    '''
+    Indexes a loaded config by schema path in one walk, so that each config
+    can look up its loaded values directly instead of with get_loaded_config.
+
+            Parameters:
+                    loaded_config (Dict): Loaded config
+
+            Returns:
+                    index (Dict[str, Dict]): Loaded config at each schema path
+    '''
+    index = {} if index is None else index
+    index[prefix[:-1]] = loaded_config
+    for k, v in loaded_config.items():
+        if isinstance(v, dict):
+            index_loaded_config(v, prefix + str(k) + ".", index)
+    return index
+
 def get_loaded_config(loaded_config: Dict, schema_path: List[str]) -> Dict:
     if len(schema_path) < 1:
         return loaded_config
@@ -388,7 +1238,9 @@ def build_defaults(defaults: Dict, defaults_tree: Dict, dependencies: Dict[str,
             Parameters:
                     defaults (Dict): Flat dictionary of default values for target
                         config object, starts empty on first call
-                    defaults_tree (Dict): Defaults tree containing queries
+                    defaults_tree (Dict): Defaults tree containing queries,
+                        which may already be compiled with
+                        compile_defaults_tree
                     dependencies (Dict[str, Union[Config, MultiConfig]])):
                         For each ConfigRef added to _default_dependencies,
                         contains the path string specified and a reference to
@@ -399,24 +1251,27 @@ def build_defaults(defaults: Dict, defaults_tree: Dict, dependencies: Dict[str,
 
     '''
 
-    dict_keys = [k for k, v in defaults_tree.items() if isinstance(v, Dict)]
-    nondict_keys = [k for k, v in defaults_tree.items() if not isinstance(v, Dict)]
+    query_keys = [k for k in defaults_tree.keys() if is_query(k)]
+    nondict_keys = [k for k in defaults_tree.keys() if not is_query(k)]
 
     # Queries
-    for k in dict_keys:
-        v = defaults_tree[k]
-        last_dot_ind = k.rfind(".")
-        dependency_key = k[:last_dot_ind]
+    for k in query_keys:
+        query = defaults_tree[k]
+        if not isinstance(query, CompiledQuery):
+            query = None
 
+        dependency_key, field = (query.dependency, query.field) if query is not None else split_query_key(k)
         if not dependency_key in dependencies:
             raise InvalidDefaultFileException(f"Default file contains reference to dependency {k} which was not specified in _default_dependencies.")
-        config = dependencies[dependency_key]
-        target_val = getattr(config, k[last_dot_ind+1:])
+        target_val = query_target(dependencies[dependency_key], field)
+
+        if query is None:
+            # Uncompiled tree, so operands take the type of the value they are compared with
+            query = CompiledQuery(k, defaults_tree[k], type(target_val))
 
-        for qk, qv in v.items():
-            for op_str, op in QUERY_OPS.items():
-                if qk.startswith(op_str) and op(target_val, qk[len(opt_str):]):
-                    build_defaults(defaults, qv, dependencies)
+        count("queries_evaluated")
+        for qv in query.matches(target_val):
+            build_defaults(defaults, qv, dependencies)
 
     # Default values
     for k in nondict_keys:
@@ -0,0 +1,102 @@
+from typing import Type, Dict, Tuple, Any, Union, Optional
+from pathlib import Path
+import os
+import pickle
+from .config import Config, schema_fingerprint
+from .loading import LazyOptionTrees, OverlayTree, Manifest
+from .exceptions import InvalidBundleException
+
+
+BUNDLE_VERSION = 1
+BUNDLE_EXT = ".asyd"
+
+
+class PackedOptionTrees(dict):
+    '''
+    The defaults trees of every option of a MultiConfig, as stored in a bundle
+    in place of LazyOptionTrees.
+    '''
+    pass
+
+
+def is_bundle(path: Path) -> bool:
+    return path.suffix == BUNDLE_EXT and path.is_file()
+
+def write_bundle(base_schema: Type[Config], manifest: Manifest, tree: Dict, path: Union[str, Path]) -> None:
+    '''
+    Writes a merged (not compiled) defaults tree and the manifest of the
+    directory it was built from to a bundle file. The trees of all MultiConfig
+    options are loaded and stored. The file is replaced atomically.
+
+            Parameters:
+                    base_schema (Type[Config]): Schema the tree was built for
+                    manifest (Manifest): Manifest of the directory
+                    tree (Dict): Defaults tree built from the directory
+                    path (Union[str, Path]): Bundle file
+    '''
+    path = Path(path)
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "fingerprint": schema_fingerprint(base_schema),
+        "directory": str(manifest.path),
+        "manifest": manifest.to_dict(),
+        "tree": pack_tree(tree),
+    }
+
+    tmp_path = path.with_name(path.name + ".{}.tmp".format(os.getpid()))
+    with tmp_path.open("wb") as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def read_bundle(base_schema: Type[Config], path: Union[str, Path]) -> Tuple[Manifest, Dict]:
+    '''
+    Reads a bundle written by write_bundle with a single read.
+
+            Parameters:
+                    base_schema (Type[Config]): Schema to build from the bundle
+                    path (Union[str, Path]): Bundle file
+
+            Returns:
+                    manifest (Manifest): Manifest of the packed directory
+                    tree (Dict): Defaults tree, as built from the directory
+    '''
+    try:
+        with Path(path).open("rb") as f:
+            data = f.read()
+        bundle = pickle.loads(data)
+    except Exception as e:  # Unpickling a damaged file can raise almost anything
+        raise InvalidBundleException(f"Bundle {path} could not be read ({e}).")
+
+    if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+        raise InvalidBundleException(f"Bundle {path} was written by an incompatible version.")
+    if bundle.get("fingerprint") != schema_fingerprint(base_schema):
+        raise InvalidBundleException(f"Bundle {path} was packed for a different version of schema {base_schema.__qualname__}.")
+
+    return Manifest.from_dict(bundle["directory"], bundle["manifest"]), unpack_tree(bundle["tree"])
+
+def pack_tree(tree: Dict, parents: Optional[Dict[int, Dict]] = None) -> Dict:
+    # Parent layers of OverlayTrees are packed once, and pickled once since they stay shared
+    parents = {} if parents is None else parents
+    packed = {}
+    for k, v in (tree.own_items() if isinstance(tree, OverlayTree) else tree.items()):
+        if isinstance(v, LazyOptionTrees):
+            packed[k] = PackedOptionTrees({option: pack_tree(v[option], parents) for option in v})
+        elif isinstance(v, Dict):
+            packed[k] = pack_tree(v, parents)
+        else:
+            packed[k] = v
+
+    if isinstance(tree, OverlayTree):
+        if not id(tree.parent) in parents:
+            parents[id(tree.parent)] = pack_tree(tree.parent, parents)
+        return OverlayTree(packed, parents[id(tree.parent)])
+    return packed
+
+def unpack_tree(tree: Dict) -> Dict:
+    for k, v in (tree.own_items() if isinstance(tree, OverlayTree) else tree.items()):
+        if isinstance(v, PackedOptionTrees):
+            trees = {option: unpack_tree(option_tree) for option, option_tree in v.items()}
+            tree[k] = LazyOptionTrees(trees.keys(), trees.__getitem__)
+        elif isinstance(v, Dict):
+            unpack_tree(v)
+    return tree
@@ -0,0 +1,196 @@
+from typing import Dict, Tuple, Any, Union, Optional, Hashable
+from collections import OrderedDict
+from pathlib import Path
+import os
+import pickle
+import threading
+import yaml
+from .tracing import tracing, count
+
+
+CACHE_FILE_NAME = ".asyd_cache"
+CACHE_VERSION = 1
+
+
+def load_yaml(path: Path) -> Any:
+    with path.open() as f:
+        data = yaml.load(f, Loader=yaml.CLoader)
+        if tracing():
+            count("files_read")
+            count("bytes_parsed", f.tell())
+        return data
+
+
+class DefaultsCache:
+    '''
+    Persistent cache of parsed defaults files. The parsed contents of each file
+    are stored pickled and keyed by the file's absolute path, size and
+    modification time, so a file is only parsed with YAML again when it has
+    changed. Every load returns a fresh copy, since defaults trees are merged in
+    place. Nothing is written to disk until save is called. Loading is safe to
+    do from several threads at once.
+
+            Parameters:
+                    path (Optional[Union[str, Path]]): Cache file, or a
+                        directory to put a .asyd_cache file in. The cache is
+                        only kept in memory if None.
+    '''
+
+    def __init__(self, path: Optional[Union[str, Path]] = CACHE_FILE_NAME):
+        path = None if path is None else Path(path)
+        self.path: Optional[Path] = path / CACHE_FILE_NAME if path is not None and path.is_dir() else path
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: Dict[str, Tuple[int, int, bytes]] = self._read()
+        self._dirty: bool = False
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Tuple[int, int, bytes]]:
+        if self.path is None or not self.path.is_file():
+            return {}
+        try:
+            with self.path.open("rb") as f:
+                stored = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+        if not isinstance(stored, dict) or stored.get("version") != CACHE_VERSION:
+            return {}
+        return stored["entries"]
+
+    def load(self, file: Path) -> Any:
+        '''
+        Returns the parsed contents of a defaults file, parsing it only if it
+        is not cached or has changed since it was cached.
+
+                Parameters:
+                        file (Path): YAML file to load
+
+                Returns:
+                        data (Any): Parsed contents of file
+        '''
+        hit, data = self.get(file)
+        if hit:
+            count("cache_hits")
+            return data
+
+        data = load_yaml(file)
+        self.put(file, data)
+        return data
+
+    def get(self, file: Path) -> Tuple[bool, Any]:
+        '''
+        Looks up the parsed contents of a defaults file without parsing it.
+        Counts as a hit or a miss.
+
+                Parameters:
+                        file (Path): YAML file to look up
+
+                Returns:
+                        hit (bool): Whether an up to date entry was found
+                        data (Any): Parsed contents of file, None on a miss
+        '''
+        key = os.path.abspath(file)
+        stat = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                self.hits += 1
+            else:
+                self.misses += 1
+                return False, None
+        return True, pickle.loads(entry[2])
+
+    def put(self, file: Path, data: Any) -> None:
+        key = os.path.abspath(file)
+        stat = os.stat(key)
+        entry = (stat.st_size, stat.st_mtime_ns, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty = True
+
+    def invalidate(self, file: Optional[Union[str, Path]] = None) -> None:
+        '''
+        Drops the cached contents of one file, or of every file if none is
+        given. Call save to persist the invalidation.
+        '''
+        with self._lock:
+            if file is None:
+                self._dirty = self._dirty or len(self._entries) > 0
+                self._entries = {}
+            elif self._entries.pop(os.path.abspath(file), None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+
+        # Write to a temporary file first so that concurrent readers never see a partially written cache
+        tmp_path = self.path.with_name(self.path.name + ".{}.tmp".format(os.getpid()))
+        with tmp_path.open("wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LRUCache:
+    '''
+    In-memory cache holding at most maxsize entries, evicting the least
+    recently used entry when full. Counts hits, misses and evictions.
+
+            Parameters:
+                    maxsize (int): Maximum number of entries
+    '''
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("LRUCache maxsize must be at least 1.")
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries), "maxsize": self.maxsize}
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,15 +1,39 @@
-from dataclasses import dataclass, field, Field
-from typing import List, Dict, TypeVar, Type, Callable, Any, cast, ClassVar, Union, Generic, Optional, get_args, Set, get_type_hints
+from dataclasses import dataclass, field, fields, is_dataclass, Field
+from typing import List, Dict, Tuple, TypeVar, Type, Callable, Any, cast, ClassVar, Union, Generic, Optional, get_args, Set, get_type_hints
 from typing_extensions import Protocol
-from .config_utils import MV, ABCMeta, abstract_attribute
+from .config_utils import MV, ABCMeta, abstract_attribute, abstract_attributes
 from .exceptions import InvalidOptionException, RequiredReferenceException, InvalidPathException, InconsistentReferenceTypeException
+from collections.abc import Callable as CallableABC
+from functools import lru_cache
+import hashlib
 import inspect
+import operator
+import typing
 import copy
+import weakref
 
 class Config:
-    _default_dependencies: ClassVar[Set["ConfigRef"]] = {}
+    _default_dependencies: ClassVar[Set["ConfigRef"]] = set()
     __dataclass_fields__: ClassVar[Dict[str, Any]]
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Set before @dataclass runs, which then keeps it instead of generating a field by field __eq__
+        if not "__eq__" in cls.__dict__:
+            cls.__eq__ = Config.__eq__
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        # Equal configs have equal content hashes, so differing (remembered) hashes settle most unequal pairs. The
+        # fields are still compared one by one, like the dataclass __eq__ does, since equal hashes do not imply ==.
+        if digests_differ(self, other):
+            return False
+        names = schema_info(self.__class__).compared
+        return tuple(getattr(self, name) for name in names) == tuple(getattr(other, name) for name in names)
+
 class MultiMeta(ABCMeta):
     def __call__(cls, selection: str, *args, **kwargs):
         instance = super().__call__(*args, **kwargs)
@@ -23,6 +47,18 @@ class MultiConfig(Generic[S], metaclass=MultiMeta):
     _selected: str
     __orig_bases__: List
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not "__eq__" in cls.__dict__:
+            cls.__eq__ = MultiConfig.__eq__
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return self._selected == other._selected and self._config == other._config
+
     def _select(self, selection: str):
         if selection in self._options:
             self._config = self._options[selection]()
@@ -34,6 +70,291 @@ class MultiConfig(Generic[S], metaclass=MultiMeta):
     def superschema(cls) -> Type[S]:
         return get_args(cls.__orig_bases__[0])[0]
 
+LEAF = "leaf"
+CONFIG = "config"
+MULTI = "multi"
+
+class SchemaInfo:
+    '''
+    Structure of a schema class, computed once per class by schema_info so
+    that building, parsing and serializing do not inspect dataclass fields
+    and call issubclass on every pass.
+
+            Attributes:
+                    schema (Type[Any]): The Config or MultiConfig class
+                    fields (Dict[str, Field]): Dataclass fields by name
+                    types (Dict[str, Any]): Declared type of every field
+                    kinds (Dict[str, str]): LEAF, CONFIG or MULTI for every field
+                    children (Dict[str, Type[Any]]): Schemas of the fields that
+                        hold a Config or MultiConfig
+                    leaves (Tuple[str, ...]): Names of the other fields
+                    compared (Tuple[str, ...]): Names of the fields compared by
+                        ==, including private fields
+                    serialized (Tuple[str, ...]): Names of the fields that are
+                        serialized and hashed, leaving out private fields and
+                        fields declared as callables
+                    is_multi (bool): Whether schema is a MultiConfig
+                    options (Dict[str, Type[Config]]): Options of a MultiConfig
+                    superschema (Optional[Type[Config]]): Superschema of a
+                        MultiConfig
+                    variants (List[Type[Config]]): Classes a config at this
+                        schema can take: the superschema and options of a
+                        MultiConfig, or the schema itself
+                    abstract_attributes (FrozenSet[str]): Attributes declared
+                        with abstract_attribute
+    '''
+
+    def __init__(self, schema: Type[Any]):
+        self.schema = schema
+        self.fields: Dict[str, Field] = dict(getattr(schema, "__dataclass_fields__", {}))
+        self.types: Dict[str, Any] = {name: f.type for name, f in self.fields.items()}
+        self.kinds: Dict[str, str] = {name: field_kind(t) for name, t in self.types.items()}
+        self.children: Dict[str, Type[Any]] = {name: self.types[name] for name, kind in self.kinds.items() if kind != LEAF}
+        self.leaves = tuple(name for name, kind in self.kinds.items() if kind == LEAF)
+        self.compared = tuple(f.name for f in fields(schema) if f.compare) if is_dataclass(schema) else ()
+        self.serialized = tuple(name for name, t in self.types.items() if name[0] != "_" and not is_callable_type(t))
+        self.is_multi = field_kind(schema) == MULTI
+        self.options: Dict[str, Type[Config]] = schema._options if self.is_multi else {}
+        self.superschema: Optional[Type[Config]] = schema.superschema() if self.is_multi else None
+        self.variants: List[Type[Config]] = [self.superschema, *self.options.values()] if self.is_multi else [schema]
+        self.abstract_attributes = abstract_attributes(schema)
+
+def is_callable_type(t: Any) -> bool:
+    return t is CallableABC or getattr(t, "__origin__", None) is CallableABC or t is typing.Callable
+
+def field_kind(field_type: Any) -> str:
+    if not inspect.isclass(field_type):
+        return LEAF
+    if issubclass(field_type, Config):
+        return CONFIG
+    if issubclass(field_type, MultiConfig):
+        return MULTI
+    return LEAF
+
+_SCHEMA_INFO: Dict[Type[Any], SchemaInfo] = {}
+
+def schema_info(schema: Type[Any]) -> SchemaInfo:
+    info = _SCHEMA_INFO.get(schema)
+    if info is None:
+        info = SchemaInfo(schema)
+        _SCHEMA_INFO[schema] = info
+    return info
+
+_FINGERPRINTS: Dict[Type[Any], str] = {}
+
+def schema_fingerprint(schema: Type[Config]) -> str:
+    '''
+    Hashes the structure of a schema: the names and declared types of its
+    fields, and the options of its MultiConfigs, recursively. Snapshots and
+    bundles of a schema are only valid while its fingerprint stays the same.
+    '''
+    fingerprint = _FINGERPRINTS.get(schema)
+    if fingerprint is None:
+        description: List[str] = []
+        describe_schema(schema, description, set())
+        fingerprint = hashlib.sha256("\n".join(description).encode()).hexdigest()
+        _FINGERPRINTS[schema] = fingerprint
+    return fingerprint
+
+def describe_schema(schema: Type[Any], description: List[str], seen: set) -> None:
+    if schema in seen:
+        return
+    seen.add(schema)
+
+    description.append(f"{schema.__module__}.{schema.__qualname__}")
+    info = schema_info(schema)
+    if info.is_multi:
+        for option, cls in info.options.items():
+            description.append(f"  option {option}: {cls.__module__}.{cls.__qualname__}")
+        for cls in info.options.values():
+            describe_schema(cls, description, seen)
+        return
+
+    for name, field_type in info.types.items():
+        description.append(f"  {name}: {field_type!r}")
+    for child in info.children.values():
+        describe_schema(child, description, seen)
+
+def content_hash(config: Union[Config, "MultiConfig"]) -> str:
+    '''
+    Hashes the contents of a config: its class, and the names and values of
+    its serialized fields, recursively. The hash does not depend on the order
+    of keys in dict values, and numbers hash by value (1, 1.0 and True hash
+    the same, as they compare equal), but other types are told apart (a list
+    and a tuple with the same items hash differently). Equal configs (==) have
+    equal hashes, in any process, but configs with equal hashes may still
+    differ in private fields or, for NaN, compare unequal. Only None, numbers,
+    strings, bytes, lists, tuples, dicts, sets and configs can be hashed.
+
+    Hashes are computed bottom-up, each config hashing the hashes of its
+    nested configs, and remembered for each config while its field values stay
+    the same objects, so hashing a config again after changing one field only
+    rehashes the path from that field to the root. Configs with values that
+    can be changed in place (lists, dicts and sets, also inside tuples) are
+    rehashed every time.
+
+            Parameters:
+                    config (Union[Config, MultiConfig]): Built config
+
+            Returns:
+                    hash (str): Hex digest
+
+            Raises:
+                    TypeError: If a field holds a value of another type
+    '''
+    return content_digest(config).hex()
+
+def same_content(a: Union[Config, "MultiConfig"], b: Union[Config, "MultiConfig"]) -> bool:
+    '''
+    Compares two configs by content hash, see content_hash. Unlike ==, this
+    ignores private fields and treats NaN values as equal, and is cheap for
+    configs whose hashes are remembered.
+    '''
+    return a is b or content_digest(a) == content_digest(b)
+
+def digests_differ(a: Any, b: Any) -> bool:
+    try:
+        return content_digest(a) != content_digest(b)
+    except TypeError:
+        return False
+
+# Digests are remembered outside of the configs, by id, as (reference to the config, digest, field values,
+# digests of nested configs). Entries are removed when their config is garbage collected.
+_DIGESTS: Dict[int, Tuple["weakref.ref", bytes, Tuple, Tuple[bytes, ...]]] = {}
+_MUTABLE_TYPES = (list, dict, set, bytearray)
+
+def content_digest(config: Union[Config, "MultiConfig"]) -> bytes:
+    if isinstance(config, MultiConfig):
+        h = hashlib.sha256(b"multi:")
+        h.update(config._selected.encode() + b":")
+        h.update(content_digest(config._config))
+        return h.digest()
+
+    info = schema_info(config.__class__)
+    attrs = config.__dict__
+    values = tuple(attrs.get(name, MV) for name in info.serialized)
+    children = tuple(content_digest(v) for v in values if isinstance(v, (Config, MultiConfig)))
+
+    key = id(config)
+    cached = _DIGESTS.get(key)
+    if cached is not None and cached[0]() is config and cached[3] == children and all(map(operator.is_, cached[2], values)):
+        return cached[1]
+
+    h = hashlib.sha256(f"{config.__class__.__module__}.{config.__class__.__qualname__}".encode())
+    nested = iter(children)
+    for name, v in zip(info.serialized, values):
+        h.update(b"\0" + name.encode() + b"=")
+        if isinstance(v, (Config, MultiConfig)):
+            h.update(next(nested))
+        else:
+            hash_value(h, v)
+    digest = h.digest()
+
+    if not any(is_mutable(v) for v in values):
+        ref = cached[0] if cached is not None and cached[0]() is config else weakref.ref(config, lambda _, key=key: _DIGESTS.pop(key, None))
+        _DIGESTS[key] = (ref, digest, values, children)
+    return digest
+
+def is_mutable(v: Any) -> bool:
+    if isinstance(v, _MUTABLE_TYPES):
+        return True
+    if isinstance(v, (tuple, frozenset)):
+        return any(is_mutable(x) for x in v)
+    return False
+
+def hash_value(h: Any, v: Any) -> None:
+    # Subclasses (e.g. str and int enums, named tuples) hash like their base type, which they compare equal to
+    if v is None:
+        h.update(b"NoneType:None;")
+    elif isinstance(v, str):
+        h.update(f"str:{str.__repr__(v)};".encode())
+    elif isinstance(v, bytes):
+        h.update(f"bytes:{bytes.__repr__(v)};".encode())
+    elif isinstance(v, (int, float)):
+        # Numbers that compare equal hash the same, whatever their type
+        h.update(f"number:{int(v) if isinstance(v, int) or v.is_integer() else float.__repr__(v)};".encode())
+    elif isinstance(v, (list, tuple)):
+        h.update(f"{'list' if isinstance(v, list) else 'tuple'}[{len(v)}:".encode())
+        for x in v:
+            hash_value(h, x)
+        h.update(b"]")
+    elif isinstance(v, dict):
+        h.update(f"dict{{{len(v)}:".encode())
+        for item in sorted(value_digest((k, x)) for k, x in v.items()):
+            h.update(item)
+        h.update(b"}")
+    elif isinstance(v, (set, frozenset)):
+        h.update(f"set{{{len(v)}:".encode())  # Sets and frozensets with the same items are equal
+        for item in sorted(value_digest(x) for x in v):
+            h.update(item)
+        h.update(b"}")
+    elif isinstance(v, (Config, MultiConfig)):
+        h.update(content_digest(v))
+    else:
+        # A repr can be shared by unequal values, or differ between equal ones
+        raise TypeError("Cannot hash value of type {}. Supported types are None, numbers, strings, bytes, lists, tuples, dicts, sets and configs.".format(type(v)))
+
+def value_digest(v: Any) -> bytes:
+    h = hashlib.sha256()
+    hash_value(h, v)
+    return h.digest()
+
+def diff(a: Union[Config, "MultiConfig"], b: Union[Config, "MultiConfig"], prefix: str = "") -> Dict[str, Tuple[Any, Any]]:
+    '''
+    Lists the serialized fields in which two configs of the same schema differ.
+    Nested configs with equal content hashes are skipped without looking at
+    their fields, and fields are compared with == otherwise (also when a
+    value cannot be hashed, see content_hash). A MultiConfig with different selected options is reported as a
+    single difference of its path, between the names of the selected options.
+
+            Parameters:
+                    a (Union[Config, MultiConfig]): Config
+                    b (Union[Config, MultiConfig]): Config to compare a with
+                    prefix (str): Path of a and b, prepended to the paths of
+                        the differences
+
+            Returns:
+                    differences (Dict[str, Tuple[Any, Any]]): Value in a and
+                        value in b by field path, in field order
+    '''
+    differences: Dict[str, Tuple[Any, Any]] = {}
+    diff_helper(a, b, prefix, differences)
+    return differences
+
+def diff_helper(a: Any, b: Any, path: str, differences: Dict[str, Tuple[Any, Any]]) -> None:
+    try:
+        if a is b or content_digest(a) == content_digest(b):
+            return
+    except TypeError:
+        pass
+
+    if type(a) is not type(b):
+        differences[path] = (a, b)
+        return
+
+    if isinstance(a, MultiConfig):
+        if a._selected != b._selected:
+            differences[path] = (a._selected, b._selected)
+        else:
+            diff_helper(a._config, b._config, path, differences)
+        return
+
+    for name in schema_info(a.__class__).serialized:
+        va, vb = getattr(a, name, MV), getattr(b, name, MV)
+        field_path = name if path == "" else path + "." + name
+        if isinstance(va, (Config, MultiConfig)) and type(va) is type(vb):
+            diff_helper(va, vb, field_path, differences)
+        elif not (va is vb or va == vb):
+            differences[field_path] = (va, vb)
+
+@lru_cache(maxsize=None)
+def path_parts(path: str) -> Tuple[str, ...]:
+    '''
+    Splits a schema path like nested_config.field into its parts, once per
+    distinct path. The base config's path "" has no parts.
+    '''
+    return () if path == "" else tuple(path.split("."))
+
 class ConfigRef:
     def __init__(self, path: str, optional: bool = False):
         self.optional: bool = optional
@@ -62,44 +383,47 @@ class ValidConfigRef(ConfigRef):
 
 def validate_ref(ref: ConfigRef, base_schema: Type[Config]):
     return_type = None
-    def validate_ref_helper(path: List[str], cls: Type[Any]) -> ValidConfigRef:
+    def validate_ref_helper(path: List[str], cls: Type[Any], name: str = "") -> ValidConfigRef:
         next_path = path[1:] if len(path) > 1 else []
         vr = None
 
+        kind = field_kind(cls)
+        info = None if kind == LEAF else schema_info(cls)
         if len(path) > 0:
-            if issubclass(cls, MultiConfig):
+            if kind == MULTI:
                 if inspect.isabstract(cls):
-                    raise NotImplementedError("Field {} assigned abstract class {}.".format(field.name, cls))
+                    raise NotImplementedError("Field {} assigned abstract class {}.".format(name, cls))
 
-                ss = cls.superschema()
-                if path[0] in ss.__dataclass_fields__:
-                    vr = validate_ref_helper(next_path, ss.__dataclass_fields__[path[0]].type)
+                ss_info = schema_info(info.superschema)
+                if path[0] in ss_info.types:
+                    vr = validate_ref_helper(next_path, ss_info.types[path[0]], path[0])
 
                 num_valid = 0
-                for choice, choice_cls in cls._options.items():
-                    if path[0] in choice_cls.__dataclass_fields__:
+                for choice, choice_cls in info.options.items():
+                    choice_types = schema_info(choice_cls).types
+                    if path[0] in choice_types:
                         num_valid += 1
-                        vr = validate_ref_helper(next_path, choice_cls.__dataclass_fields__[path[0]].type)
+                        vr = validate_ref_helper(next_path, choice_types[path[0]], path[0])
                     else:
                         if not ref.optional:
                             raise RequiredReferenceException("Reference to {} is not optional but is not valid when {} is {}. Pass optional=True to ConfigRef to make optional.".format(ref.path, cls, choice))
                 if num_valid < 1:
                     raise InvalidPathException("Reference to {} in MultiConfig {} not valid for any choice. (full path: {})".format(path, cls, ref.path))
-            elif issubclass(cls, Config):
-                if path[0] in cls.__dataclass_fields__:
-                    vr = validate_ref_helper(next_path, cls.__dataclass_fields__[path[0]].type)
+            elif kind == CONFIG:
+                if path[0] in info.types:
+                    vr = validate_ref_helper(next_path, info.types[path[0]], path[0])
                 else:
                     raise InvalidPathException("Reference to {} in Config {} not valid for any choice. (full path: {})".format(path, cls, ref.path))
             else:
                 raise InvalidPathException("Path {} continues past {}, which has type {} (not Config or MultiConfig).".format(ref.path, path[0], cls))
         else:
-            if issubclass(cls, Config) or issubclass(cls, MultiConfig):
+            if kind != LEAF:
                 nonlocal return_type
                 if return_type is None:
                     return_type = cls
                 else:
-                    if return_type != rt:
-                        raise InconsistentReferenceTypeException("Schema at path {} differs ({} and {}) depending on different MultiConfig choices along path.".format(ref.path, return_type, rt))
+                    if return_type != cls:
+                        raise InconsistentReferenceTypeException("Schema at path {} differs ({} and {}) depending on different MultiConfig choices along path.".format(ref.path, return_type, cls))
 
                 vr = ValidConfigRef(ref, cls)
             else:
@@ -107,27 +431,34 @@ def validate_ref(ref: ConfigRef, base_schema: Type[Config]):
 
         return vr
 
-    return validate_ref_helper([] if ref.path == "" else ref.path.split("."), base_schema)
+    return validate_ref_helper(list(path_parts(ref.path)), base_schema)
+
+def validate_refs(base_schema: Type[Config]) -> Dict[Type[Any], Set[ValidConfigRef]]:
+    # Validated references are collected per schema class instead of being written back to _default_dependencies, so
+    # validating the same schema again (or building it many times) always starts from what the user declared.
+    dependencies: Dict[Type[Any], Set[ValidConfigRef]] = {}
 
-def validate_refs(base_schema: Type[Config]) -> None:
-    def validate_refs_helper(schema: Type[Config], path=".") -> None:
-        for name, field in schema.__dataclass_fields__.items():
+    def validate_refs_helper(schema: Type[Config], path="") -> None:
+        deps = dependencies.setdefault(schema, set())
+        for name, child in schema_info(schema).children.items():
             next_path = path + name + "."
-            if issubclass(field.type, Config):
-                validate_refs_helper(field.type, next_path)
+            child_info = schema_info(child)
+            if not child_info.is_multi:
+                validate_refs_helper(child, next_path)
             else:
-                if issubclass(field.type, MultiConfig):
-                    if inspect.isabstract(field.type):
-                        raise NotImplementedError("Field {} assigned abstract class {}.".format(field.name, field.type))
+                if inspect.isabstract(child):
+                    raise NotImplementedError("Field {} assigned abstract class {}.".format(name, child))
+
+                for cls in child_info.variants:
+                    validate_refs_helper(cls, next_path)
 
-                    validate_refs_helper(field.type.superschema(), next_path)
-                    for cls in field.type._options.values():
-                        validate_refs_helper(cls, next_path)
-                    field.type.superschema()._default_dependencies.add(ValidConfigRef(ConfigRef("" if path == "." else path), schema))
+                # Options are built after the config that holds the MultiConfig
+                parent_ref = ValidConfigRef(ConfigRef(path[:-1]), schema)
+                for cls in child_info.variants:
+                    dependencies.setdefault(cls, set()).add(parent_ref)
 
-        new_dd = set()
         for ref in schema._default_dependencies:
-            new_dd.add(validate_ref(ref, base_schema))
-        schema._default_dependencies = new_dd
+            deps.add(validate_ref(ref, base_schema))
 
-    return validate_refs_helper(base_schema)
+    validate_refs_helper(base_schema)
+    return dependencies
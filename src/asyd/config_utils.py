@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field, Field
-from typing import TypeVar, Callable, Any, cast, Dict
+from typing import TypeVar, Callable, Any, cast, Dict, FrozenSet
 from typing_extensions import Protocol
 from abc import ABCMeta as NativeABCMeta
 
@@ -19,20 +19,38 @@ def abstract_attribute(obj: Callable[[Any], R] = None) -> R:
     _obj.__is_abstract_attribute__ = True
     return cast(R, _obj)
 
+_ABSTRACT_ATTRIBUTES: Dict[type, FrozenSet[str]] = {}
+
+def abstract_attributes(cls: type) -> FrozenSet[str]:
+    '''
+    Names of the attributes of cls declared with abstract_attribute, found
+    once per class.
+    '''
+    names = _ABSTRACT_ATTRIBUTES.get(cls)
+    if names is None:
+        names = frozenset(
+            name
+            for name in dir(cls)
+            if getattr(getattr(cls, name, None), '__is_abstract_attribute__', False)
+        )
+        _ABSTRACT_ATTRIBUTES[cls] = names
+    return names
+
 class ABCMeta(NativeABCMeta):
     def __call__(cls, *args, **kwargs):
         instance = NativeABCMeta.__call__(cls, *args, **kwargs)
-        abstract_attributes = {
+        # Only attributes that are abstract on the class can still be abstract on the instance
+        abstract_attrs = {
             name
-            for name in dir(instance)
-            if getattr(getattr(instance, name), '__is_abstract_attribute__', False)
+            for name in abstract_attributes(cls)
+            if getattr(getattr(instance, name, None), '__is_abstract_attribute__', False)
         }
-        if abstract_attributes:
+        if abstract_attrs:
             raise NotImplementedError(
                 "Can't instantiate abstract class {} with"
                 " abstract attributes: {}".format(
                     cls.__name__,
-                    ', '.join(abstract_attributes)
+                    ', '.join(abstract_attrs)
                 )
             )
         return instance
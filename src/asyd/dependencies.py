@@ -1,65 +1,119 @@
-from dataclasses import Field
-from typing import Type, List, Dict, Tuple, Set, Union
-from .config import Config, MultiConfig, ConfigRef, ValidConfigRef
+from typing import Type, List, Dict, Tuple, Set, Any, Optional
+from .config import Config, ValidConfigRef, validate_refs, schema_info
 from .exceptions import CyclicDependencyException
-import inspect
-
-# def print_deps(schema: Type[Config], tab: int = 0):
-#     print(*[" "*tab], schema._default_dependencies)
-#     for name, field in schema.__dataclass_fields__.items():
-#         print(*[" "*tab], name, ":", _default_dependencies(field))
-#         if inspect.isclass(field.type):
-#             if issubclass(field.type, Config):
-#                 print_deps(field.type)
-#             elif issubclass(field.type, MultiConfig):
-#                 for cls in field.type._options.values():
-#                     print_deps(cls, tab=tab+3)
-
-def generate_acyclic_traveral(schema: Type[Config]) -> List[str]:
-    return traverse_all(schema, set(), "")[0]
-
-def traverse_all(schema: Type[Config], visited: Set[str], path: str) -> Tuple[List[str], Set[str]]:
-    order, v = dfs_deps(path[:-1], schema, visited)
-    visited.update(v)
-
-    for field in schema.__dataclass_fields__.values():
-        if inspect.isclass(field.type):
-            if issubclass(field.type, Config):
-                o, v = traverse_all(field.type, visited, path + field.name + ".")
-                order += o
-                visited.update(v)
-            else:
-                if issubclass(field.type, MultiConfig):
-                    for opt_cls in field.type._options.values():
-                        if issubclass(opt_cls, Config):
-                            ord, vis = traverse_all(opt_cls, visited, path + field.name + ".")
-                            order += ord
-                            visited.update(v)
-
-    return order, visited
-
-def dfs_deps(path: str, schema: Union[Type[Config], Type[MultiConfig]], visited_before: Set[str], visited_in_branch: Set[str] = set()) -> Tuple[List[str], Set[str]]:
-    if path in visited_before:
-        return ([], set())
-    if path in visited_in_branch:
-        raise CyclicDependencyException(f"Cycle detected in dependencies. Cycle includes {path}")
-
-    if issubclass(schema, Config):
-        deps = schema._default_dependencies
-    elif issubclass(schema, MultiConfig):
-        deps = schema.superschema()._default_dependencies.union(*[c._default_dependencies for c in schema._options.values()])
-
-    if len(deps) < 1:
-        return ([path], {path})
-
-    visited = set()
-    order = []
-
-    for dep in deps:
-        o, v = dfs_deps(dep.path, dep.schema, visited_before.union(visited), visited_in_branch.union({path}))
-        visited.update(v)
-        order += o
-
-    order += [path]
-    visited.add(path)
-    return order, visited
+
+
+DefaultDependencies = Dict[Type[Any], Set[ValidConfigRef]]
+
+
+class DependencyGraph:
+    '''
+    Graph of the schema paths of every config in a schema (including the
+    configs of every MultiConfig option) and the paths each one depends on.
+    The graph is built once, and ordering it takes time linear in the number
+    of paths and dependencies.
+
+    Besides declared dependencies, every config nested in a MultiConfig option
+    depends on the MultiConfig, since selecting an option replaces everything
+    below it.
+
+            Parameters:
+                    schema (Type[Config]): Base schema
+                    default_dependencies (Optional[DefaultDependencies]):
+                        Validated references for each schema, as returned by
+                        validate_refs
+
+            Attributes:
+                    paths (List[str]): Schema paths, in the order they appear
+                        in the schema
+                    dependencies (Dict[str, Set[str]]): Paths each path depends on
+                    dependents (Dict[str, List[str]]): Paths depending on each path
+    '''
+
+    def __init__(self, schema: Type[Config], default_dependencies: Optional[DefaultDependencies] = None):
+        default_dependencies = validate_refs(schema) if default_dependencies is None else default_dependencies
+        self.paths: List[str] = []
+        self.dependencies: Dict[str, Set[str]] = {}
+        self.add_schema(schema, "", None, default_dependencies)
+
+        self.dependents: Dict[str, List[str]] = {path: [] for path in self.paths}
+        for path in self.paths:
+            for dep in self.dependencies[path]:
+                self.dependents[dep].append(path)
+
+    def add_schema(self, schema: Type[Any], path: str, multi_path: Optional[str], default_dependencies: DefaultDependencies) -> None:
+        if not path in self.dependencies:
+            self.paths.append(path)
+            self.dependencies[path] = set() if multi_path is None else {multi_path}
+
+        info = schema_info(schema)
+        for cls in info.variants:
+            self.dependencies[path].update(ref.path for ref in default_dependencies.get(cls, set()))
+
+        if info.is_multi:
+            for cls in info.options.values():
+                self.add_children(cls, path, path, default_dependencies)
+        else:
+            self.add_children(schema, path, multi_path, default_dependencies)
+
+    def add_children(self, schema: Type[Config], path: str, multi_path: Optional[str], default_dependencies: DefaultDependencies) -> None:
+        for name, child in schema_info(schema).children.items():
+            self.add_schema(child, name if path == "" else path + "." + name, multi_path, default_dependencies)
+
+    def order(self) -> List[str]:
+        '''
+        Orders the paths so that every path comes after the paths it depends
+        on (Kahn's algorithm). Ties are broken by the order of the schema.
+
+                Returns:
+                        order (List[str]): Schema paths in build order
+        '''
+        return [path for level in self.levels() for path in level]
+
+    def levels(self) -> List[List[str]]:
+        '''
+        Groups the paths into levels, where every path depends only on paths in
+        earlier levels. Configs in the same level do not depend on each other,
+        so they can be resolved concurrently.
+
+                Returns:
+                        levels (List[List[str]]): Schema paths by level
+        '''
+        remaining = {path: len(deps) for path, deps in self.dependencies.items()}
+        level = [path for path in self.paths if remaining[path] == 0]
+        levels = []
+        resolved = 0
+        while len(level) > 0:
+            levels.append(level)
+            resolved += len(level)
+            next_level = []
+            for path in level:
+                for dependent in self.dependents[path]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        next_level.append(dependent)
+            level = next_level
+
+        if resolved < len(self.paths):
+            cycle = self.find_cycle({path for path, count in remaining.items() if count > 0})
+            raise CyclicDependencyException("Cycle detected in dependencies: {}".format(" -> ".join(repr(p) for p in cycle)))
+        return levels
+
+    def find_cycle(self, paths: Set[str]) -> List[str]:
+        '''
+        Finds a cycle among paths that could not be ordered. Every such path
+        depends on another unordered path, so following dependencies from any
+        of them must eventually return to a path already on the way.
+        '''
+        path = next(p for p in self.paths if p in paths)
+        seen: Dict[str, int] = {}
+        walk: List[str] = []
+        while not path in seen:
+            seen[path] = len(walk)
+            walk.append(path)
+            path = next(dep for dep in sorted(self.dependencies[path]) if dep in paths)
+        return walk[seen[path]:] + [path]
+
+
+def generate_acyclic_traveral(schema: Type[Config], default_dependencies: Optional[DefaultDependencies] = None) -> List[str]:
+    return DependencyGraph(schema, default_dependencies).order()
@@ -33,6 +33,15 @@ class RedundantDefaultException(Exception):
 class InvalidLoadedConfigException(Exception):
     pass
 
+class InvalidOverrideException(Exception):
+    pass
+
+class InvalidSnapshotException(Exception):
+    pass
+
+class InvalidBundleException(Exception):
+    pass
+
 
 # Other
 
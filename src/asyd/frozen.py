@@ -0,0 +1,189 @@
+from typing import Type, Dict, List, Tuple, Any, Iterable, Optional, Set
+from operator import itemgetter
+import sys
+from .config import Config, MultiConfig, schema_info
+
+
+_FROZEN_CLASSES: Dict[Type[Any], Type[tuple]] = {}
+
+
+class FrozenConfig(tuple):
+    '''
+    Base of the immutable mirrors of config classes created by freeze. Values
+    are stored in a tuple, in the order the fields are declared, so instances
+    have no __dict__, cannot be changed and are hashable. Frozen configs of
+    different classes are never equal.
+    '''
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _schema: Type[Any]
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and tuple.__eq__(self, other)
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Type[Any], Tuple]]:
+        # Frozen classes are created at runtime and cannot be found by name, so they are pickled as the class they mirror
+        return (unpickle_frozen, (self._schema, tuple(self)))
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    def __hash__(self) -> int:
+        return tuple.__hash__(self)
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, ", ".join(f"{name}={v!r}" for name, v in zip(self._fields, self)))
+
+
+class FrozenMultiConfig(FrozenConfig):
+    '''
+    Frozen mirror of a MultiConfig, holding the selected option and its
+    frozen config under the same names as MultiConfig.
+    '''
+    __slots__ = ()
+    _fields = ("_selected", "_config")
+    _selected = property(itemgetter(0))
+    _config = property(itemgetter(1))
+
+
+class FrozenDict(dict):
+    '''
+    Immutable, hashable dict that dicts in values are frozen into. It is read
+    like any dict, but every method that would change it raises TypeError.
+    Equal FrozenDicts have equal hashes regardless of the order of their items.
+    '''
+    __slots__ = ()
+
+    def __hash__(self) -> int:
+        return hash(frozenset(self.items()))
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, dict.__repr__(self))
+
+    def __reduce__(self) -> Tuple[Type["FrozenDict"], Tuple[Dict]]:
+        return (self.__class__, (dict(self),))
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError(f"{self.__class__.__name__} cannot be changed.")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class FrozenList(tuple):
+    '''
+    Immutable list that lists in parsed defaults files are frozen into, so that
+    a list repeated across the defaults tree can be a single shared object.
+    Defaults are copied back into lists before they are set on configs.
+    '''
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, list(self))
+
+    def __reduce__(self) -> Tuple[Type["FrozenList"], Tuple[Tuple]]:
+        return (self.__class__, (tuple(self),))
+
+
+def frozen_class(cls: Type[Any]) -> Type[tuple]:
+    '''
+    Returns the frozen mirror of a config class, created once per class.
+    '''
+    frozen = _FROZEN_CLASSES.get(cls)
+    if frozen is None:
+        if schema_info(cls).is_multi:
+            frozen = type(cls.__name__, (FrozenMultiConfig,), {"__slots__": (), "__module__": cls.__module__, "_schema": cls})
+        else:
+            fields = tuple(schema_info(cls).kinds.keys())
+            attrs: Dict[str, Any] = {"__slots__": (), "__module__": cls.__module__, "_fields": fields, "_schema": cls}
+            for i, name in enumerate(fields):
+                attrs[name] = property(itemgetter(i))
+            frozen = type(cls.__name__, (FrozenConfig,), attrs)
+        _FROZEN_CLASSES[cls] = frozen
+    return frozen
+
+def unpickle_frozen(cls: Type[Any], values: Tuple) -> tuple:
+    return frozen_class(cls)(values)
+
+def freeze(config: Any) -> Any:
+    '''
+    Creates an immutable, hashable mirror of a built config that is accessed
+    the same way (frozen.nested_config.some_field, frozen.multi._selected,
+    frozen.multi._config.some_field) but takes much less memory. Lists in
+    values become tuples, sets become frozensets and dicts become FrozenDicts,
+    recursively.
+
+            Parameters:
+                    config (Config): Built config
+
+            Returns:
+                    frozen (FrozenConfig): Frozen mirror of config
+    '''
+    if isinstance(config, MultiConfig):
+        return frozen_class(config.__class__)((config._selected, freeze(config._config)))
+
+    values = config.__dict__
+    return frozen_class(config.__class__)(freeze_value(values.get(name)) for name in schema_info(config.__class__).kinds.keys())
+
+def freeze_value(value: Any) -> Any:
+    if isinstance(value, (Config, MultiConfig)):
+        return freeze(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_value(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze_value(v) for v in value)
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze_value(v)) for k, v in value.items())
+    return value
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    '''
+    Estimates the memory used by an object and everything it references, in
+    bytes. Objects referenced several times (including from objects measured
+    earlier with the same seen set) are only counted once. Classes and
+    functions are not counted.
+    '''
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, type) or callable(obj):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(obj.__dict__, seen)
+    for cls in type(obj).__mro__:
+        slots = getattr(cls, "__slots__", ())
+        for slot in ((slots,) if isinstance(slots, str) else slots):
+            if slot != "__dict__" and hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+def bytes_per_config(configs: Iterable[Any]) -> Dict[str, float]:
+    '''
+    Measures the average memory used per config, for configs as built and for
+    their frozen mirrors. Values shared between configs (e.g. interned
+    strings) are counted once across all configs.
+
+            Parameters:
+                    configs (Iterable[Any]): Built configs
+
+            Returns:
+                    sizes (Dict[str, float]): Average bytes per config as built
+                        ("objects") and frozen ("frozen")
+    '''
+    configs = list(configs)
+    if len(configs) < 1:
+        return {"objects": 0.0, "frozen": 0.0}
+
+    frozen = [freeze(config) for config in configs]
+    objects_seen: Set[int] = set()
+    frozen_seen: Set[int] = set()
+    return {
+        "objects": sum(deep_sizeof(config, objects_seen) for config in configs) / len(configs),
+        "frozen": sum(deep_sizeof(config, frozen_seen) for config in frozen) / len(frozen),
+    }
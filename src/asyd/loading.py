@@ -0,0 +1,337 @@
+from typing import Type, List, Dict, Tuple, Any, Optional, Union, Iterable, Iterator, Callable, Mapping
+from typing_extensions import Protocol
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+import os
+import threading
+from .config import Config, MultiConfig, schema_info
+from .cache import DefaultsCache, load_yaml
+
+
+YAML_EXTS: List[str] = [".yml", ".yaml"]
+
+
+class DefaultsLoader(Protocol):
+    def load(self, path: Path) -> Any:
+        ...
+
+
+class _LoadError:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class PreloadedFiles:
+    '''
+    Defaults files that were parsed ahead of building the defaults tree. Any
+    exception raised while parsing a file is raised again when that file is
+    loaded, so errors surface at the same point of the build as when loading
+    serially. Files that were not preloaded are loaded on demand.
+    '''
+
+    def __init__(self, loaded: Dict[Path, Any], fallback: Optional[DefaultsLoader] = None):
+        self._loaded = loaded
+        self._fallback = fallback
+
+    def load(self, path: Path) -> Any:
+        if path not in self._loaded:
+            return load_yaml(path) if self._fallback is None else self._fallback.load(path)
+
+        data = self._loaded[path]
+        if isinstance(data, _LoadError):
+            raise data.exception
+        return data
+
+
+class LazyOptionTrees(Mapping):
+    '''
+    The defaults trees of the options of a MultiConfig, keyed by option name.
+    The tree of an option is only built the first time it is looked up, so the
+    defaults of options that are never selected are never read.
+
+            Parameters:
+                    options (Iterable[str]): Names of the options
+                    build (Callable[[str], Dict]): Builds the defaults tree of
+                        an option
+    '''
+
+    def __init__(self, options: Iterable[str], build: Callable[[str], Dict]):
+        self._options = list(options)
+        self._build = build
+        self._trees: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, option: str) -> Dict:
+        if not option in self._options:
+            raise KeyError(option)
+        with self._lock:
+            if not option in self._trees:
+                self._trees[option] = self._build(option)
+            return self._trees[option]
+
+    def __contains__(self, option: Any) -> bool:
+        return option in self._options
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._options)
+
+    def __len__(self) -> int:
+        return len(self._options)
+
+    def __repr__(self) -> str:
+        return "LazyOptionTrees({})".format({option: self._trees.get(option, "...") for option in self._options})
+
+    def loaded_options(self) -> List[str]:
+        return [option for option in self._options if option in self._trees]
+
+    def map_trees(self, fn: Callable[[str, Dict], Dict]) -> "LazyOptionTrees":
+        '''
+        Returns new lazy option trees that apply fn to the option name and
+        tree of each option when it is first looked up.
+        '''
+        return LazyOptionTrees(self._options, lambda option: fn(option, self[option]))
+
+
+class OverlayTree(dict):
+    '''
+    Defaults tree of a MultiConfig option layered over the defaults given in
+    the MultiConfig's own directory. The parent layer is referenced, not
+    copied, so it is shared by the trees of every option. Reads see the
+    option's own entries first and then the parent's, in the order
+    merge_defaults_trees would have merged them; writes only go to the
+    option's own entries. Nested trees present in both layers are overlaid
+    too, see overlay_defaults_trees.
+
+            Parameters:
+                    tree (Dict): The option's own entries
+                    parent (Dict): Defaults tree of the MultiConfig
+    '''
+
+    __slots__ = ("parent",)
+
+    def __init__(self, tree: Dict, parent: Dict):
+        super().__init__(tree)
+        self.parent = parent
+
+    def __getitem__(self, key: Any) -> Any:
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        return self.parent[key]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        return self.parent.get(key, default)
+
+    def __contains__(self, key: Any) -> bool:
+        return dict.__contains__(self, key) or key in self.parent
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from dict.__iter__(self)
+        for key in self.parent:
+            if not dict.__contains__(self, key):
+                yield key
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + sum(1 for key in self.parent if not dict.__contains__(self, key))
+
+    def keys(self) -> List[Any]:
+        return list(self)
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in self]
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        return [(key, self[key]) for key in self]
+
+    def own_items(self) -> Iterable[Tuple[Any, Any]]:
+        return dict.items(self)
+
+    def copy(self) -> Dict:
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    __hash__ = None  # type: ignore
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickle the layers, so that a parent shared by several options is stored once
+        return (OverlayTree, (dict(dict.items(self)), self.parent))
+
+    def __repr__(self) -> str:
+        return "OverlayTree({})".format(dict(self.items()))
+
+
+class Manifest:
+    '''
+    Listing of a configuration directory and everything below it, made with a
+    single os.scandir walk so that building a defaults tree from it needs no
+    further stat calls. A manifest can be inspected (to_dict), passed to
+    compile to be reused across builds, or saved and restored with to_dict and
+    from_dict. It does not notice changes to the directory; scan it again
+    instead.
+
+            Parameters:
+                    path (Path): The directory
+                    files (List[str]): Names of the files in the directory
+                    dirs (Dict[str, Manifest]): Manifests of the directories
+                        in the directory
+    '''
+
+    def __init__(self, path: Path, files: List[str], dirs: Dict[str, "Manifest"]):
+        self.path = path
+        self.files = sorted(files)
+        self.dirs = dict(sorted(dirs.items()))
+        self._files = set(files)
+        # Files and directories in the order Path.iterdir would give them after sorting
+        self.entries = sorted([(name, False) for name in files] + [(name, True) for name in dirs.keys()])
+
+    @classmethod
+    def scan(cls, path: Path) -> "Manifest":
+        '''
+        Lists path recursively. A path that does not exist (or is not a
+        directory) gives an empty manifest.
+        '''
+        files, dirs = [], {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        dirs[entry.name] = cls.scan(path / entry.name)
+                    else:
+                        files.append(entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return cls(path, files, dirs)
+
+    def has_file(self, name: str) -> bool:
+        return name in self._files
+
+    def dir(self, name: str) -> Optional["Manifest"]:
+        return self.dirs.get(name)
+
+    def defaults_file(self) -> Optional[Path]:
+        '''
+        Returns the defaults.yml or defaults.yaml file of the directory, if any.
+        '''
+        for name in ["defaults" + ext for ext in YAML_EXTS]:
+            if name in self._files:
+                return self.path / name
+        return None
+
+    def all_files(self) -> Iterator[Path]:
+        for name in self.files:
+            yield self.path / name
+        for d in self.dirs.values():
+            yield from d.all_files()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"files": self.files, "dirs": {name: d.to_dict() for name, d in self.dirs.items()}}
+
+    @classmethod
+    def from_dict(cls, path: Union[str, Path], d: Dict[str, Any]) -> "Manifest":
+        path = Path(path)
+        return cls(path, d["files"], {name: cls.from_dict(path / name, sub) for name, sub in d["dirs"].items()})
+
+    def __len__(self) -> int:
+        return len(self.files) + sum(len(d) for d in self.dirs.values())
+
+    def __repr__(self) -> str:
+        return f"Manifest({str(self.path)!r}, {len(self)} files)"
+
+
+def discover_defaults_files(schema: Type[Config], dir: Path, include_options: bool = False, manifest: Optional[Manifest] = None) -> List[Path]:
+    '''
+    Lists every file that build_defaults_tree will load for a schema, in the
+    order it will load them. The files of MultiConfig options are left out
+    unless include_options is set, since they are only loaded once an option
+    is selected.
+
+            Parameters:
+                    schema (Type[Config]): The schema to find defaults files for
+                    dir (Path): The directory corresponding to the schema
+                    include_options (bool): Also list the files of every
+                        MultiConfig option
+                    manifest (Optional[Manifest]): Manifest of dir, scanned if
+                        not provided
+
+            Returns:
+                    files (List[Path]): Defaults files under dir
+    '''
+    files = []
+    discover_helper(schema, Manifest.scan(dir) if manifest is None else manifest, files, include_options)
+    return files
+
+def discover_helper(schema: Union[Type[Config], Type[MultiConfig]], manifest: Optional[Manifest], files: List[Path], include_options: bool = False) -> None:
+    if manifest is None:
+        return
+
+    df = manifest.defaults_file()
+    if df is not None:
+        files.append(df)
+
+    if manifest.dir("defaults") is not None:
+        discover_defaults_dir(manifest.dir("defaults"), files)
+
+    info = schema_info(schema)
+    if not info.is_multi:
+        for field, child in info.children.items():
+            discover_helper(child, manifest.dir(field), files, include_options)
+    elif include_options:
+        for option, cls in info.options.items():
+            discover_helper(cls, manifest.dir(option), files, include_options)
+
+def discover_defaults_dir(manifest: Manifest, files: List[Path]) -> None:
+    for name, is_dir in manifest.entries:
+        if is_dir:
+            discover_defaults_dir(manifest.dirs[name], files)
+        elif any(name.endswith(ext) for ext in YAML_EXTS):
+            files.append(manifest.path / name)
+
+
+def preload_defaults_files(files: List[Path], workers: int, use_processes: bool = False, cache: Optional[DefaultsCache] = None) -> PreloadedFiles:
+    '''
+    Parses defaults files concurrently. Threads suit directories on slow
+    storage, where loading is bound by I/O; processes suit directories where
+    YAML parsing itself is the bottleneck.
+
+            Parameters:
+                    files (List[Path]): Defaults files to parse
+                    workers (int): Maximum number of threads or processes
+                    use_processes (bool): Parse in a process pool instead of a
+                        thread pool
+                    cache (Optional[DefaultsCache]): Cache to check before
+                        parsing and to store parsed files in
+
+            Returns:
+                    files (PreloadedFiles): Parsed files, to be passed to
+                        build_defaults_tree
+    '''
+    loaded: Dict[Path, Any] = {}
+    to_parse: List[Path] = []
+    for f in files:
+        if cache is not None:
+            hit, data = cache.get(f)
+            if hit:
+                loaded[f] = data
+                continue
+        to_parse.append(f)
+
+    if len(to_parse) > 0:
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_cls(max_workers=workers) as executor:
+            futures = [(f, executor.submit(load_yaml, f)) for f in to_parse]
+            for f, future in futures:
+                try:
+                    loaded[f] = future.result()
+                except Exception as e:
+                    loaded[f] = _LoadError(e)
+                    continue
+
+                if cache is not None:
+                    cache.put(f, loaded[f])
+
+    return PreloadedFiles(loaded, cache)
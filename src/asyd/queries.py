@@ -0,0 +1,224 @@
+from typing import Type, Dict, List, Set, FrozenSet, Tuple, Callable, Any, Optional
+from bisect import bisect_left, bisect_right
+from .config import Config, MultiConfig, schema_info, CONFIG, MULTI
+from .config_utils import MV
+from .loading import LazyOptionTrees, OverlayTree
+from .exceptions import InvalidDefaultFileException
+
+
+QUERY_PREFIX = "?"
+QUERY_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda target_val, x: target_val == x,
+    "!=": lambda target_val, x: target_val != x,
+    ">": lambda target_val, x: target_val > x,
+    "<": lambda target_val, x: target_val < x,
+    ">=": lambda target_val, x: target_val >= x,
+    "<=": lambda target_val, x: target_val <= x,
+    # TO-DO: Add more
+}
+# Longest operators first so that ">=10" is not read as ">" with operand "=10"
+_OPS_BY_LENGTH = sorted(QUERY_OPS.keys(), key=len, reverse=True)
+
+FieldTypes = Callable[[str, str], Optional[Type[Any]]]
+
+
+def is_query(key: Any) -> bool:
+    return isinstance(key, str) and key.startswith(QUERY_PREFIX)
+
+def split_query_key(key: str) -> Tuple[str, str]:
+    '''
+    Splits a query key like ?nested_config_a.field_a into the path of the
+    dependency (nested_config_a) and the queried field (field_a). A query on a
+    field of the base config has an empty dependency path.
+    '''
+    target = key[len(QUERY_PREFIX):]
+    last_dot_ind = target.rfind(".")
+    return target[:max(last_dot_ind, 0)], target[last_dot_ind+1:]
+
+def split_branch_key(branch: Any) -> Tuple[str, str]:
+    branch = str(branch)
+    for op_str in _OPS_BY_LENGTH:
+        if branch.startswith(op_str):
+            return op_str, branch[len(op_str):]
+    raise InvalidDefaultFileException(f"Query branch {branch} does not start with a query operator ({', '.join(QUERY_OPS.keys())}).")
+
+def convert_operand(operand: str, field_type: Optional[Type[Any]], query_key: str) -> Any:
+    if field_type is None or field_type is str or field_type is Any:
+        return operand
+    if field_type is bool:
+        if operand.lower() in ("true", "yes", "1"):
+            return True
+        if operand.lower() in ("false", "no", "0"):
+            return False
+    else:
+        try:
+            return field_type(operand)
+        except (TypeError, ValueError):
+            pass
+    raise InvalidDefaultFileException(f"Query {query_key} compares against {operand}, which is not a valid {field_type}.")
+
+def query_target(config: Any, field: str) -> Any:
+    '''
+    Gets the value a query on field of config compares against. Queries on a
+    MultiConfig compare against the selected option.
+    '''
+    if isinstance(config, MultiConfig):
+        config = config._config
+    val = getattr(config, field)
+    return val._selected if isinstance(val, MultiConfig) else val
+
+
+class CompiledQuery:
+    '''
+    A single ?dependency.field block of a defaults tree, compiled so that the
+    branches matching a target value are found by lookup rather than by
+    checking every branch against every operator. Equality branches are kept in
+    hash tables and range branches in lists sorted by bound, and all operands
+    are converted to the queried field's type once, here.
+
+            Parameters:
+                    key (str): Query key, including the leading ?
+                    branches (Dict): Maps operator and operand strings (>10,
+                        =abc, ...) to the defaults trees they apply
+                    field_type (Optional[Type[Any]]): Declared type of the
+                        queried field. Operands are kept as strings if None.
+                    field_types (Optional[FieldTypes]): Used to compile queries
+                        nested in the branches
+    '''
+
+    def __init__(self, key: str, branches: Dict, field_type: Optional[Type[Any]] = None, field_types: Optional[FieldTypes] = None):
+        self.key = key
+        self.dependency, self.field = split_query_key(key)
+        self.field_type = field_type
+        self.branches: List[Dict] = []
+
+        self._equal: Dict[Any, List[int]] = {}
+        self._not_equal: Dict[Any, List[int]] = {}
+        self._lower: List[Tuple[Any, bool, int]] = []  # > and >=, sorted by bound
+        self._upper: List[Tuple[Any, bool, int]] = []  # < and <=, sorted by bound
+
+        for i, (branch, subtree) in enumerate(branches.items()):
+            op_str, operand = split_branch_key(branch)
+            operand = convert_operand(operand, field_type, key)
+            self.branches.append(compile_defaults_tree(subtree, field_types) if isinstance(subtree, Dict) else subtree)
+
+            if op_str == "=":
+                self._equal.setdefault(operand, []).append(i)
+            elif op_str == "!=":
+                self._not_equal.setdefault(operand, []).append(i)
+            elif op_str in (">", ">="):
+                self._lower.append((operand, op_str == ">=", i))
+            else:
+                self._upper.append((operand, op_str == "<=", i))
+
+        try:
+            self._lower.sort(key=lambda b: b[0])
+            self._upper.sort(key=lambda b: b[0])
+        except TypeError:
+            raise InvalidDefaultFileException(f"Range operands of query {key} cannot be compared with each other.")
+        self._lower_bounds = [b[0] for b in self._lower]
+        self._upper_bounds = [b[0] for b in self._upper]
+        self._all_not_equal = sorted(i for inds in self._not_equal.values() for i in inds)
+
+        # Paths of every dependency this query and the queries nested in its branches compare against
+        self.dependencies: FrozenSet[str] = frozenset({self.dependency}.union(*(query_dependencies(b) or () for b in self.branches if isinstance(b, Dict))))
+
+    def matches(self, target_val: Any) -> List[Dict]:
+        '''
+        Returns the defaults trees of every branch that target_val satisfies,
+        in the order the branches were declared.
+        '''
+        if target_val is MV or target_val == MV:
+            return []
+
+        try:
+            matched = list(self._equal.get(target_val, []))
+            excluded = set(self._not_equal.get(target_val, []))
+            matched += [i for i in self._all_not_equal if i not in excluded]
+
+            # Every lower bound below the target matches, and so does every upper bound above it
+            start, end = bisect_left(self._lower_bounds, target_val), bisect_right(self._lower_bounds, target_val)
+            matched += [b[2] for b in self._lower[:start]] + [b[2] for b in self._lower[start:end] if b[1]]
+            start, end = bisect_left(self._upper_bounds, target_val), bisect_right(self._upper_bounds, target_val)
+            matched += [b[2] for b in self._upper[end:]] + [b[2] for b in self._upper[start:end] if b[1]]
+        except TypeError:
+            raise InvalidDefaultFileException(f"Query {self.key} cannot compare value {target_val} with its operands.")
+
+        return [self.branches[i] for i in sorted(matched)]
+
+
+def query_dependencies(tree: Dict) -> Optional[FrozenSet[str]]:
+    '''
+    Returns the paths of the dependencies the queries of a compiled defaults
+    tree compare against, or None if the tree has queries that are not
+    compiled, whose nested queries are not known.
+    '''
+    dependencies: Set[str] = set()
+    for k, v in tree.items():
+        if isinstance(v, CompiledQuery):
+            dependencies |= v.dependencies
+        elif is_query(k):
+            return None
+    return frozenset(dependencies)
+
+def compile_defaults_tree(tree: Dict, field_types: Optional[FieldTypes] = None, parents: Optional[Dict[int, Tuple[Dict, Dict]]] = None) -> Dict:
+    '''
+    Returns a copy of a defaults tree with every query replaced by a
+    CompiledQuery. The original tree is not modified. The trees of MultiConfig
+    options that are not loaded yet are compiled when they are loaded. The
+    parent layer of OverlayTrees is compiled once and shared by the compiled
+    trees of every option.
+
+            Parameters:
+                    tree (Dict): Defaults tree
+                    field_types (Optional[FieldTypes]): Returns the declared
+                        type of a field given a dependency path and field name,
+                        or None if it is not known
+                    parents (Optional[Dict[int, Tuple[Dict, Dict]]]): Parent
+                        layers compiled so far, by id, with the layer they were
+                        compiled from
+
+            Returns:
+                    tree (Dict): Compiled defaults tree
+    '''
+    parents = {} if parents is None else parents
+    compiled = {}
+    for k, v in (tree.own_items() if isinstance(tree, OverlayTree) else tree.items()):
+        if is_query(k) and isinstance(v, Dict):
+            dependency, field = split_query_key(k)
+            compiled[k] = CompiledQuery(k, v, None if field_types is None else field_types(dependency, field), field_types)
+        elif isinstance(v, Dict):
+            compiled[k] = compile_defaults_tree(v, field_types, parents)
+        elif isinstance(v, LazyOptionTrees):
+            compiled[k] = v.map_trees(lambda option, option_tree: compile_defaults_tree(option_tree, field_types, parents))
+        else:
+            compiled[k] = v
+
+    if isinstance(tree, OverlayTree):
+        if not id(tree.parent) in parents:
+            parents[id(tree.parent)] = (tree.parent, compile_defaults_tree(tree.parent, field_types, parents))
+        return OverlayTree(compiled, parents[id(tree.parent)][1])
+    return compiled
+
+def schema_field_types(schemas: Dict[str, Type[Any]]) -> FieldTypes:
+    '''
+    Creates a FieldTypes function from the schemas at each dependency path, as
+    found in the references returned by validate_refs.
+    '''
+    def field_types(dependency: str, field: str) -> Optional[Type[Any]]:
+        schema = schemas.get(dependency)
+        if schema is None:
+            return None
+
+        for cls in schema_info(schema).variants:
+            info = schema_info(cls)
+            if field in info.kinds:
+                if info.kinds[field] == MULTI:
+                    return str
+                if info.kinds[field] == CONFIG:
+                    return None
+                field_type = info.types[field]
+                return field_type if isinstance(field_type, type) else None
+        return None
+
+    return field_types
@@ -1,21 +1,60 @@
-from typing import Type, cast, Union, Dict, Callable
-from .config import Config, MultiConfig
+from typing import Type, cast, Union, Dict, Callable, List, Tuple, Iterable, IO, Any
+from pathlib import Path
+import json
 import yaml
+from .config import Config, MultiConfig, schema_info
 
 
+def field_names(cls: Type[Any]) -> Tuple[str, ...]:
+    '''
+    Returns the names of the fields of a config class that are serialized.
+    Private fields and fields declared as callables are left out.
+    '''
+    return schema_info(cls).serialized
+
 def dictize(config: Config) -> Dict:
     d = {}
-    for k, v in config.__dict__.items():
-        if (k[0] == "_") or isinstance(v, Callable):
-            pass
-        elif isinstance(v, Config):
+    values = config.__dict__
+    for k in field_names(config.__class__):
+        v = values.get(k)
+        if callable(v):
+            continue  # Callables held by fields that are not declared as such (e.g. Any)
+        if isinstance(v, Config):
             d[k] = dictize(v)
         elif isinstance(v, MultiConfig):
             d[k] = dictize(v._config)
             d[k]["_selected"] = v._selected
-        else:
+        elif k in values:
             d[k] = v
     return d
 
 def yamlize(config: Config) -> str:
-    return yaml.dump(dictize(config))
+    return yaml.dump(dictize(config), Dumper=yaml.CDumper)
+
+def jsonize(config: Config, indent: Union[int, None] = None) -> str:
+    return json.dumps(dictize(config), indent=indent, sort_keys=True)
+
+def write_jsonl(configs: Iterable[Config], out: Union[str, Path, IO[str]]) -> int:
+    '''
+    Writes configs to a stream or file as JSON lines, one config per line, as
+    they are produced. A line can be loaded again with load_path
+    <file>.jsonl:<line index>.
+
+            Parameters:
+                    configs (Iterable[Config]): Configs to write, e.g. the
+                        iterator returned by build_sweep
+                    out (Union[str, Path, IO[str]]): File path or text stream
+
+            Returns:
+                    count (int): Number of configs written
+    '''
+    if isinstance(out, (str, Path)):
+        with open(out, "w") as f:
+            return write_jsonl(configs, f)
+
+    count = 0
+    for config in configs:
+        out.write(json.dumps(dictize(config), sort_keys=True))
+        out.write("\n")
+        count += 1
+    return count
@@ -0,0 +1,122 @@
+from typing import Type, TypeVar, Dict, List, Any, Optional, Union
+from pathlib import Path
+import os
+import pickle
+import warnings
+from .config import Config, MultiConfig, schema_info, schema_fingerprint, CONFIG, MULTI
+from .builder import build
+from .cache import DefaultsCache
+from .exceptions import InvalidSnapshotException
+
+
+SNAPSHOT_VERSION = 1
+
+
+T = TypeVar("T", bound=Config)
+def save_snapshot(config: Config, path: Union[str, Path]) -> None:
+    '''
+    Saves a built config, including MultiConfig selections and which fields
+    were set explicitly, to a binary snapshot that load_snapshot can turn back
+    into config objects without building. The file is replaced atomically, so
+    workers loading the snapshot never see it partially written.
+
+            Parameters:
+                    config (Config): Built config
+                    path (Union[str, Path]): Snapshot file
+    '''
+    path = Path(path)
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": schema_fingerprint(config.__class__),
+        "config": encode_config(config),
+    }
+
+    tmp_path = path.with_name(path.name + ".{}.tmp".format(os.getpid()))
+    with tmp_path.open("wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def load_snapshot(base_schema: Type[T], path: Union[str, Path], directory: Optional[str] = None, args: List[str] = [], overrides: Optional[Dict[str, Any]] = None, cache: Optional[DefaultsCache] = None) -> T:
+    '''
+    Loads a config saved with save_snapshot. Objects are created directly from
+    the snapshot, without reading defaults, parsing arguments or ordering
+    dependencies. If the snapshot is missing, unreadable or was saved from a
+    schema with a different fingerprint, the config is built from directory
+    instead (with args and overrides, which are otherwise not used) and saved
+    as the new snapshot.
+
+            Parameters:
+                    base_schema (Type[T]): Schema the snapshot was saved from
+                    path (Union[str, Path]): Snapshot file
+                    directory (Optional[str]): Directory to build from if the
+                        snapshot cannot be used. InvalidSnapshotException is
+                        raised instead if not provided.
+                    args (List[str]): Command line arguments for the fallback
+                        build
+                    overrides (Optional[Dict[str, Any]]): Overrides for the
+                        fallback build
+                    cache (Optional[DefaultsCache]): Cache for the fallback
+                        build
+
+            Returns:
+                    config (T): Loaded (or built) config
+    '''
+    try:
+        return read_snapshot(base_schema, path)
+    except InvalidSnapshotException as e:
+        if directory is None:
+            raise
+        warnings.warn(f"{e} Building from {directory} instead.")
+
+    config = build(base_schema, directory, args=args, overrides=overrides, cache=cache)
+    save_snapshot(config, path)
+    return config
+
+def read_snapshot(base_schema: Type[T], path: Union[str, Path]) -> T:
+    try:
+        with Path(path).open("rb") as f:
+            snapshot = pickle.load(f)
+    except Exception as e:  # Unpickling a damaged file can raise almost anything
+        raise InvalidSnapshotException(f"Snapshot {path} could not be read ({e}).")
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise InvalidSnapshotException(f"Snapshot {path} was saved by an incompatible version.")
+    if snapshot.get("fingerprint") != schema_fingerprint(base_schema):
+        raise InvalidSnapshotException(f"Snapshot {path} was saved from a different version of schema {base_schema.__qualname__}.")
+
+    return decode_config(base_schema, snapshot["config"])
+
+
+# Configs are stored as [field values in declaration order, explicitly set fields] and MultiConfigs as
+# [selected option, stored option config]. Which fields hold nested configs is known from the schema.
+
+def encode_config(config: Config) -> List:
+    values = config.__dict__
+    encoded = []
+    for name in schema_info(config.__class__).kinds.keys():
+        v = values.get(name)
+        if isinstance(v, Config):
+            encoded.append(encode_config(v))
+        elif isinstance(v, MultiConfig):
+            encoded.append([v._selected, encode_config(v._config)])
+        else:
+            encoded.append(v)
+    return [encoded, values.get("_explicit_fields")]
+
+def decode_config(schema: Type[T], encoded: List) -> T:
+    values, explicit_fields = encoded
+    config = object.__new__(schema)
+    attrs = config.__dict__
+    info = schema_info(schema)
+    for (name, kind), v in zip(info.kinds.items(), values):
+        if isinstance(v, list) and kind == MULTI:
+            multi = object.__new__(info.types[name])
+            multi._selected = v[0]
+            multi._config = decode_config(schema_info(info.types[name]).options[v[0]], v[1])
+            v = multi
+        elif isinstance(v, list) and kind == CONFIG:
+            v = decode_config(info.types[name], v)
+        attrs[name] = v
+    if explicit_fields is not None:
+        attrs["_explicit_fields"] = explicit_fields
+    return config
@@ -0,0 +1,174 @@
+from typing import Type, TypeVar, Dict, List, Any, Iterator, Iterable, Optional, Union, NamedTuple, Deque
+from itertools import product
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from pathlib import Path
+from .config import Config
+from .builder import compile, BuildPlan
+from .cache import DefaultsCache
+from .serialization import yamlize, jsonize, dictize
+import json
+import os
+from .exceptions import InvalidPathException
+
+
+OUT_FORMATS = {"yaml": yamlize, "json": jsonize, "jsonl": None}
+
+
+T = TypeVar("T", bound=Config)
+def build_sweep(base_schema: Type[T], directory: str, grid: Dict[str, List[Any]], args: List[str] = [], out_dir: Optional[Union[str, Path]] = None, cache: Optional[DefaultsCache] = None, out_format: str = "yaml") -> Iterator[T]:
+    '''
+    Lazily builds one config for every point in a grid of field values. The
+    directory is read, references are validated and the build order is
+    generated once for the whole sweep, and grid values are set directly
+    as type checked overrides instead of going through the argument parser
+    (see BuildPlan.build). Points are produced in the
+    same order as itertools.product, with the last field in the grid changing
+    fastest.
+
+            Parameters:
+                    base_schema (Type[T]): Schema to be built
+                    directory (str): Directory holding defaults for base_schema
+                    grid (Dict[str, List[Any]]): Values to sweep over for each
+                        field path (e.g. "nested_config.some_field"). Values
+                        take the place of command line arguments, so a
+                        MultiConfig path takes option names.
+                    args (List[str]): Command line arguments applied to every
+                        point
+                    out_dir (Optional[Union[str, Path]]): If provided, each
+                        config is written to <out_dir>/<index>.yaml as it is
+                        built
+                    cache (Optional[DefaultsCache]): Persistent cache of parsed
+                        defaults files
+                    out_format (str): "yaml", "json" (<out_dir>/<index>.json)
+                        or "jsonl" (one line per config in
+                        <out_dir>/sweep.jsonl)
+
+            Returns:
+                    configs (Iterator[T]): Built configs, one per grid point
+    '''
+
+    return sweep_plan(compile(base_schema, directory, cache=cache), grid, args, out_dir, out_format)
+
+def sweep_plan(plan: BuildPlan[T], grid: Dict[str, List[Any]], args: List[str] = [], out_dir: Optional[Union[str, Path]] = None, out_format: str = "yaml") -> Iterator[T]:
+    '''
+    Same as build_sweep but for an already compiled plan.
+    '''
+    base_args = plan.parse_args(args)[0] if len(args) > 0 else {}
+    for path in grid.keys():
+        if not path in plan.fields:
+            raise InvalidPathException(f"Sweep field {path} is not a field in schema {plan.base_schema}.")
+
+    if not out_format in OUT_FORMATS:
+        raise ValueError(f"Sweep output format {out_format} is not one of {', '.join(OUT_FORMATS)}.")
+    if out_dir is not None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    return sweep_helper(plan, grid, base_args, out_dir, out_format)
+
+def sweep_helper(plan: BuildPlan[T], grid: Dict[str, List[Any]], base_args: Dict, out_dir: Optional[Path], out_format: str) -> Iterator[T]:
+    paths = list(grid.keys())
+    jsonl = None if out_dir is None or out_format != "jsonl" else (out_dir / "sweep.jsonl").open("w")
+    try:
+        for i, values in enumerate(product(*grid.values())):
+            point_args = dict(base_args)
+            point_args.update(plan.check_overrides(dict(zip(paths, values))))
+            config = plan.build_from_args(point_args)
+
+            if jsonl is not None:
+                jsonl.write(json.dumps(dictize(config), sort_keys=True) + "\n")
+                jsonl.flush()
+            elif out_dir is not None:
+                (out_dir / f"{i}.{out_format}").write_text(OUT_FORMATS[out_format](config))
+
+            yield config
+    finally:
+        if jsonl is not None:
+            jsonl.close()
+
+
+class SweepResult(NamedTuple):
+    index: int
+    overrides: Dict[str, Any]
+    config: Any  # The built config, its serialized form, or None if building failed
+    error: Optional[Exception]
+
+
+def run_sweep(base_schema: Type[T], directory: str, points: Iterable[Dict[str, Any]], args: List[str] = [], workers: Optional[int] = None, window: Optional[int] = None, out_format: Optional[str] = None, cache: Optional[DefaultsCache] = None) -> Iterator[SweepResult]:
+    '''
+    Builds one config per set of overrides in a pool of processes. Each worker
+    compiles the plan once and then builds points with BuildPlan.build, so
+    every point is built exactly as build(base_schema, directory, args=args,
+    overrides=point) would build it. Results are produced in the order of
+    points, and at most window points are in flight at once, so memory does
+    not grow with the length of the sweep (points can be a generator).
+    Exceptions raised while building a point are returned with its result
+    instead of stopping the sweep.
+
+            Parameters:
+                    base_schema (Type[T]): Schema to be built, must be
+                        importable by the worker processes
+                    directory (str): Directory holding defaults for base_schema
+                    points (Iterable[Dict[str, Any]]): Overrides for each point
+                    args (List[str]): Command line arguments applied to every
+                        point
+                    workers (Optional[int]): Number of processes, defaults to
+                        the number of CPUs
+                    window (Optional[int]): Maximum number of points submitted
+                        but not yet returned, defaults to twice the number of
+                        workers
+                    out_format (Optional[str]): Return configs serialized as
+                        "yaml" or "json" instead of as objects, which is
+                        cheaper to send back from the workers
+                    cache (Optional[DefaultsCache]): Persistent cache the
+                        workers read parsed defaults files from
+
+            Returns:
+                    results (Iterator[SweepResult]): Index, overrides, config
+                        (or serialized config) and exception of every point
+    '''
+    if out_format is not None and OUT_FORMATS.get(out_format) is None:
+        raise ValueError(f"Sweep output format {out_format} is not one of yaml, json.")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    window = 2 * workers if window is None else window
+    if window < 1:
+        raise ValueError("Sweep window must be at least 1.")
+
+    return run_sweep_helper(base_schema, directory, points, args, workers, window, out_format, None if cache is None else cache.path)
+
+def run_sweep_helper(base_schema: Type[T], directory: str, points: Iterable[Dict[str, Any]], args: List[str], workers: int, window: int, out_format: Optional[str], cache_path: Optional[Path]) -> Iterator[SweepResult]:
+    in_flight: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_sweep_worker, initargs=(base_schema, directory, cache_path)) as executor:
+        points = iter(enumerate(points))
+        for i, overrides in points:
+            in_flight.append(executor.submit(build_sweep_point, i, overrides, args, out_format))
+            if len(in_flight) >= window:
+                break
+
+        while len(in_flight) > 0:
+            result = in_flight.popleft().result()
+            for i, overrides in points:
+                in_flight.append(executor.submit(build_sweep_point, i, overrides, args, out_format))
+                break
+            yield result
+
+
+_worker_plan: Optional[BuildPlan] = None
+_worker_error: Optional[Exception] = None
+
+def init_sweep_worker(base_schema: Type[Config], directory: str, cache_path: Optional[Path]) -> None:
+    global _worker_plan, _worker_error
+    try:
+        _worker_plan = compile(base_schema, directory, cache=None if cache_path is None else DefaultsCache(cache_path))
+    except Exception as e:
+        _worker_error = e  # Reported with every point, like any other build error
+
+def build_sweep_point(index: int, overrides: Dict[str, Any], args: List[str], out_format: Optional[str]) -> SweepResult:
+    try:
+        if _worker_plan is None:
+            raise _worker_error
+        config = _worker_plan.build(args, overrides=overrides)
+        return SweepResult(index, overrides, config if out_format is None else OUT_FORMATS[out_format](config), None)
+    except Exception as e:
+        return SweepResult(index, overrides, None, e)
@@ -0,0 +1,153 @@
+from typing import Dict, List, Any, Callable, Optional, Iterator
+from contextlib import contextmanager
+import threading
+import time
+
+
+class Span:
+    '''
+    A timed phase of a build. Durations are in seconds.
+    '''
+    __slots__ = ("name", "attrs", "start", "duration", "depth")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], start: float, duration: float, depth: int):
+        self.name = name
+        self.attrs = attrs
+        self.start = start
+        self.duration = duration
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        attrs = "".join(f", {k}={v!r}" for k, v in self.attrs.items())
+        return f"Span({self.name}, {self.duration * 1000:.3f}ms{attrs})"
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "name", "attrs", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> "_ActiveSpan":
+        self.tracer._local.depth = getattr(self.tracer._local, "depth", 0) + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        duration = time.perf_counter() - self.start
+        self.tracer._local.depth -= 1
+        self.tracer._finish(Span(self.name, self.attrs, self.start, duration, self.tracer._local.depth))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    '''
+    Collects timed spans and counters while tracing is enabled with trace.
+
+            Parameters:
+                    callback (Optional[Callable[[Span], None]]): Called with
+                        every span as it finishes, e.g. to forward spans to
+                        another tracing system
+                    keep_spans (bool): Keep every span in spans. Only the
+                        totals used by summary are kept otherwise.
+    '''
+
+    def __init__(self, callback: Optional[Callable[[Span], None]] = None, keep_spans: bool = True):
+        self.callback = callback
+        self.keep_spans = keep_spans
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+        self._totals: Dict[str, List[float]] = {}  # name: [count, total, max]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def span(self, name: str, attrs: Dict[str, Any]) -> _ActiveSpan:
+        return _ActiveSpan(self, name, attrs)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            if self.keep_spans:
+                self.spans.append(span)
+            totals = self._totals.setdefault(span.name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += span.duration
+            totals[2] = max(totals[2], span.duration)
+        if self.callback is not None:
+            self.callback(span)
+
+    def summary(self) -> str:
+        '''
+        Returns a report of the number of calls, total, mean and maximum time
+        of every span name, slowest total first, followed by the counters.
+        '''
+        with self._lock:
+            totals = sorted(self._totals.items(), key=lambda t: t[1][1], reverse=True)
+            counters = sorted(self.counters.items())
+
+        width = max([len("span")] + [len(name) for name, _ in totals])
+        lines = [f"{'span':<{width}}  {'calls':>7}  {'total ms':>10}  {'mean ms':>9}  {'max ms':>9}"]
+        for name, (calls, total, longest) in totals:
+            lines.append(f"{name:<{width}}  {int(calls):>7}  {total * 1000:>10.3f}  {total * 1000 / calls:>9.3f}  {longest * 1000:>9.3f}")
+        for name, value in counters:
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+
+_tracer: Optional[Tracer] = None
+
+
+@contextmanager
+def trace(callback: Optional[Callable[[Span], None]] = None, keep_spans: bool = True) -> Iterator[Tracer]:
+    '''
+    Traces every build (and compile) in the block, in any thread. Tracing is
+    off outside of trace blocks, where spans and counters cost a single check.
+
+            Parameters:
+                    callback (Optional[Callable[[Span], None]]): Called with
+                        every span as it finishes
+                    keep_spans (bool): Keep every span on the tracer
+
+            Returns:
+                    tracer (Tracer): Collected spans and counters, see
+                        Tracer.summary
+    '''
+    global _tracer
+    previous = _tracer
+    tracer = Tracer(callback, keep_spans)
+    _tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _tracer = previous
+
+def span(name: str, **attrs: Any) -> Any:
+    '''
+    Times a block as a span of the active tracer, if tracing is enabled.
+    '''
+    tracer = _tracer
+    return _NULL_SPAN if tracer is None else tracer.span(name, attrs)
+
+def count(name: str, n: int = 1) -> None:
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, n)
+
+def tracing() -> bool:
+    return _tracer is not None
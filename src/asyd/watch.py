@@ -0,0 +1,126 @@
+from typing import TypeVar, Dict, List, Tuple, Callable, Optional
+from pathlib import Path
+import os
+import threading
+from .config import Config
+from .builder import BuildPlan
+from .cache import DefaultsCache
+from .loading import YAML_EXTS
+
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+T = TypeVar("T", bound=Config)
+
+
+def snapshot_directory(directory: Path) -> Snapshot:
+    '''
+    Returns the size and modification time of every file under directory, or
+    of directory itself if it is a file (a bundle).
+    '''
+    snapshot = {}
+    if os.path.isfile(directory):
+        stat = os.stat(directory)
+        return {str(directory): (stat.st_size, stat.st_mtime_ns)}
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Removed while walking, will be noticed by the next snapshot
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+class DefaultsWatcher:
+    '''
+    Polls the configuration directory of a plan and keeps a config built from
+    it up to date as defaults files change. Changes are detected by comparing
+    stat snapshots, so this works on any file system. When something changed,
+    only the changed files are parsed again, the plan's defaults tree is
+    replaced and only the configs whose defaults changed (and the configs that
+    depend on them) are resolved again. Explicitly set values are kept.
+
+            Parameters:
+                    plan (BuildPlan[T]): Plan the config was built from
+                    config (T): Config to keep up to date, modified in place
+                    callback (Callable[[T, List[str]], None]): Called with the
+                        config and the paths of the fields that changed
+                    interval (float): Seconds between polls when running in
+                        the background
+                    on_error (Optional[Callable[[Exception], None]]): Called
+                        when the directory cannot be loaded, e.g. because a
+                        file is only partially written. The old defaults are
+                        kept and loading is tried again on the next poll.
+                    cache (Optional[DefaultsCache]): Cache of parsed files, an
+                        in-memory cache is used if not provided. Passing the
+                        cache the plan was compiled with avoids parsing the
+                        directory again on startup.
+    '''
+
+    def __init__(self, plan: BuildPlan[T], config: T, callback: Callable[[T, List[str]], None], interval: float = 1.0, on_error: Optional[Callable[[Exception], None]] = None, cache: Optional[DefaultsCache] = None):
+        self.plan = plan
+        self.config = config
+        self.callback = callback
+        self.interval = interval
+        self.on_error = on_error
+        self.cache = DefaultsCache(None) if cache is None else cache
+
+        # Parse everything once now, so that later polls only parse the files that changed
+        self._snapshot = snapshot_directory(plan.directory)
+        for path in self._snapshot.keys():
+            if path.endswith(tuple(YAML_EXTS)):
+                self.cache.load(Path(path))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> List[str]:
+        '''
+        Checks the directory once and applies any changes.
+
+                Returns:
+                        changed (List[str]): Paths of the fields that changed
+        '''
+        snapshot = snapshot_directory(self.plan.directory)
+        if snapshot == self._snapshot:
+            return []
+
+        for path in self._snapshot.keys() - snapshot.keys():
+            self.cache.invalidate(path)
+
+        try:
+            stale_paths = self.plan.reload_defaults(self.cache, self.config)
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+            return []
+
+        self._snapshot = snapshot
+        changed = self.plan.refresh(self.config, stale_paths)
+        if len(changed) > 0:
+            self.callback(self.config, changed)
+        return changed
+
+    def run(self) -> None:
+        '''
+        Polls until stop is called.
+        '''
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self) -> "DefaultsWatcher":
+        '''
+        Starts polling in a background thread.
+        '''
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="asyd-defaults-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
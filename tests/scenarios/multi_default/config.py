@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from asyd import Config, MCMeta, ConfigRef, MV, build, yamlize
+from asyd import Config, MultiConfig, ConfigRef, MV, build, yamlize
 import pathlib
 
 
@@ -11,13 +11,13 @@ class ConfigA(Config):
 class ConfigB(Config):
     field_b: str = MV
 
-class SomeMulti(metaclass=MCMeta,
-                options = {
-                    "first": ConfigA,
-                    "second": ConfigA,
-                    "third": ConfigB
-                }):
-    pass
+@dataclass
+class SomeMulti(MultiConfig[Config]):
+    _options = {
+        "first": ConfigA,
+        "second": ConfigA,
+        "third": ConfigB
+    }
 
 @dataclass
 class BaseConfig(Config):
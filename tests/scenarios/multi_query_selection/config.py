@@ -0,0 +1,37 @@
+from dataclasses import dataclass, field
+from asyd import Config, MultiConfig, ConfigRef, MV, build, yamlize
+import pathlib
+
+
+@dataclass
+class DepConfig(Config):
+    x: int = MV
+
+@dataclass
+class InnerConfig(Config):
+    value: int = MV
+
+@dataclass
+class OptionA(Config):
+    a: int = MV
+
+@dataclass
+class OptionB(Config):
+    inner: InnerConfig = MV
+
+@dataclass
+class SomeMulti(MultiConfig[Config]):
+    _options = {
+        "a": OptionA,
+        "b": OptionB
+    }
+
+@dataclass
+class HolderConfig(Config):
+    m: SomeMulti = MV
+    _default_dependencies = {ConfigRef("dep")}
+
+@dataclass
+class BaseConfig(Config):
+    dep: DepConfig = MV
+    holder: HolderConfig = MV
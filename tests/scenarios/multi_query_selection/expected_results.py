@@ -0,0 +1,30 @@
+expected_results = {
+    "": {
+        "exception": None,
+        "result": {
+            "dep": {"x": 1},
+            "holder": {"m": {"_selected": "b", "inner": {"value": 7}}}
+        }
+    },
+    "--dep.x=0": {
+        "exception": None,
+        "result": {
+            "dep": {"x": 0},
+            "holder": {"m": {"_selected": "a", "a": 3}}
+        }
+    },
+    "--dep.x=0 --holder.m=b": {
+        "exception": None,
+        "result": {
+            "dep": {"x": 0},
+            "holder": {"m": {"_selected": "b", "inner": {"value": 7}}}
+        }
+    },
+    "--holder.m=a": {
+        "exception": None,
+        "result": {
+            "dep": {"x": 1},
+            "holder": {"m": {"_selected": "a", "a": 3}}
+        }
+    },
+}
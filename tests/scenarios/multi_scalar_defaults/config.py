@@ -0,0 +1,25 @@
+from dataclasses import dataclass, field
+from asyd import Config, MultiConfig, ConfigRef, MV, build, yamlize
+import pathlib
+
+
+@dataclass
+class ConfigA(Config):
+    field_a: int = MV
+
+@dataclass
+class ConfigB(Config):
+    field_b: str = MV
+
+@dataclass
+class SomeMulti(MultiConfig[Config]):
+    _options = {
+        "first": ConfigA,
+        "second": ConfigA,
+        "third": ConfigB
+    }
+
+@dataclass
+class BaseConfig(Config):
+    some_field: str = MV
+    some_multi: SomeMulti = MV
@@ -0,0 +1,6 @@
+expected_results = {
+    "--some_multi=first": {
+        "exception": "InvalidDefaultFileException",
+        "result": None
+    },
+}
@@ -0,0 +1,10 @@
+from dataclasses import dataclass, field
+from typing import List, Dict
+from asyd import Config, ConfigRef, MV, build, yamlize
+import pathlib
+
+
+@dataclass
+class BaseConfig(Config):
+    tags: List[str] = MV
+    mapping: Dict[str, int] = MV
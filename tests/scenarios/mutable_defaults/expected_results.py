@@ -0,0 +1,9 @@
+expected_results = {
+    "": {
+        "exception": None,
+        "result": {
+            "tags": ["a", "b"],
+            "mapping": {"k": 1}
+        }
+    },
+}
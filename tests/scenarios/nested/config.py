@@ -10,4 +10,4 @@ class NestedConfig(Config):
 @dataclass
 class BaseConfig(Config):
     some_field: str = MV
-    nested_config: NestedConfig = NestedConfig()
+    nested_config: NestedConfig = MV
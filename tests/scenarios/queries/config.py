@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from asyd import Config, ConfigRef, MV, build, yamlize
+import pathlib
+
+
+@dataclass
+class DepConfig(Config):
+    x: int = MV
+    name: str = MV
+    ratio: float = MV
+
+@dataclass
+class TargetConfig(Config):
+    eq: str = MV
+    ne: str = MV
+    gt: str = MV
+    ge: str = MV
+    lt: str = MV
+    le: str = MV
+    first: str = MV
+    named: str = MV
+    high_ratio: str = MV
+    _default_dependencies = {ConfigRef("dep")}
+
+@dataclass
+class BaseConfig(Config):
+    dep: DepConfig = MV
+    target: TargetConfig = MV
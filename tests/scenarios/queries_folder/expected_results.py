@@ -0,0 +1,99 @@
+expected_results = {'': {'exception': None,
+      'result': {'dep': {'x': 5, 'name': 'abc', 'ratio': 0.5},
+                 'target': {'eq': 'yes',
+                            'ne': '???',
+                            'gt': '???',
+                            'ge': '???',
+                            'lt': '???',
+                            'le': '???',
+                            'first': 'ge3',
+                            'named': 'abc',
+                            'high_ratio': 'yes'}}},
+ '--dep.x=4': {'exception': None,
+               'result': {'dep': {'x': 4, 'name': 'abc', 'ratio': 0.5},
+                          'target': {'eq': '???',
+                                     'ne': 'yes',
+                                     'gt': '???',
+                                     'ge': '???',
+                                     'lt': '???',
+                                     'le': '???',
+                                     'first': 'ge3',
+                                     'named': 'abc',
+                                     'high_ratio': 'yes'}}},
+ '--dep.x=9': {'exception': None,
+               'result': {'dep': {'x': 9, 'name': 'abc', 'ratio': 0.5},
+                          'target': {'eq': '???',
+                                     'ne': 'yes',
+                                     'gt': '???',
+                                     'ge': '???',
+                                     'lt': '???',
+                                     'le': '???',
+                                     'first': 'ge3',
+                                     'named': 'abc',
+                                     'high_ratio': 'yes'}}},
+ '--dep.x=10': {'exception': None,
+                'result': {'dep': {'x': 10, 'name': 'abc', 'ratio': 0.5},
+                           'target': {'eq': '???',
+                                      'ne': 'yes',
+                                      'gt': '???',
+                                      'ge': 'yes',
+                                      'lt': '???',
+                                      'le': '???',
+                                      'first': 'ge3',
+                                      'named': 'abc',
+                                      'high_ratio': 'yes'}}},
+ '--dep.x=11': {'exception': None,
+                'result': {'dep': {'x': 11, 'name': 'abc', 'ratio': 0.5},
+                           'target': {'eq': '???',
+                                      'ne': 'yes',
+                                      'gt': 'yes',
+                                      'ge': 'yes',
+                                      'lt': '???',
+                                      'le': '???',
+                                      'first': 'ge3',
+                                      'named': 'abc',
+                                      'high_ratio': 'yes'}}},
+ '--dep.x=0': {'exception': None,
+               'result': {'dep': {'x': 0, 'name': 'abc', 'ratio': 0.5},
+                          'target': {'eq': '???',
+                                     'ne': 'yes',
+                                     'gt': '???',
+                                     'ge': '???',
+                                     'lt': '???',
+                                     'le': 'yes',
+                                     'first': '???',
+                                     'named': 'abc',
+                                     'high_ratio': 'yes'}}},
+ '--dep.x=-1': {'exception': None,
+                'result': {'dep': {'x': -1, 'name': 'abc', 'ratio': 0.5},
+                           'target': {'eq': '???',
+                                      'ne': 'yes',
+                                      'gt': '???',
+                                      'ge': '???',
+                                      'lt': 'yes',
+                                      'le': 'yes',
+                                      'first': '???',
+                                      'named': 'abc',
+                                      'high_ratio': 'yes'}}},
+ '--dep.name=zzz': {'exception': None,
+                    'result': {'dep': {'x': 5, 'name': 'zzz', 'ratio': 0.5},
+                               'target': {'eq': 'yes',
+                                          'ne': '???',
+                                          'gt': '???',
+                                          'ge': '???',
+                                          'lt': '???',
+                                          'le': '???',
+                                          'first': 'ge3',
+                                          'named': 'other',
+                                          'high_ratio': 'yes'}}},
+ '--dep.ratio=0.1': {'exception': None,
+                     'result': {'dep': {'x': 5, 'name': 'abc', 'ratio': 0.1},
+                                'target': {'eq': 'yes',
+                                           'ne': '???',
+                                           'gt': '???',
+                                           'ge': '???',
+                                           'lt': '???',
+                                           'le': '???',
+                                           'first': 'ge3',
+                                           'named': 'abc',
+                                           'high_ratio': '???'}}}}
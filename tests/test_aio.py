@@ -0,0 +1,40 @@
+from pathlib import Path
+import asyncio
+from asyd import build, dictize, abuild, acompile, trace
+from asyd.aio import _in_flight
+from scenarios.queries.config import BaseConfig as QueriesConfig
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+QUERIES = SCENARIOS / "queries" / "config"
+
+
+def test_abuild_matches_build(tmp_path):
+    args = ["--dep.x=11", "--target.eq=mine"]
+    config = asyncio.run(abuild(QueriesConfig, QUERIES, args=args))
+    assert dictize(config) == dictize(build(QueriesConfig, QUERIES, args=args))
+
+    for option in ("first", "third"):
+        args = [f"--some_multi={option}"]
+        config = asyncio.run(abuild(MultiConfig, SCENARIOS / "multi_default" / "config", args=args))
+        assert dictize(config) == dictize(build(MultiConfig, SCENARIOS / "multi_default" / "config", args=args))
+
+def test_concurrent_abuild_shares_one_load():
+    async def main():
+        return await asyncio.gather(
+            acompile(QueriesConfig, QUERIES),
+            acompile(QueriesConfig, str(QUERIES)),
+            *[abuild(QueriesConfig, QUERIES, args=[f"--dep.x={x}"]) for x in range(5)])
+
+    with trace() as tracer:
+        first, second, *configs = asyncio.run(main())
+    assert first is second
+    assert [c.dep.x for c in configs] == list(range(5))
+    assert tracer.counters["files_read"] == len(list(QUERIES.rglob("*.yaml")))
+    assert len([s for s in tracer.spans if s.name == "compile_defaults_tree"]) == 1
+    assert _in_flight == {}
+
+    # Once the load is done, later calls load the directory again
+    async def again():
+        return await acompile(QueriesConfig, QUERIES)
+    assert asyncio.run(again()) is not first
@@ -0,0 +1,76 @@
+from pathlib import Path
+import pytest
+from asyd import compile, dictize
+from asyd.argparsing import parse, schema_fields, check_overrides
+from asyd.exceptions import InvalidOverrideException, InvalidPathException
+from scenarios.multi.config import BaseConfig as MultiConfig
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+@pytest.mark.parametrize("args", [
+    [],
+    ["--some_field=yes"],
+    ["--some_multi=first", "--some_multi.field_a=3"],
+    ["--some_multi", "second", "--some_multi.field_a", "4", "--some_field", "no"],
+    ["--some_multi=third", "--some_multi.field_b=b"],
+    ["--some_multi.field_a=5"],  # The first option is selected when none is
+])
+def test_two_phase_parse_matches_single_parse(args):
+    plan = compile(MultiConfig, SCENARIOS / "multi" / "config")
+    parsed_args, loaded_config = plan.parse_args(args)
+    assert parsed_args == parse(MultiConfig, args=args)
+    assert loaded_config is None
+
+def test_two_phase_parse_without_multis():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    args = ["--dep.x=3", "--target.eq=no"]
+    assert plan.parse_args(args)[0] == parse(QueriesConfig, args=args)
+
+def test_flag_of_unselected_option(capsys):
+    plan = compile(MultiConfig, SCENARIOS / "multi" / "config")
+    with pytest.raises(SystemExit):
+        plan.parse_args(["--some_multi=third", "--some_multi.field_a=3"])
+    err = capsys.readouterr().err
+    assert "--some_multi.field_a=3 belongs to option first of some_multi, but third is selected" in err
+    assert "--some_multi.field_a=3 belongs to option second of some_multi, but third is selected" in err
+
+def test_unknown_flag(capsys):
+    plan = compile(MultiConfig, SCENARIOS / "multi" / "config")
+    with pytest.raises(SystemExit):
+        plan.parse_args(["--some_multi=first", "--nope=1"])
+    assert "unrecognized arguments: --nope=1" in capsys.readouterr().err
+
+def test_invalid_selection(capsys):
+    plan = compile(MultiConfig, SCENARIOS / "multi" / "config")
+    with pytest.raises(SystemExit):
+        plan.parse_args(["--some_multi=fourth"])
+    assert "invalid choice: 'fourth'" in capsys.readouterr().err
+
+def test_check_overrides():
+    fields = schema_fields(QueriesConfig)
+    assert check_overrides(fields, {"dep.x": 3, "dep.name": "a", "dep.ratio": 0.5, "target.eq": None}) == {"dep.x": 3, "dep.name": "a", "dep.ratio": 0.5}
+
+    # Ints are accepted for floats, and converted
+    converted = check_overrides(fields, {"dep.ratio": 2})
+    assert converted == {"dep.ratio": 2.0} and type(converted["dep.ratio"]) is float
+
+    for overrides in ({"dep.x": "3"}, {"dep.x": 3.0}, {"dep.name": 1}, {"dep.ratio": "0.5"}, {"dep.ratio": True}):
+        with pytest.raises(InvalidOverrideException):
+            check_overrides(fields, overrides)
+    with pytest.raises(InvalidPathException):
+        check_overrides(fields, {"dep.missing": 1})
+    with pytest.raises(InvalidPathException):
+        check_overrides(fields, {"dep": 1})
+
+def test_check_overrides_multi():
+    fields = schema_fields(MultiConfig)
+    assert check_overrides(fields, {"some_multi": "third", "some_multi.field_b": "b"}) == {"some_multi": "third", "some_multi.field_b": "b"}
+    with pytest.raises(InvalidOverrideException):
+        check_overrides(fields, {"some_multi": "fourth"})
+
+def test_overrides_build_like_args():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    assert dictize(plan.build(overrides={"dep.x": 11, "dep.ratio": 1})) == dictize(plan.build(["--dep.x=11", "--dep.ratio=1"]))
+    assert dictize(plan.build(["--dep.x=11"], overrides={"dep.ratio": 1})) == dictize(plan.build(["--dep.x=11", "--dep.ratio=1"]))
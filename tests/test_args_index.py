@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from asyd import Config, MV, build, dictize, yamlize
+from asyd.builder import index_args, index_loaded_config
+
+
+@dataclass
+class Inner(Config):
+    x: int = MV
+    xy: int = MV
+
+@dataclass
+class Outer(Config):
+    x: int = MV
+    a: Inner = MV
+    ab: Inner = MV
+
+
+def test_index_args():
+    args = {"x": 1, "a.x": 2, "a.xy": 3, "ab.x": 4, "ab.xy": None, "load_path": None}
+    assert index_args(args) == {"": {"x": 1}, "a": {"x": 2, "xy": 3}, "ab": {"x": 4, "xy": None}}
+
+def test_index_loaded_config():
+    loaded = {"x": 1, "a": {"x": 2, "xy": 3}, "ab": {"x": 4, "xy": {"k": 5}}}
+    index = index_loaded_config(loaded)
+    assert index[""] is loaded
+    assert index["a"] == {"x": 2, "xy": 3}
+    assert index["ab"] == {"x": 4, "xy": {"k": 5}}
+
+def test_sibling_prefixes(tmp_path):
+    config = build(Outer, tmp_path, args=["--a.x=2", "--ab.x=4", "--x=1", "--ab.xy=5"])
+    assert dictize(config) == {"x": 1, "a": {"x": 2, "xy": "???"}, "ab": {"x": 4, "xy": 5}}
+
+    (tmp_path / "loaded.yaml").write_text(yamlize(config))
+    assert dictize(build(Outer, tmp_path, args=["--load_path", str(tmp_path / "loaded.yaml"), "--a.xy=3"])) == \
+        {"x": 1, "a": {"x": 2, "xy": 3}, "ab": {"x": 4, "xy": 5}}
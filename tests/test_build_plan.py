@@ -0,0 +1,60 @@
+from pathlib import Path
+from asyd import build, compile, dictize
+from scenarios.mutable_defaults.config import BaseConfig as MutableConfig
+from scenarios.queries.config import BaseConfig as QueriesConfig
+from scenarios.multi_default.config import BaseConfig as MultiDefaultConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+def test_plan_builds_match_build():
+    plan = compile(MutableConfig, SCENARIOS / "mutable_defaults" / "config")
+    assert dictize(plan.build()) == dictize(build(MutableConfig, SCENARIOS / "mutable_defaults" / "config"))
+    assert dictize(plan.build()) == dictize(plan.build())
+
+def test_mutating_built_config_leaves_defaults_alone():
+    plan = compile(MutableConfig, SCENARIOS / "mutable_defaults" / "config")
+    a = plan.build()
+    a.tags.append("MUT")
+    a.mapping["k"] = 2
+
+    b = plan.build()
+    assert b.tags == ["a", "b"]
+    assert b.mapping == {"k": 1}
+    assert b.tags is not a.tags
+
+def test_defaults_memo_counts():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config", memo_size=3)
+    plan.build()  # Base config, dep and target are all resolved
+    assert plan.defaults_memo.stats() == {"hits": 0, "misses": 3, "evictions": 0, "entries": 3, "maxsize": 3}
+
+    assert plan.build().target.eq == "yes"
+    assert plan.defaults_memo.stats() == {"hits": 3, "misses": 3, "evictions": 0, "entries": 3, "maxsize": 3}
+
+    # Only the defaults of target depend on dep.x, and the least recently used entry is target's for x=5
+    assert plan.build(["--dep.x=4"]).target.first == "ge3"
+    assert plan.defaults_memo.stats() == {"hits": 5, "misses": 4, "evictions": 1, "entries": 3, "maxsize": 3}
+
+    assert plan.build().target.first == "ge5"
+    assert plan.defaults_memo.stats() == {"hits": 7, "misses": 5, "evictions": 2, "entries": 3, "maxsize": 3}
+
+def test_memo_hits_return_copies():
+    plan = compile(MutableConfig, SCENARIOS / "mutable_defaults" / "config")
+    a = plan.build()
+    b = plan.build()
+    assert plan.defaults_memo.stats()["hits"] > 0
+    assert a.tags is not b.tags and a.mapping is not b.mapping
+
+    a.tags.append("MUT")
+    b.mapping["k"] = 2
+    c = plan.build()
+    assert c.tags == ["a", "b"]
+    assert c.mapping == {"k": 1}
+
+def test_memo_ignores_unqueried_dependencies():
+    # Options of some_multi depend on the base config only to be built after it, their defaults have no queries
+    plan = compile(MultiDefaultConfig, SCENARIOS / "multi_default" / "config")
+    for value in ["a", "b", "c", "d"]:
+        assert plan.build(["--some_multi=first", f"--some_field={value}"]).some_multi._config.field_a == 1
+    assert plan.defaults_memo.stats()["hits"] == 6
+    assert plan.defaults_memo.stats()["misses"] == 2
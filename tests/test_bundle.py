@@ -0,0 +1,53 @@
+from pathlib import Path
+import importlib
+import shutil
+import subprocess
+import sys
+import pytest
+from asyd import build, compile, dictize, pack_bundle
+from asyd.exceptions import InvalidBundleException
+from scenarios.queries.config import BaseConfig as QueriesConfig
+from scenarios.mutable_defaults.config import BaseConfig as MutableConfig
+
+TESTS_PATH = Path(__file__).parent
+SCENARIOS = TESTS_PATH / "scenarios"
+
+
+@pytest.mark.parametrize("name", ["queries", "queries_folder", "multi_default", "mutable_defaults", "merge_nested_defaults_folder_and_file", "nested_folderdefault"])
+def test_bundle_builds_match_directory(tmp_path, name):
+    schema = importlib.import_module(f"scenarios.{name}.config").BaseConfig
+    expected_results = importlib.import_module(f"scenarios.{name}.expected_results").expected_results
+    pack_bundle(schema, SCENARIOS / name / "config", tmp_path / "bundle.asyd")
+
+    for args, r in expected_results.items():
+        if r["exception"] is not None:
+            continue
+        args = [] if args == "" else args.split(" ")
+        assert dictize(build(schema, tmp_path / "bundle.asyd", args=args)) == dictize(build(schema, SCENARIOS / name / "config", args=args))
+
+def test_bundle_of_other_schema(tmp_path):
+    pack_bundle(MutableConfig, SCENARIOS / "mutable_defaults" / "config", tmp_path / "bundle.asyd")
+    with pytest.raises(InvalidBundleException):
+        compile(QueriesConfig, tmp_path / "bundle.asyd")
+
+    (tmp_path / "damaged.asyd").write_bytes(b"not a bundle")
+    with pytest.raises(InvalidBundleException):
+        compile(QueriesConfig, tmp_path / "damaged.asyd")
+
+def test_reload_bundle(tmp_path):
+    shutil.copytree(SCENARIOS / "queries" / "config", tmp_path / "config")
+    pack_bundle(QueriesConfig, tmp_path / "config", tmp_path / "bundle.asyd")
+    plan = compile(QueriesConfig, tmp_path / "bundle.asyd")
+    config = plan.build()
+    assert plan.reload_defaults(config=config) == []
+
+    (tmp_path / "config" / "target" / "defaults.yaml").write_text("?dep.x:\n  \">=3\":\n    first!: changed\n")
+    pack_bundle(QueriesConfig, tmp_path / "config", tmp_path / "bundle.asyd")
+    assert plan.reload_defaults(config=config) == ["target"]
+    assert sorted(plan.refresh(config, ["target"])) == ["target.eq", "target.first", "target.high_ratio", "target.named"]
+    assert dictize(config) == dictize(build(QueriesConfig, tmp_path / "config"))
+
+def test_pack_command(tmp_path):
+    env = {"PYTHONPATH": str(TESTS_PATH.parent / "src") + ":" + str(TESTS_PATH)}
+    subprocess.run([sys.executable, "-m", "asyd", "pack", "scenarios.queries.config:BaseConfig", str(SCENARIOS / "queries" / "config"), str(tmp_path / "bundle.asyd")], env=env, check=True)
+    assert dictize(build(QueriesConfig, tmp_path / "bundle.asyd")) == dictize(build(QueriesConfig, SCENARIOS / "queries" / "config"))
@@ -0,0 +1,59 @@
+from pathlib import Path
+import shutil
+from asyd import build, DefaultsCache, dictize
+from scenarios.merge_nested_defaults_files.config import BaseConfig
+
+SCENARIO = Path(__file__).parent / "scenarios" / "merge_nested_defaults_files" / "config"
+
+
+def copy_scenario(tmp_path: Path) -> Path:
+    directory = tmp_path / "config"
+    shutil.copytree(SCENARIO, directory)
+    return directory
+
+def test_cached_build_matches_uncached(tmp_path):
+    directory = copy_scenario(tmp_path)
+    cache = DefaultsCache(tmp_path / "cache")
+    expected = dictize(build(BaseConfig, directory))
+
+    assert dictize(build(BaseConfig, directory, cache=cache)) == expected
+    assert cache.stats() == {"hits": 0, "misses": 2, "entries": 2}
+    assert dictize(build(BaseConfig, directory, cache=cache)) == expected
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2}
+
+def test_changed_file_is_parsed_again(tmp_path):
+    directory = copy_scenario(tmp_path)
+    cache = DefaultsCache(tmp_path / "cache")
+    build(BaseConfig, directory, cache=cache)
+
+    (directory / "nested_conf" / "defaults.yaml").write_text("field_b: 2000\n")
+    cache.reset_stats()
+    cfg = build(BaseConfig, directory, cache=cache)
+    assert cfg.nested_conf.field_b == 2000
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_invalidate(tmp_path):
+    directory = copy_scenario(tmp_path)
+    cache = DefaultsCache(None)
+    build(BaseConfig, directory, cache=cache)
+
+    cache.invalidate(directory / "defaults.yaml")
+    assert len(cache) == 1
+    cache.invalidate()
+    assert len(cache) == 0
+
+def test_cache_persists(tmp_path):
+    directory = copy_scenario(tmp_path)
+    build(BaseConfig, directory, cache=DefaultsCache(tmp_path / "cache"))  # Saved after the directory is read
+
+    cache = DefaultsCache(tmp_path / "cache")
+    assert len(cache) == 2
+    build(BaseConfig, directory, cache=cache)
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 0
+
+def test_loads_are_independent_copies(tmp_path):
+    directory = copy_scenario(tmp_path)
+    cache = DefaultsCache(None)
+    first = cache.load(directory / "defaults.yaml")
+    first["nested_conf"]["field_a"] = -1
+    assert cache.load(directory / "defaults.yaml") == {"nested_conf": {"field_a": 10}}
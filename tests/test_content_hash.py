@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+import gc
+import shutil
+import pytest
+from asyd import Config, MV, build, content_hash, same_content, diff
+from asyd.config import _DIGESTS
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+@dataclass
+class Inner(Config):
+    value: Any = MV
+
+@dataclass
+class Outer(Config):
+    x: Any = MV
+    inner: Inner = MV
+    _private: Any = MV
+
+class P:
+    def __init__(self, v):
+        self.v = v
+
+    def __eq__(self, other):
+        return isinstance(other, P) and self.v == other.v
+
+class R(P):
+    def __repr__(self):
+        return "R(...)"
+
+
+def test_numbers_compare_by_value():
+    assert Outer(x=1) == Outer(x=1.0) == Outer(x=True)
+    assert content_hash(Outer(x=1)) == content_hash(Outer(x=1.0)) == content_hash(Outer(x=True))
+    assert Outer(x={1: "a"}) == Outer(x={1.0: "a"})
+    assert Outer(x=1) != Outer(x=1.5)
+    assert Outer(x=0.1) == Outer(x=0.1)
+
+def test_equality_matches_field_values():
+    assert Outer(x={"a": 1, "b": 2}) == Outer(x={"b": 2, "a": 1})
+    assert Outer(x={1, 2}) == Outer(x=frozenset({2, 1}))
+    assert Outer(x=[1, 2]) != Outer(x=(1, 2))
+    assert Outer(x="1") != Outer(x=1)
+    assert Outer(x=None) != Outer(x=0)
+    assert Outer(x=1, inner=Inner(value=2)) == Outer(x=1, inner=Inner(value=2.0))
+    assert Outer(x=1, inner=Inner(value=2)) != Outer(x=1, inner=Inner(value=3))
+
+def test_yaml_and_override_numbers_hash_the_same(tmp_path):
+    shutil.copytree(SCENARIOS / "queries" / "config", tmp_path / "config")
+    (tmp_path / "config" / "defaults.yaml").write_text("dep:\n  x: 5\n  name: abc\n  ratio: 1\n")
+    from_yaml = build(QueriesConfig, tmp_path / "config")
+    from_override = build(QueriesConfig, SCENARIOS / "queries" / "config", overrides={"dep.ratio": 1})
+
+    assert type(from_yaml.dep.ratio) is int and type(from_override.dep.ratio) is float
+    assert content_hash(from_yaml) == content_hash(from_override)
+    assert from_yaml == from_override
+
+def test_hash_follows_changes():
+    config = Outer(x=(1, 2), inner=Inner(value=1))
+    h = content_hash(config)
+    assert content_hash(config) == h
+
+    config.inner.value = 2
+    assert content_hash(config) != h
+    config.inner.value = 1
+    assert content_hash(config) == h
+
+    # Mutable values nested in immutable ones are not cached
+    config.x = ([1], 2)
+    h = content_hash(config)
+    config.x[0].append(3)
+    assert content_hash(config) != h
+
+def test_digests_not_stored_on_configs():
+    config = Outer(x=1, inner=Inner(value=1))
+    attrs = dict(config.__dict__)
+    content_hash(config)
+    assert config.__dict__ == attrs
+    assert id(config) in _DIGESTS
+
+    key = id(config)
+    del config
+    gc.collect()
+    assert not key in _DIGESTS
+
+def test_diff():
+    a = Outer(x=1, inner=Inner(value=[1]))
+    assert diff(a, Outer(x=1.0, inner=Inner(value=[1]))) == {}
+    assert diff(a, Outer(x=2, inner=Inner(value=[1, 2]))) == {"x": (1, 2), "inner.value": ([1], [1, 2])}
+
+    first = build(MultiConfig, SCENARIOS / "multi_default" / "config", args=["--some_multi=first"])
+    third = build(MultiConfig, SCENARIOS / "multi_default" / "config", args=["--some_multi=third"])
+    assert diff(first, third) == {"some_multi": ("first", "third")}
+    assert first != third
+
+def test_equality_of_unhashable_values():
+    # Values that cannot be hashed are compared with ==, not by repr
+    assert Outer(x=P(1)) == Outer(x=P(1))
+    assert Outer(x=R(1)) != Outer(x=R(2))
+    assert Outer(x=1, inner=Inner(value=P(1))) == Outer(x=1, inner=Inner(value=P(1)))
+    with pytest.raises(TypeError):
+        content_hash(Outer(x=R(1)))
+    a, b = R(1), R(2)
+    assert diff(Outer(x=a), Outer(x=b)) == {"x": (a, b)}
+    assert diff(Outer(x=P(1), inner=Inner(value=R(1))), Outer(x=P(1), inner=Inner(value=R(2)))).keys() == {"inner.value"}
+
+def test_equality_compares_private_fields_and_nan():
+    assert Outer(x=1, _private=1) != Outer(x=1, _private=2)
+    assert same_content(Outer(x=1, _private=1), Outer(x=1, _private=2))
+    assert content_hash(Outer(x=1, _private=1)) == content_hash(Outer(x=1, _private=2))
+
+    assert Outer(x=float("nan")) != Outer(x=float("nan"))
+    assert same_content(Outer(x=float("nan")), Outer(x=float("nan")))
+    nan = float("nan")
+    assert Outer(x=nan) == Outer(x=nan)  # Like tuples, values that are the same object are equal
+
+def test_subclasses_hash_like_base_types():
+    from collections import namedtuple
+    from enum import Enum, IntEnum
+    class Color(str, Enum):
+        RED = "red"
+    class Level(IntEnum):
+        HIGH = 2
+    Pair = namedtuple("Pair", "a b")
+
+    for a, b in ((Color.RED, "red"), (Level.HIGH, 2.0), (Pair(1, 2), (1, 2))):
+        assert Outer(x=a) == Outer(x=b)
+        assert content_hash(Outer(x=a)) == content_hash(Outer(x=b))
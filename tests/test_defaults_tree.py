@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import copy
+import pickle
+import pytest
+from asyd import Config, MV, compile
+from asyd.builder import merge_defaults_trees, overlay_defaults_trees, intern_values
+from asyd.exceptions import RedundantDefaultException
+from asyd.frozen import FrozenDict, FrozenList
+from asyd.loading import OverlayTree
+
+
+@dataclass
+class Leaf(Config):
+    tags: List[Any] = MV
+    rows: List[Dict[str, Any]] = MV
+    mapping: Dict[str, Any] = MV
+    x: Any = MV
+
+@dataclass
+class Root(Config):
+    a: Leaf = MV
+    b: Leaf = MV
+
+
+def plain(tree):
+    return {k: plain(v) if isinstance(v, dict) else v for k, v in tree.items()}
+
+def test_values_interned_across_files(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "defaults.yaml").write_text("tags: [x, [1, 2]]\nrows: [{k: 1000}]\nmapping: {k: [1, 2]}\nx: 123456\n")
+    plan = compile(Root, tmp_path)
+    a, b = plan.raw_defaults_tree["a"], plan.raw_defaults_tree["b"]
+
+    assert type(a["tags"]) is FrozenList and type(a["rows"][0]) is FrozenDict
+    for field in ("tags", "rows", "x"):
+        assert a[field] is b[field]
+    assert a["tags"][1] is a["mapping"]["k"]
+    assert type(a["mapping"]) is dict and a["mapping"] is not b["mapping"]
+
+    first, second = plan.build(), plan.build()
+    assert first.a.tags == ["x", [1, 2]] and type(first.a.tags[1]) is list
+    assert first.a.rows == [{"k": 1000}] and type(first.a.rows[0]) is dict
+    assert first.a.mapping == {"k": [1, 2]} and type(first.a.mapping["k"]) is list
+    first.a.tags[1].append(3)
+    first.a.rows[0]["k"] = 0
+    first.a.mapping["k"].append(3)
+    assert second.a.tags == ["x", [1, 2]] and second.b.rows == [{"k": 1000}] and second.a.mapping == {"k": [1, 2]}
+    assert plan.build().a.tags == ["x", [1, 2]]
+
+    restored = pickle.loads(pickle.dumps(plan.raw_defaults_tree))
+    assert type(restored["a"]["tags"]) is FrozenList and restored["a"]["tags"] is restored["b"]["tags"]
+
+def test_interning_keeps_number_types():
+    interned = {}
+    data = intern_values({"a": [1, {"k": 1}], "b": [1.0, {"k": 1.0}], "c": [True]}, interned)
+    assert data["a"] is not data["b"] and data["a"] != data["c"]
+    assert type(data["b"][0]) is float and type(data["b"][1]["k"]) is float and data["c"][0] is True
+    assert intern_values([1, {"k": 1}], interned) is data["a"]
+
+
+TREES = [
+    ({"x": 1}, {"y": 2}),
+    ({"x!": 1, "n": {"a": 1}}, {"x!": 2, "n": {"b": 2}, "m": {"c": 3}}),
+    ({"n": {"a": 1, "d": {"e!": 5}}}, {"n": {"b": 2, "d": {"e!": 6, "f": 7}}}),
+    ({"x!": [1]}, {"x!": [2]}),
+    ({"?dep.x": {">0": {"x": 1}}}, {"y": 1}),
+]
+
+@pytest.mark.parametrize("tree, parent", TREES)
+def test_overlay_matches_merge(tree, parent):
+    merged = copy.deepcopy(tree)
+    merge_defaults_trees(merged, copy.deepcopy(parent))
+    overlay = overlay_defaults_trees(tree, parent)
+
+    assert plain(overlay) == merged
+    assert list(overlay) == list(merged) and len(overlay) == len(merged)
+    assert all(k in overlay and overlay.get(k) == merged[k] for k in merged)
+    assert overlay == merged and not "missing" in overlay and overlay.get("missing", 0) == 0
+
+    restored = pickle.loads(pickle.dumps(overlay))
+    assert type(restored) is OverlayTree and plain(restored) == merged
+
+@pytest.mark.parametrize("tree, parent", [
+    ({"x": 1}, {"x": 2}),
+    ({"n": {"x!": 1, "y": 1}}, {"n": {"x!": 2, "y": 2}}),
+    ({"n": {"a": 1}}, {"n": {"a": 2}}),
+    ({"n": {"d": {"e": 5}}}, {"n": {"b": 2, "d": {"e": 6}}}),
+])
+def test_overlay_errors_match_merge(tree, parent):
+    with pytest.raises(RedundantDefaultException):
+        merge_defaults_trees(copy.deepcopy(tree), copy.deepcopy(parent))
+    with pytest.raises(RedundantDefaultException):
+        overlay_defaults_trees(tree, parent)
+
+def test_overlay_shares_parent():
+    parent = {"n": {"a": 1}, "y": 2}
+    first = overlay_defaults_trees({"n": {"b": 1}}, parent)
+    second = overlay_defaults_trees({"x": 1}, parent)
+
+    assert first.parent is parent and second.parent is parent
+    assert first["n"].parent is parent["n"] and second["n"] is parent["n"]
+    first["y"] = 3
+    assert first["y"] == 3 and second["y"] == 2 and parent == {"n": {"a": 1}, "y": 2}
+    assert dict(first.own_items()) == {"n": first["n"], "y": 3}
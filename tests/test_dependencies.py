@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+import pytest
+from asyd import Config, ConfigRef, MV
+from asyd.dependencies import DependencyGraph
+from asyd.exceptions import CyclicDependencyException
+from scenarios.queries.config import BaseConfig as QueriesConfig
+from scenarios.multi_query_selection.config import BaseConfig as SelectionConfig
+
+
+@dataclass
+class A(Config):
+    x: int = MV
+    _default_dependencies = {ConfigRef("c")}
+
+@dataclass
+class B(Config):
+    x: int = MV
+    _default_dependencies = {ConfigRef("a")}
+
+@dataclass
+class C(Config):
+    x: int = MV
+    _default_dependencies = {ConfigRef("b")}
+
+@dataclass
+class D(Config):
+    x: int = MV
+
+@dataclass
+class Cyclic(Config):
+    d: D = MV
+    a: A = MV
+    b: B = MV
+    c: C = MV
+
+
+def test_levels_and_order():
+    graph = DependencyGraph(QueriesConfig)
+    assert graph.paths == ["", "dep", "target"]
+    assert graph.dependencies["target"] == {"dep"}
+    assert graph.dependents["dep"] == ["target"]
+    assert graph.levels() == [["", "dep"], ["target"]]
+    assert graph.order() == ["", "dep", "target"]
+
+def test_multi_options_depend_on_multi():
+    graph = DependencyGraph(SelectionConfig)
+    assert graph.dependencies["holder.m"] == {"holder"}
+    assert graph.dependencies["holder.m.inner"] == {"holder.m"}
+    order = graph.order()
+    for path, deps in graph.dependencies.items():
+        assert all(order.index(dep) < order.index(path) for dep in deps)
+    for level in graph.levels():
+        for path in level:
+            assert all(not dep in level for dep in graph.dependencies[path])
+
+def test_cycle_path_in_message():
+    graph = DependencyGraph(Cyclic)
+    with pytest.raises(CyclicDependencyException) as e:
+        graph.levels()
+    assert str(e.value) == "Cycle detected in dependencies: 'a' -> 'c' -> 'b' -> 'a'"
+    assert graph.find_cycle({"a", "b", "c"}) == ["a", "c", "b", "a"]
@@ -0,0 +1,61 @@
+from pathlib import Path
+import copy
+import pickle
+import pytest
+from asyd import build, freeze
+from asyd.frozen import FrozenDict, freeze_value
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+from scenarios.mutable_defaults.config import BaseConfig as MutableConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+def test_freeze_is_hashable():
+    config = build(MutableConfig, SCENARIOS / "mutable_defaults" / "config")
+    frozen = freeze(config)
+
+    assert frozen.tags == ("a", "b")
+    assert frozen.mapping == {"k": 1}
+    assert hash(frozen) == hash(freeze(build(MutableConfig, SCENARIOS / "mutable_defaults" / "config")))
+    assert frozen == freeze(build(MutableConfig, SCENARIOS / "mutable_defaults" / "config"))
+
+    config.mapping["k"] = 2
+    assert freeze(config) != frozen
+
+def test_freeze_multi():
+    config = build(MultiConfig, SCENARIOS / "multi_default" / "config", args=["--some_multi=third"])
+    frozen = freeze(config)
+    assert frozen.some_multi._selected == "third"
+    assert frozen.some_multi._config.field_b == 3
+    assert hash(frozen) == hash(freeze(config))
+
+def test_frozen_dict():
+    frozen = freeze_value({"b": [1, {"c": {2, 3}}], "a": 1})
+    assert frozen == {"a": 1, "b": (1, {"c": frozenset({2, 3})})}
+    assert isinstance(frozen["b"][1], FrozenDict)
+    assert hash(frozen) == hash(freeze_value({"a": 1, "b": [1, {"c": {3, 2}}]}))
+
+    with pytest.raises(TypeError):
+        frozen["a"] = 2
+    with pytest.raises(TypeError):
+        frozen.update(a=2)
+    with pytest.raises(TypeError):
+        del frozen["a"]
+    assert frozen == {"a": 1, "b": (1, {"c": frozenset({2, 3})})}
+
+    for copied in (pickle.loads(pickle.dumps(frozen)), copy.deepcopy(frozen)):
+        assert type(copied) is FrozenDict and copied == frozen and hash(copied) == hash(frozen)
+
+def test_freeze_set_elements():
+    frozen = freeze_value({(1, 2), frozenset({3})})
+    assert frozen == frozenset({(1, 2), frozenset({3})})
+    assert isinstance(frozen, frozenset)
+
+def test_pickle_frozen():
+    for config in (build(MutableConfig, SCENARIOS / "mutable_defaults" / "config"),
+                   build(MultiConfig, SCENARIOS / "multi_default" / "config", args=["--some_multi=third"])):
+        frozen = freeze(config)
+        loaded = pickle.loads(pickle.dumps(frozen))
+        assert type(loaded) is type(frozen)
+        assert loaded == frozen and hash(loaded) == hash(frozen)
+        assert copy.deepcopy(frozen) == frozen
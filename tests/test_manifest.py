@@ -0,0 +1,56 @@
+from pathlib import Path
+import shutil
+from asyd import Manifest, build, compile, dictize, trace
+from asyd.loading import discover_defaults_files
+from scenarios.queries_folder.config import BaseConfig as QueriesConfig
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+QUERIES = SCENARIOS / "queries_folder" / "config"
+MULTI = SCENARIOS / "multi_default" / "config"
+
+
+def test_scan():
+    manifest = Manifest.scan(QUERIES)
+    assert manifest.files == ["defaults.yaml"] and list(manifest.dirs) == ["target"]
+    assert manifest.defaults_file() == QUERIES / "defaults.yaml"
+    assert manifest.dir("target").defaults_file() is None
+    assert manifest.dir("missing") is None
+
+    files = sorted(p for p in QUERIES.rglob("*") if p.is_file())
+    assert sorted(manifest.all_files()) == files
+    assert len(manifest) == len(files)
+
+    restored = Manifest.from_dict(str(QUERIES), manifest.to_dict())
+    assert restored.to_dict() == manifest.to_dict()
+    assert list(restored.all_files()) == list(manifest.all_files())
+
+    assert len(Manifest.scan(QUERIES / "missing")) == 0
+    assert len(Manifest.scan(QUERIES / "defaults.yaml")) == 0
+
+def test_reuse_across_compiles():
+    plan = compile(QueriesConfig, QUERIES)
+    with trace() as tracer:
+        reused = compile(QueriesConfig, QUERIES, manifest=plan.manifest)
+    assert reused.manifest is plan.manifest
+    assert not "scan_directory" in [s.name for s in tracer.spans]
+
+    for args in (["--dep.x=5"], ["--dep.x=11", "--dep.name=abc"], ["--dep.ratio=0.5"]):
+        assert dictize(reused.build(args)) == dictize(build(QueriesConfig, QUERIES, args=args))
+
+def test_manifest_is_not_rescanned(tmp_path):
+    shutil.copytree(MULTI, tmp_path / "config")
+    manifest = Manifest.scan(tmp_path / "config")
+    (tmp_path / "config" / "defaults.yaml").write_text("some_field: added\n")
+
+    args = ["--some_multi=first"]
+    assert build(MultiConfig, tmp_path / "config", args=args).some_field == "added"
+    assert compile(MultiConfig, tmp_path / "config", manifest=manifest).build(args).some_field == "???"
+
+def test_discover_with_manifest():
+    manifest = Manifest.scan(MULTI)
+    assert discover_defaults_files(MultiConfig, MULTI, manifest=manifest) == discover_defaults_files(MultiConfig, MULTI) == []
+    assert discover_defaults_files(MultiConfig, MULTI, True, manifest) == \
+        [MULTI / "some_multi" / "first" / "defaults.yaml", MULTI / "some_multi" / "third" / "defaults.yaml"]
+    assert discover_defaults_files(QueriesConfig, QUERIES, manifest=Manifest.scan(QUERIES)) == \
+        sorted(p for p in QUERIES.rglob("*") if p.is_file())
@@ -0,0 +1,56 @@
+import pytest
+from asyd import MV
+from asyd.queries import CompiledQuery
+from asyd.exceptions import InvalidDefaultFileException
+
+
+def matched(query, target_val):
+    return [tree["branch"] for tree in query.matches(target_val)]
+
+def test_equality_ops():
+    query = CompiledQuery("?dep.x", {"=5": {"branch": "eq"}, "!=5": {"branch": "ne"}, "!=6": {"branch": "ne6"}}, int)
+    assert matched(query, 5) == ["eq", "ne6"]
+    assert matched(query, 6) == ["ne"]
+    assert matched(query, 7) == ["ne", "ne6"]
+
+def test_range_bounds():
+    query = CompiledQuery("?dep.x", {">10": {"branch": "gt"}, ">=10": {"branch": "ge"}, "<10": {"branch": "lt"}, "<=10": {"branch": "le"}}, int)
+    assert matched(query, 9) == ["lt", "le"]
+    assert matched(query, 10) == ["ge", "le"]
+    assert matched(query, 11) == ["gt", "ge"]
+
+def test_matches_in_declaration_order():
+    query = CompiledQuery("?dep.x", {"<=3": {"branch": "a"}, ">=1": {"branch": "b"}, "!=0": {"branch": "c"}, "=2": {"branch": "d"}, ">0": {"branch": "e"}}, int)
+    assert matched(query, 2) == ["a", "b", "c", "d", "e"]
+
+def test_operands_converted_to_field_type():
+    # Compared as strings, "9" would be above "10"
+    query = CompiledQuery("?dep.x", {">10": {"branch": "gt"}}, int)
+    assert matched(query, 9) == []
+    assert matched(query, 20) == ["gt"]
+
+    query = CompiledQuery("?dep.ratio", {">0.25": {"branch": "gt"}}, float)
+    assert matched(query, 0.3) == ["gt"]
+    assert matched(query, 0.2) == []
+
+    query = CompiledQuery("?dep.flag", {"=yes": {"branch": "on"}, "=false": {"branch": "off"}}, bool)
+    assert matched(query, True) == ["on"]
+    assert matched(query, False) == ["off"]
+
+    query = CompiledQuery("?dep.name", {"=10": {"branch": "ten"}}, str)
+    assert matched(query, "10") == ["ten"]
+    assert matched(query, 10) == []
+
+def test_missing_value_matches_nothing():
+    query = CompiledQuery("?dep.x", {"!=5": {"branch": "ne"}, ">0": {"branch": "gt"}}, int)
+    assert matched(query, MV) == []
+
+def test_invalid_branches():
+    with pytest.raises(InvalidDefaultFileException):
+        CompiledQuery("?dep.x", {">ten": {}}, int)
+    with pytest.raises(InvalidDefaultFileException):
+        CompiledQuery("?dep.flag", {"=maybe": {}}, bool)
+    with pytest.raises(InvalidDefaultFileException):
+        CompiledQuery("?dep.x", {"5": {}}, int)
+    with pytest.raises(InvalidDefaultFileException):
+        CompiledQuery("?dep.x", {">5": {}}, str).matches(5)
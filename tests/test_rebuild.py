@@ -0,0 +1,87 @@
+import shutil
+from pathlib import Path
+import pytest
+from asyd import compile, dictize
+from asyd.exceptions import InvalidOverrideException, InvalidPathException
+from scenarios.queries.config import BaseConfig as QueriesConfig
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+def test_rebuild_matches_build():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    cfg = plan.build()
+    changed = plan.rebuild(cfg, {"dep.x": 11})
+
+    assert dictize(cfg) == dictize(plan.build(["--dep.x=11"]))
+    assert sorted(changed) == ["dep.x", "target.eq", "target.ge", "target.gt", "target.ne"]
+
+def test_rebuild_unrelated_field_changes_nothing_else():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    cfg = plan.build()
+    assert plan.rebuild(cfg, {"target.eq": "no"}) == ["target.eq"]
+    assert plan.rebuild(cfg, {"dep.x": 6}) == ["dep.x", "target.ne"]
+
+    # Explicitly set values win over defaults that change later
+    assert cfg.target.eq == "no"
+
+def test_rebuild_keeps_explicit_args():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    cfg = plan.build(["--target.ne=mine"])
+    plan.rebuild(cfg, {"dep.x": 11})
+    assert cfg.target.ne == "mine"
+    assert cfg.target.gt == "yes"
+
+def test_rebuild_type_checks_values():
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    cfg = plan.build()
+    with pytest.raises(InvalidOverrideException):
+        plan.rebuild(cfg, {"dep.x": "11"})
+    with pytest.raises(InvalidPathException):
+        plan.rebuild(cfg, {"dep.missing": 1})
+    with pytest.raises(InvalidPathException):
+        plan.rebuild(cfg, {"dep": 1})
+
+    plan.rebuild(cfg, {"dep.ratio": 1})
+    assert type(cfg.dep.ratio) is float
+    assert dictize(cfg) == dictize(plan.build(["--dep.ratio=1"]))
+
+def test_rebuild_multi_selection():
+    plan = compile(MultiConfig, SCENARIOS / "multi_default" / "config")
+    cfg = plan.build(["--some_multi=first"])
+    changed = plan.rebuild(cfg, {"some_multi": "third"})
+
+    assert dictize(cfg) == dictize(plan.build(["--some_multi=third"]))
+    assert sorted(changed) == ["some_multi", "some_multi.field_b"]
+
+def test_refresh_after_reload(tmp_path):
+    shutil.copytree(SCENARIOS / "queries" / "config", tmp_path / "config")
+    plan = compile(QueriesConfig, tmp_path / "config")
+    cfg = plan.build()
+
+    (tmp_path / "config" / "defaults.yaml").write_text("dep:\n  x: 11\n  name: abc\n  ratio: 0.5\n")
+    stale_paths = plan.reload_defaults(config=cfg)
+    assert stale_paths == ["dep"]
+
+    changed = plan.refresh(cfg, stale_paths)
+    assert sorted(changed) == ["dep.x", "target.eq", "target.ge", "target.gt", "target.ne"]
+    assert dictize(cfg) == dictize(plan.build())
+
+def test_rebuild_same_selection_keeps_explicit_values():
+    plan = compile(MultiConfig, SCENARIOS / "multi_default" / "config")
+    cfg = plan.build(["--some_multi=first", "--some_multi.field_a=3"])
+    assert plan.rebuild(cfg, {"some_multi": "first"}) == ["some_multi"]
+    assert cfg.some_multi._config.field_a == 3
+
+def test_rebuild_selection_carries_explicit_values_over():
+    plan = compile(MultiConfig, SCENARIOS / "multi_default" / "config")
+    cfg = plan.build(["--some_multi=first", "--some_multi.field_a=3"])
+
+    # second declares field_a like first does, third does not
+    plan.rebuild(cfg, {"some_multi": "second"})
+    assert cfg.some_multi._config.field_a == 3
+    assert dictize(cfg) == dictize(plan.build(["--some_multi=second", "--some_multi.field_a=3"]))
+
+    plan.rebuild(cfg, {"some_multi": "third"})
+    assert dictize(cfg) == dictize(plan.build(["--some_multi=third"]))
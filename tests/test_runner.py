@@ -4,12 +4,15 @@ import importlib
 import sys
 from asyd import dictize, build
 
+TESTS_PATH = Path(__file__).parent
+
+
 def import_py_file(path: Path):
-    return importlib.import_module(str(path).replace("/", ".")[:-3])
+    return importlib.import_module(".".join(path.relative_to(TESTS_PATH).with_suffix("").parts))
 
 def test():
-    scenarios_path = Path("scenarios") # Path(__file__).parent.resolve() / "scenarios"
-    for scenario_path in scenarios_path.iterdir():
+    scenarios_path = TESTS_PATH / "scenarios"
+    for scenario_path in sorted(scenarios_path.iterdir()):
         if not scenario_path.is_dir() or str(scenario_path).endswith("__pycache__"):
             continue
 
@@ -31,10 +34,13 @@ def test():
                 raise Exception("Test scenario must have expected result or expected exception.")
 
             try:
-                cfg = build(import_py_file(config_file).BaseConfig, scenario_path / "config", arguments=[] if args == "" else args.split(" "))
+                cfg = build(import_py_file(config_file).BaseConfig, scenario_path / "config", args=[] if args == "" else args.split(" "))
             except Exception as e:
-                raise e
+                if expected_exception is None:
+                    raise e
                 assert type(e).__name__ == expected_exception
+                continue
+            assert expected_exception is None, f"Expected {expected_exception}"
 
             if not expected_result is None:
                 assert expected_result == dictize(cfg)
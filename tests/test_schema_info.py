@@ -0,0 +1,46 @@
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Callable
+import pytest
+from asyd import Config, MultiConfig, ConfigRef, MV
+from asyd.config import LEAF, MULTI, schema_info, validate_ref
+from scenarios.multi.config import BaseConfig as MultiBaseConfig, SomeMulti
+
+
+@dataclass
+class OptionConfig(Config):
+    x: int = MV
+
+class AbstractMulti(MultiConfig[Config]):
+    _options = {"a": OptionConfig}
+
+    @abstractmethod
+    def missing(self) -> None:
+        ...
+
+@dataclass
+class Holder(Config):
+    m: AbstractMulti = MV
+    fn: Callable = MV
+    _private: int = MV
+
+
+def test_schema_info_fields():
+    info = schema_info(MultiBaseConfig)
+    assert schema_info(MultiBaseConfig) is info
+    assert info.kinds == {"some_field": LEAF, "some_multi": MULTI}
+    assert info.children == {"some_multi": SomeMulti}
+    assert info.leaves == ("some_field",)
+
+    multi_info = schema_info(SomeMulti)
+    assert multi_info.is_multi
+    assert list(multi_info.options) == ["first", "second", "third"]
+    assert multi_info.variants == [multi_info.superschema, *multi_info.options.values()]
+
+    holder_info = schema_info(Holder)
+    assert holder_info.kinds["m"] == MULTI and holder_info.kinds["fn"] == LEAF
+    assert holder_info.serialized == ("m",)
+
+def test_ref_through_abstract_multi():
+    with pytest.raises(NotImplementedError, match="Field m assigned abstract class"):
+        validate_ref(ConfigRef("m.x"), Holder)
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+import io
+import json
+import yaml
+import pytest
+from asyd import Config, MV, build, build_sweep, dictize, yamlize, jsonize, write_jsonl
+from asyd.exceptions import InvalidLoadedConfigException
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+QUERIES = SCENARIOS / "queries" / "config"
+
+
+@dataclass
+class WithCallables(Config):
+    x: int = MV
+    anything: Any = MV
+    fn: Callable = MV
+    _private: int = MV
+
+
+def test_dictize_skips_private_fields_and_callables():
+    config = WithCallables(x=1, anything=len, fn=print, _private=2)
+    assert dictize(config) == {"x": 1}
+    config.anything = [1]
+    assert dictize(config) == {"x": 1, "anything": [1]}
+
+def test_dictize_multi():
+    config = build(MultiConfig, SCENARIOS / "multi_default" / "config", args=["--some_multi=third"])
+    assert dictize(config) == {"some_field": "???", "some_multi": {"field_b": 3, "_selected": "third"}}
+
+def test_yamlize_and_jsonize_round_trip(tmp_path):
+    config = build(QueriesConfig, QUERIES, args=["--dep.x=11", "--target.eq=mine"])
+    assert yaml.safe_load(yamlize(config)) == dictize(config)
+    assert json.loads(jsonize(config, indent=2)) == dictize(config)
+
+    for name, text in (("cfg.yaml", yamlize(config)), ("cfg.json", jsonize(config))):
+        (tmp_path / name).write_text(text)
+        assert dictize(build(QueriesConfig, QUERIES, args=["--load_path", str(tmp_path / name)])) == dictize(config)
+
+def test_write_jsonl_round_trip(tmp_path):
+    configs = list(build_sweep(QueriesConfig, QUERIES, {"dep.x": [4, 11, -1]}))
+    assert write_jsonl(iter(configs), tmp_path / "sweep.jsonl") == 3
+
+    stream = io.StringIO()
+    assert write_jsonl(configs, stream) == 3
+    assert stream.getvalue() == (tmp_path / "sweep.jsonl").read_text()
+
+    for i, config in enumerate(configs):
+        loaded = build(QueriesConfig, QUERIES, args=["--load_path", f"{tmp_path / 'sweep.jsonl'}:{i}"])
+        assert dictize(loaded) == dictize(config)
+
+    # Without an index the first line is loaded
+    assert dictize(build(QueriesConfig, QUERIES, load_path=str(tmp_path / "sweep.jsonl"))) == dictize(configs[0])
+    with pytest.raises(InvalidLoadedConfigException):
+        build(QueriesConfig, QUERIES, load_path=f"{tmp_path / 'sweep.jsonl'}:3")
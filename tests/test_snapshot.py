@@ -0,0 +1,52 @@
+from pathlib import Path
+import pytest
+from asyd import build, compile, dictize, save_snapshot, load_snapshot
+from asyd.exceptions import InvalidSnapshotException
+from scenarios.multi_default.config import BaseConfig as MultiConfig
+from scenarios.mutable_defaults.config import BaseConfig as MutableConfig
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+@pytest.mark.parametrize("schema, name, args", [
+    (QueriesConfig, "queries", ["--dep.x=11", "--target.eq=mine"]),
+    (MultiConfig, "multi_default", ["--some_multi=third"]),
+    (MutableConfig, "mutable_defaults", []),
+])
+def test_snapshot_round_trip(tmp_path, schema, name, args):
+    config = build(schema, SCENARIOS / name / "config", args=args)
+    save_snapshot(config, tmp_path / "snapshot")
+    loaded = load_snapshot(schema, tmp_path / "snapshot")
+
+    assert type(loaded) is schema
+    assert dictize(loaded) == dictize(config)
+
+def test_snapshot_keeps_explicit_fields(tmp_path):
+    plan = compile(QueriesConfig, SCENARIOS / "queries" / "config")
+    save_snapshot(plan.build(["--target.ne=mine"]), tmp_path / "snapshot")
+    loaded = load_snapshot(QueriesConfig, tmp_path / "snapshot")
+
+    # The snapshot can be rebuilt like the config it was saved from
+    plan.rebuild(loaded, {"dep.x": 11})
+    assert loaded.target.ne == "mine"
+    assert dictize(loaded) == dictize(plan.build(["--target.ne=mine", "--dep.x=11"]))
+
+def test_snapshot_of_other_schema(tmp_path):
+    save_snapshot(build(MutableConfig, SCENARIOS / "mutable_defaults" / "config"), tmp_path / "snapshot")
+    with pytest.raises(InvalidSnapshotException):
+        load_snapshot(QueriesConfig, tmp_path / "snapshot")
+
+    # Falls back to building, and replaces the snapshot
+    with pytest.warns(UserWarning):
+        config = load_snapshot(QueriesConfig, tmp_path / "snapshot", SCENARIOS / "queries" / "config", args=["--dep.x=4"])
+    assert dictize(config) == dictize(build(QueriesConfig, SCENARIOS / "queries" / "config", args=["--dep.x=4"]))
+    assert dictize(load_snapshot(QueriesConfig, tmp_path / "snapshot")) == dictize(config)
+
+def test_unreadable_snapshot(tmp_path):
+    with pytest.raises(InvalidSnapshotException):
+        load_snapshot(QueriesConfig, tmp_path / "missing")
+
+    (tmp_path / "damaged").write_bytes(b"not a snapshot")
+    with pytest.raises(InvalidSnapshotException):
+        load_snapshot(QueriesConfig, tmp_path / "damaged")
@@ -0,0 +1,80 @@
+from pathlib import Path
+import json
+import yaml
+import pytest
+from asyd import build, build_sweep, run_sweep, dictize
+from asyd.exceptions import InvalidPathException, InvalidOverrideException
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+QUERIES = SCENARIOS / "queries" / "config"
+
+
+def test_build_sweep_grid_order():
+    grid = {"dep.x": [4, 11], "dep.name": ["abc", "zzz"]}
+    configs = list(build_sweep(QueriesConfig, QUERIES, grid, args=["--target.eq=mine"]))
+
+    assert [(c.dep.x, c.dep.name) for c in configs] == [(4, "abc"), (4, "zzz"), (11, "abc"), (11, "zzz")]
+    for c in configs:
+        assert dictize(c) == dictize(build(QueriesConfig, QUERIES, args=[f"--dep.x={c.dep.x}", f"--dep.name={c.dep.name}", "--target.eq=mine"]))
+
+def test_build_sweep_is_lazy():
+    configs = build_sweep(QueriesConfig, QUERIES, {"dep.x": [1, 2, 3]})
+    assert next(configs).dep.x == 1
+    assert next(configs).dep.x == 2
+
+@pytest.mark.parametrize("out_format, load", [("yaml", yaml.safe_load), ("json", json.loads)])
+def test_build_sweep_writes_files(tmp_path, out_format, load):
+    configs = list(build_sweep(QueriesConfig, QUERIES, {"dep.x": [4, 11]}, out_dir=tmp_path, out_format=out_format))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"0.{out_format}", f"1.{out_format}"]
+    for i, config in enumerate(configs):
+        assert load((tmp_path / f"{i}.{out_format}").read_text()) == dictize(config)
+
+def test_build_sweep_writes_jsonl(tmp_path):
+    configs = list(build_sweep(QueriesConfig, QUERIES, {"dep.x": [4, 11, 12]}, out_dir=tmp_path, out_format="jsonl"))
+    lines = (tmp_path / "sweep.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [dictize(c) for c in configs]
+
+def test_build_sweep_errors(tmp_path):
+    with pytest.raises(InvalidPathException):
+        build_sweep(QueriesConfig, QUERIES, {"dep.missing": [1]})
+    with pytest.raises(ValueError):
+        build_sweep(QueriesConfig, QUERIES, {"dep.x": [1]}, out_dir=tmp_path, out_format="xml")
+    with pytest.raises(InvalidOverrideException):
+        list(build_sweep(QueriesConfig, QUERIES, {"dep.x": ["one"]}))
+
+def test_run_sweep_order_and_errors():
+    points = [{"dep.x": 4}, {"dep.x": "bad"}, {"dep.x": 11}, {"dep.missing": 1}, {"dep.x": -1}]
+    results = list(run_sweep(QueriesConfig, QUERIES, points, args=["--target.eq=mine"], workers=2))
+
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [r.overrides for r in results] == points
+    assert type(results[1].error) is InvalidOverrideException and results[1].config is None
+    assert type(results[3].error) is InvalidPathException and results[3].config is None
+    for r in (results[0], results[2], results[4]):
+        assert r.error is None
+        assert dictize(r.config) == dictize(build(QueriesConfig, QUERIES, args=["--target.eq=mine"], overrides=r.overrides))
+
+def test_run_sweep_serialized():
+    results = list(run_sweep(QueriesConfig, QUERIES, [{"dep.x": 4}, {"dep.x": 11}], workers=1, out_format="json"))
+    assert [json.loads(r.config)["dep"]["x"] for r in results] == [4, 11]
+
+def test_run_sweep_window():
+    pulled = []
+    def points():
+        for x in range(12):
+            pulled.append(x)
+            yield {"dep.x": x}
+
+    results = run_sweep(QueriesConfig, QUERIES, points(), workers=2, window=3)
+    for i, result in enumerate(results):
+        assert result.index == i
+        # At most window points are in flight, plus the one submitted for the result just returned
+        assert len(pulled) <= i + 1 + 3
+    assert len(pulled) == 12
+
+def test_run_sweep_invalid_arguments():
+    with pytest.raises(ValueError):
+        run_sweep(QueriesConfig, QUERIES, [], window=0)
+    with pytest.raises(ValueError):
+        run_sweep(QueriesConfig, QUERIES, [], out_format="jsonl")
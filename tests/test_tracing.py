@@ -0,0 +1,76 @@
+from pathlib import Path
+import threading
+from asyd import build, trace, Tracer
+from asyd.tracing import span, count, tracing
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+QUERIES = SCENARIOS / "queries" / "config"
+
+
+def test_build_spans_and_counters():
+    finished = []
+    with trace(callback=finished.append) as tracer:
+        assert tracing()
+        build(QueriesConfig, QUERIES, args=["--dep.x=11"])
+    assert not tracing()
+
+    names = [s.name for s in tracer.spans]
+    assert names == [s.name for s in finished]
+    for name in ("compile", "validate_refs", "build_defaults_tree", "build", "parse"):
+        assert name in names
+    assert sorted(s.attrs["path"] for s in tracer.spans if s.name == "build_config") == ["", "dep", "target"]
+
+    # Spans record the depth they were opened at, so the configs built inside build are one level deeper
+    build_span = next(s for s in tracer.spans if s.name == "build")
+    config_span = next(s for s in tracer.spans if s.name == "build_config")
+    assert config_span.depth == build_span.depth + 1
+    assert build_span.start <= config_span.start and config_span.duration <= build_span.duration
+
+    assert tracer.counters["files_read"] == len(list(QUERIES.rglob("*.yaml")))
+    assert tracer.counters["bytes_parsed"] > 0
+    assert tracer.counters["queries_evaluated"] > 0
+
+def test_disabled_outside_trace():
+    with trace() as tracer:
+        pass
+    with span("outside"):
+        count("outside")
+    build(QueriesConfig, QUERIES)
+    assert tracer.spans == [] and tracer.counters == {}
+
+def test_nested_trace_restores_previous():
+    with trace() as outer:
+        with trace() as inner:
+            count("n")
+        count("n", 2)
+    assert inner.counters == {"n": 1}
+    assert outer.counters == {"n": 2}
+
+def test_keep_spans_and_summary():
+    with trace(keep_spans=False) as tracer:
+        for _ in range(3):
+            with span("step", i=1):
+                pass
+        count("things", 5)
+    assert tracer.spans == []
+
+    lines = tracer.summary().splitlines()
+    assert lines[0].split() == ["span", "calls", "total", "ms", "mean", "ms", "max", "ms"]
+    assert lines[1].split()[:2] == ["step", "3"]
+    assert lines[2] == "things: 5"
+
+def test_threads_share_tracer():
+    tracer = Tracer()
+    def work():
+        for _ in range(100):
+            tracer.count("n")
+            with tracer.span("s", {}):
+                pass
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert tracer.counters == {"n": 400}
+    assert len(tracer.spans) == 400 and all(s.depth == 0 for s in tracer.spans)
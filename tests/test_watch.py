@@ -0,0 +1,51 @@
+import shutil
+from pathlib import Path
+from asyd import compile, dictize, DefaultsWatcher
+from scenarios.queries.config import BaseConfig as QueriesConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+def make_watcher(tmp_path, args=[]):
+    shutil.copytree(SCENARIOS / "queries" / "config", tmp_path / "config")
+    plan = compile(QueriesConfig, tmp_path / "config")
+    calls = []
+    errors = []
+    watcher = DefaultsWatcher(plan, plan.build(args), lambda config, changed: calls.append(changed), on_error=errors.append)
+    return plan, watcher, calls, errors
+
+def test_poll_without_changes(tmp_path):
+    plan, watcher, calls, errors = make_watcher(tmp_path)
+    assert watcher.poll() == []
+    assert calls == []
+
+def test_poll_reparses_changed_file_only(tmp_path):
+    plan, watcher, calls, errors = make_watcher(tmp_path, ["--target.ne=mine"])
+    watcher.cache.reset_stats()
+
+    (tmp_path / "config" / "defaults.yaml").write_text("dep:\n  x: 11\n  name: abc\n  ratio: 0.5\n")
+    changed = watcher.poll()
+
+    assert sorted(changed) == ["dep.x", "target.eq", "target.ge", "target.gt"]
+    assert calls == [changed]
+    assert watcher.cache.stats()["misses"] == 1
+
+    # The explicitly set value is kept, everything else matches a fresh build
+    assert watcher.config.target.ne == "mine"
+    assert dictize(watcher.config) == dictize(plan.build(["--target.ne=mine"]))
+
+def test_poll_keeps_defaults_on_error(tmp_path):
+    plan, watcher, calls, errors = make_watcher(tmp_path)
+    target_defaults = tmp_path / "config" / "target" / "defaults.yaml"
+    valid = target_defaults.read_text()
+
+    target_defaults.write_text("?dep.x:\n  \"5\":\n    eq: \"no\"\n")
+    assert watcher.poll() == []
+    assert len(errors) == 1 and calls == []
+    assert watcher.config.target.eq == "yes"
+    assert "=5" in plan.raw_defaults_tree["target"]["?dep.x"]
+
+    target_defaults.write_text(valid.replace("eq: \"yes\"", "eq: \"fixed\""))
+    assert watcher.poll() == ["target.eq"]
+    assert watcher.config.target.eq == "fixed"
+    assert dictize(watcher.config) == dictize(plan.build())
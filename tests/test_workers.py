@@ -0,0 +1,27 @@
+from pathlib import Path
+import pytest
+from asyd import build, dictize
+from asyd.loading import discover_defaults_files
+from scenarios.merge_nested_defaults_folder_and_file.config import BaseConfig as FolderConfig
+from scenarios.mutable_defaults.config import BaseConfig as MutableConfig
+
+SCENARIOS = Path(__file__).parent / "scenarios"
+
+
+@pytest.mark.parametrize("schema, name", [(FolderConfig, "merge_nested_defaults_folder_and_file"), (MutableConfig, "mutable_defaults")])
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_workers_build_the_same_config(schema, name, use_processes):
+    directory = SCENARIOS / name / "config"
+    assert dictize(build(schema, directory, workers=2, use_processes=use_processes)) == dictize(build(schema, directory))
+
+def test_discover_defaults_files():
+    directory = SCENARIOS / "merge_nested_defaults_folder_and_file" / "config"
+    assert discover_defaults_files(FolderConfig, directory) == [directory / "defaults" / "nested_conf.yaml", directory / "nested_conf" / "defaults.yaml"]
+
+def test_workers_raise_the_same_parse_error(tmp_path):
+    (tmp_path / "defaults.yaml").write_text("field: [unclosed\n")
+    with pytest.raises(Exception) as serial:
+        build(MutableConfig, tmp_path)
+    with pytest.raises(Exception) as parallel:
+        build(MutableConfig, tmp_path, workers=2)
+    assert type(parallel.value) is type(serial.value)